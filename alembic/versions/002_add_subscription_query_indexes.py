@@ -0,0 +1,32 @@
+"""Add composite and keyset indexes for subscription queries
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Subscription list, upcoming billing, analytics filter, Telegram /list and /stats
+    op.create_index('ix_subscriptions_user_active_billing', 'subscriptions',
+                    ['user_id', 'is_active', 'next_billing_date'])
+    # Cursor pagination: ORDER BY (column IS NULL, column, id)
+    op.create_index('ix_subscriptions_user_billing_keyset', 'subscriptions',
+                    ['user_id', sa.text('(next_billing_date IS NULL)'), 'next_billing_date', 'id'])
+    op.create_index('ix_subscriptions_user_created_keyset', 'subscriptions',
+                    ['user_id', sa.text('(created_at IS NULL)'), 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_subscriptions_user_created_keyset', table_name='subscriptions')
+    op.drop_index('ix_subscriptions_user_billing_keyset', table_name='subscriptions')
+    op.drop_index('ix_subscriptions_user_active_billing', table_name='subscriptions')
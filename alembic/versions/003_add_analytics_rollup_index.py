@@ -0,0 +1,27 @@
+"""Add unique rollup index to analytics
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rollups are written by the API, so drop any rows from the unused legacy table
+    op.execute("DELETE FROM analytics")
+    # One rollup per user and period (month or year)
+    op.create_index('ix_analytics_user_period', 'analytics',
+                    ['user_id', 'period_start', 'period_end'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analytics_user_period', table_name='analytics')
@@ -0,0 +1,38 @@
+"""Add exchange_rates table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'exchange_rates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('currency', sa.String(), nullable=False),
+        sa.Column('rate', sa.Float(), nullable=False),
+        sa.Column('base_currency', sa.String(), nullable=False),
+        sa.Column('source', sa.String(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_exchange_rates_id', 'exchange_rates', ['id'], unique=False)
+    op.create_index('ix_exchange_rates_currency', 'exchange_rates', ['currency'], unique=True)
+    # Stored rollups were summed without conversion, recompute them on next read
+    op.execute("DELETE FROM analytics")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_exchange_rates_currency', table_name='exchange_rates')
+    op.drop_index('ix_exchange_rates_id', table_name='exchange_rates')
+    op.drop_table('exchange_rates')
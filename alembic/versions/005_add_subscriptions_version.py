@@ -0,0 +1,24 @@
+"""Add subscriptions_version to users
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Collection version for ETags, bumped on every subscription change
+    op.add_column('users', sa.Column('subscriptions_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'subscriptions_version')
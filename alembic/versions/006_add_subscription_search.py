@@ -0,0 +1,64 @@
+"""Add full-text search index on subscriptions
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+# Must match SUBSCRIPTION_SEARCH_VECTOR in app/models/database.py
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(provider, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+SQLITE_TRIGGERS = ('subscriptions_fts_ai', 'subscriptions_fts_ad', 'subscriptions_fts_au')
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_subscriptions_search ON subscriptions USING gin (({SEARCH_VECTOR}))")
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS subscriptions_fts USING fts5("
+            "name, provider, description, content='subscriptions', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS subscriptions_fts_ai AFTER INSERT ON subscriptions BEGIN "
+            "INSERT INTO subscriptions_fts(rowid, name, provider, description) "
+            "VALUES (new.id, new.name, new.provider, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS subscriptions_fts_ad AFTER DELETE ON subscriptions BEGIN "
+            "INSERT INTO subscriptions_fts(subscriptions_fts, rowid, name, provider, description) "
+            "VALUES ('delete', old.id, old.name, old.provider, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS subscriptions_fts_au AFTER UPDATE OF name, provider, description ON subscriptions BEGIN "
+            "INSERT INTO subscriptions_fts(subscriptions_fts, rowid, name, provider, description) "
+            "VALUES ('delete', old.id, old.name, old.provider, old.description); "
+            "INSERT INTO subscriptions_fts(rowid, name, provider, description) "
+            "VALUES (new.id, new.name, new.provider, new.description); END"
+        )
+        # Index existing subscriptions
+        op.execute("INSERT INTO subscriptions_fts(subscriptions_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_subscriptions_search")
+    elif dialect == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS subscriptions_fts")
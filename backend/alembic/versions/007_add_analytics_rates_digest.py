@@ -0,0 +1,24 @@
+"""Add rates_digest to analytics rollups
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 18:55:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Digest of the exchange rates a rollup was converted with; rollups without it are recomputed
+    op.add_column('analytics', sa.Column('rates_digest', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('analytics', 'rates_digest')
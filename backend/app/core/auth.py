@@ -6,20 +6,38 @@ from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from .database import get_db, get_async_db
+from .cache import TTLCache
+from .passwords import password_pool
+from .sessions import is_session_revoked
+import hashlib
+import time
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authenticated user cache (per process)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# Verified token cache (per process), entries expire at the token's exp
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+# Password hashing (cost: python -m app.core.passwords <target_ms>)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # JWT token scheme
 security = HTTPBearer()
@@ -30,6 +48,8 @@ class AuthManager:
         self.algorithm = ALGORITHM
         self.access_token_expire_minutes = ACCESS_TOKEN_EXPIRE_MINUTES
         self.refresh_token_expire_days = REFRESH_TOKEN_EXPIRE_DAYS
+        # sha256(token) -> verified payload
+        self.token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=0)
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
@@ -42,6 +62,14 @@ class AuthManager:
             password = password[:72]
         return pwd_context.hash(password)
 
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the dedicated hashing pool"""
+        return await password_pool.run(self.verify_password, plain_password, hashed_password)
+
+    async def get_password_hash_async(self, password: str) -> str:
+        """Hash a password on the dedicated hashing pool"""
+        return await password_pool.run(self.get_password_hash, password)
+
     def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
         to_encode = data.copy()
@@ -62,10 +90,23 @@ class AuthManager:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
 
+    def _decode_token(self, token: str) -> dict:
+        """Decode JWT token, reusing the payload of an already verified token"""
+        digest = hashlib.sha256(token.encode("utf-8")).digest()
+        payload = self.token_cache.get(digest)
+        if payload is not None:
+            return dict(payload)
+
+        payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        exp = payload.get("exp")
+        if exp is not None:
+            self.token_cache.set(digest, payload, ttl=exp - time.time())
+        return dict(payload)
+
     def verify_token(self, token: str, token_type: str = "access") -> dict:
         """Verify and decode JWT token"""
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = self._decode_token(token)
             if payload.get("type") != token_type:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -79,9 +120,11 @@ class AuthManager:
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-    def create_telegram_token(self, telegram_id: str) -> str:
+    def create_telegram_token(self, telegram_id: str, session_id: Optional[str] = None) -> str:
         """Create token for Telegram user"""
         data = {"sub": telegram_id, "telegram_auth": True}
+        if session_id:
+            data["sid"] = session_id
         return self.create_access_token(data)
 
     def verify_telegram_token(self, token: str) -> dict:
@@ -97,57 +140,82 @@ class AuthManager:
 # Global auth manager instance
 auth_manager = AuthManager()
 
-def get_current_user(
+# User id -> detached User snapshot
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+def _user_snapshot(user):
+    """Detached copy of a User (column attributes only, never bound to a session)"""
+    return type(user)(**{column.key: getattr(user, column.key) for column in user.__table__.columns})
+
+def invalidate_cached_user(user_id):
+    """Drop a user from the cache after it was changed in the database"""
+    user_cache.delete(str(user_id))
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current authenticated user"""
     from ..models.database import User
     
-    print(f"🔐 get_current_user called with token: {credentials.credentials[:20]}...")
-    
     token = credentials.credentials
     try:
         payload = auth_manager.verify_token(token)
-        print(f"✅ Token verified, payload: {payload}")
+        logger.debug("Token verified for sub=%s", payload.get("sub"))
     except Exception as e:
-        print(f"❌ Token verification failed: {e}")
+        logger.info("Token verification failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
     
     user_id = payload.get("sub")
-    print(f"👤 Looking for user with ID: {user_id}")
+    logger.debug("Looking for user with ID: %s", user_id)
     
     if user_id is None:
-        print("❌ No user ID in token")
+        logger.warning("No user ID in token")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Revoked sessions are checked in memory, without a database query
+    session_id = payload.get("sid")
+    if session_id is not None and await is_session_revoked(db, session_id):
+        logger.info("Revoked session used by sub=%s", user_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session has been revoked"
+        )
+    
+    user = user_cache.get(str(user_id))
+    if user is not None:
+        # Своя копия на запрос: изменения в обработчике не попадают в кэш
+        return _user_snapshot(user)
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
     if user is None:
-        print(f"❌ User not found with ID: {user_id}")
+        logger.warning("User not found with ID: %s", user_id)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
     
-    print(f"✅ User found: {user.email}")
+    logger.debug("User found: %s", user.id)
+    user_cache.set(str(user_id), _user_snapshot(user))
     return user
 
-def get_current_user_optional(
+async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user if authenticated, None otherwise"""
     if not credentials:
         return None
     
     try:
-        return get_current_user(credentials, db)
+        return await get_current_user(credentials, db)
     except HTTPException:
         return None
 
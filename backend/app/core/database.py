@@ -2,9 +2,11 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 from dotenv import load_dotenv
+from .pool import get_engine_kwargs, get_pool_status, get_worker_budget
+from .query_stats import instrument_engine
 
 load_dotenv()
 
@@ -15,16 +17,44 @@ def get_database_url():
     """Get database URL for Alembic migrations"""
     return DATABASE_URL
 
-# Create engine
+def get_async_database_url(database_url: str = DATABASE_URL) -> str:
+    """Get database URL with an async driver (asyncpg / aiosqlite)"""
+    if database_url.startswith("postgres://"):
+        database_url = "postgresql://" + database_url[len("postgres://"):]
+    if database_url.startswith("postgresql://") or database_url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + database_url.split("://", 1)[1]
+    if database_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + database_url[len("sqlite://"):]
+    return database_url
+
+# Create engine (QueuePool for real databases, StaticPool for in-memory SQLite)
 engine = create_engine(
     DATABASE_URL,
-    poolclass=StaticPool,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
-    echo=os.getenv("DEBUG", "false").lower() == "true"
+    echo=os.getenv("DEBUG", "false").lower() == "true",
+    **get_engine_kwargs(DATABASE_URL)
+)
+
+# Create async engine for async routers
+ASYNC_DATABASE_URL = get_async_database_url()
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=os.getenv("DEBUG", "false").lower() == "true",
+    **get_engine_kwargs(ASYNC_DATABASE_URL, is_async=True)
 )
 
-# Create session factory
+# Per-request SQL statement counts and timings
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attributes stay loaded after commit, no implicit IO on access
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 # Base class for models
 Base = declarative_base()
@@ -37,11 +67,34 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency to get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_pool_stats():
+    """Get connection pool usage statistics per engine"""
+    return {
+        "sync": get_pool_status(engine),
+        "async": get_pool_status(async_engine.sync_engine),
+    }
+
+def get_pool_report():
+    """Pool statistics per engine plus the per-worker connection budget"""
+    stats = get_pool_stats()
+    return {**stats, "worker": get_worker_budget(stats)}
+
 def create_tables():
     """Create all tables"""
     from ..models.database import Base
     Base.metadata.create_all(bind=engine)
 
+async def create_tables_async():
+    """Create all tables via the async engine"""
+    from ..models.database import Base
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
 def drop_tables():
     """Drop all tables"""
     from ..models.database import Base
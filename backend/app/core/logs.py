@@ -0,0 +1,187 @@
+# backend/app/core/logs.py
+"""
+Structured logging.
+
+Records are filtered (per-logger level, debug sampling), redacted and put
+on a bounded in-memory queue by the request thread; a background listener
+formats them (JSON or text) and writes to stdout. When the queue is full
+records are dropped and counted instead of blocking the event loop.
+"""
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Per-logger overrides: "app.routers.subscriptions=DEBUG,sqlalchemy.engine=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Fraction of DEBUG records that are emitted (loggers set to DEBUG in LOG_LEVELS are not sampled)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+REDACTED = "***"
+
+# Credentials that must never reach the log output
+REDACT_PATTERNS = (
+    (re.compile(r"(?i)\b(bearer\s+)[\w\-.~+/=]+"), r"\1" + REDACTED),
+    (re.compile(r"\beyJ[\w-]*\.[\w-]*\.[\w-]*"), REDACTED),
+    (re.compile(r"(?i)([\"']?(?:password|passwd|secret|token|authorization|api_key)[\w]*[\"']?\s*[:=]\s*[\"']?)[^\s\"',}]+"),
+     r"\1" + REDACTED),
+)
+
+SENSITIVE_KEYS = ("password", "secret", "token", "authorization", "api_key", "cookie")
+
+# Attributes every LogRecord has; everything else came from `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+def redact(text: str) -> str:
+    """Mask bearer tokens, JWTs and key=value credentials in a string"""
+    for pattern, replacement in REDACT_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+def _record_extras(record: logging.LogRecord) -> Dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+class RedactingFilter(logging.Filter):
+    """Redact credentials in the message, its arguments and extra fields"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact(record.getMessage())
+        record.args = None
+        for key, value in _record_extras(record).items():
+            if any(word in key.lower() for word in SENSITIVE_KEYS):
+                setattr(record, key, REDACTED)
+            elif isinstance(value, str):
+                setattr(record, key, redact(value))
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records (INFO and above always pass)
+
+    Loggers set to DEBUG explicitly (``levels``, as parsed from LOG_LEVELS)
+    and their children are not sampled: their debug output was asked for.
+    """
+
+    def __init__(self, rate: float = LOG_DEBUG_SAMPLE_RATE, levels: Optional[Dict[str, str]] = None):
+        super().__init__()
+        self.rate = rate
+        self.levels = levels or {}
+        self._verbose: Dict[str, bool] = {}
+
+    def _is_verbose(self, name: str) -> bool:
+        verbose = self._verbose.get(name)
+        if verbose is None:
+            # Ближайший предок с явно заданным уровнем
+            parts = name.split(".")
+            level = None
+            for i in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:i])
+                if prefix in self.levels:
+                    level = self.levels[prefix]
+                    break
+            verbose = self._verbose[name] = level == "DEBUG"
+        return verbose
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        if self._is_verbose(record.name):
+            return True
+        return random.random() < self.rate
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_record_extras(record))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Format exceptions here: tracebacks cannot cross the queue
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.msg = f"{record.getMessage()}\n{redact(record.exc_text)}"
+            record.args = None
+            record.exc_info = None
+            record.exc_text = None
+        return record
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse "logger=LEVEL,logger=LEVEL" into a dict"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+_listener = None
+queue_handler = None
+
+def setup_logging():
+    """Configure the root logger once per process"""
+    global _listener, queue_handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    levels = parse_levels(LOG_LEVELS)
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter(levels=levels))
+    queue_handler.addFilter(RedactingFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(queue_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+def get_logging_stats() -> dict:
+    """Queue depth and dropped record count"""
+    if queue_handler is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "queue_size": queue_handler.queue.qsize(),
+        "queue_limit": LOG_QUEUE_SIZE,
+        "dropped": queue_handler.dropped,
+    }
@@ -0,0 +1,188 @@
+# backend/app/core/metrics.py
+"""
+Prometheus-style metrics.
+
+Counters are sharded per thread: the hot path only touches a dict owned by
+the current thread (event loop or threadpool worker), so no lock is taken
+per request. Shards are summed when /metrics is scraped. Metrics are per
+worker process and carry a ``worker`` label (pid).
+"""
+from threading import Lock, local
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Latency histogram buckets, seconds
+LATENCY_BUCKETS = tuple(
+    float(bucket) for bucket in
+    os.getenv("METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10").split(",")
+)
+WORKER = str(os.getpid())
+
+Labels = Tuple[str, ...]
+
+class _Sharded:
+    """Base for metrics whose values live in per-thread shards"""
+
+    def __init__(self, name: str, description: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._local = local()
+        self._shards: List[dict] = []
+        self._lock = Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = {}
+            # Lock only once per thread, when its shard is registered
+            with self._lock:
+                self._shards.append(shard)
+            self._local.values = shard
+        return shard
+
+    def _snapshot(self) -> List[dict]:
+        with self._lock:
+            return [dict(shard) for shard in self._shards]
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> Dict[Labels, float]:
+        totals: Dict[Labels, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, label_names: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Labels = ()):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # [bucket counts..., +Inf count, sum]
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[i] += 1
+                break
+        else:
+            entry[len(self.buckets)] += 1
+        entry[-1] += value
+
+    def collect(self) -> Dict[Labels, list]:
+        totals: Dict[Labels, list] = {}
+        for shard in self._snapshot():
+            for labels, entry in shard.items():
+                total = totals.setdefault(labels, [0] * len(entry))
+                for i, value in enumerate(entry):
+                    total[i] += value
+        return totals
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items()) + [("worker", WORKER)]
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _render_metric(metric) -> List[str]:
+    lines = [f"# HELP {metric.name} {metric.description}", f"# TYPE {metric.name} {metric.kind}"]
+    if metric.kind != "histogram":
+        for labels, value in sorted(metric.collect().items()):
+            lines.append(f"{metric.name}{_format_labels(metric.label_names, labels)} {value}")
+        return lines
+
+    for labels, entry in sorted(metric.collect().items()):
+        cumulative = 0
+        for bound, count in zip(metric.buckets, entry):
+            cumulative += count
+            le = {"le": repr(bound)}
+            lines.append(f"{metric.name}_bucket{_format_labels(metric.label_names, labels, le)} {cumulative}")
+        cumulative += entry[len(metric.buckets)]
+        lines.append(f"{metric.name}_bucket{_format_labels(metric.label_names, labels, {'le': '+Inf'})} {cumulative}")
+        lines.append(f"{metric.name}_sum{_format_labels(metric.label_names, labels)} {entry[-1]}")
+        lines.append(f"{metric.name}_count{_format_labels(metric.label_names, labels)} {cumulative}")
+    return lines
+
+# HTTP metrics
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+# SQL metrics
+db_queries_total = Counter("db_queries_total", "SQL statements executed, by route template", ("route",))
+db_queries_per_request = Histogram(
+    "db_queries_per_request", "SQL statements per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+db_query_seconds_total = Counter("db_query_seconds_total", "Time spent executing SQL, by route template", ("route",))
+db_nplusone_total = Counter("db_nplusone_total", "Requests with a statement repeated N+1-style", ("route",))
+
+REGISTRY = (
+    http_requests_total,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    db_queries_total,
+    db_queries_per_request,
+    db_query_seconds_total,
+    db_nplusone_total,
+)
+
+def route_template(scope: dict) -> str:
+    """Matched route path ('/api/v1/subscriptions/{subscription_id}'), never the raw URL"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def _render_pool_stats(pool_stats: dict) -> List[str]:
+    lines = []
+    gauges = (
+        ("db_pool_size", "size", "Configured connection pool size"),
+        ("db_pool_checked_out", "checked_out", "Connections currently checked out"),
+        ("db_pool_overflow", "overflow", "Overflow connections in use"),
+        ("db_pool_checkouts_total", "checkouts", "Connection checkouts"),
+        ("db_pool_slow_checkouts_total", "slow_checkouts", "Checkouts that waited longer than the slow threshold"),
+        ("db_pool_timeouts_total", "timeouts", "Checkouts that timed out"),
+    )
+    for name, key, description in gauges:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+        for engine_name, status in pool_stats.items():
+            value = status.get(key, (status.get("metrics") or {}).get(key))
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f"{name}{_format_labels(('engine',), (engine_name,))} {value}")
+    return lines
+
+def render_metrics(pool_stats: Optional[dict] = None) -> str:
+    """Prometheus text exposition of all metrics"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(_render_metric(metric))
+    if pool_stats:
+        lines.extend(_render_pool_stats(pool_stats))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,113 @@
+# backend/app/core/passwords.py
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from threading import Lock
+from typing import Callable, Dict, Tuple
+import asyncio
+import logging
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Password hashing pool configuration
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash/verify calls allowed to wait for a worker before new ones are rejected
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "1"))
+
+class PasswordHashPool:
+    """Dedicated thread pool for bcrypt with a queue-depth limit
+
+    bcrypt releases the GIL, so a small thread pool runs hashes in parallel
+    without taking slots from the shared threadpool used by sync endpoints.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._lock = Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_time = 0.0
+
+    async def run(self, func: Callable, *args):
+        """Run a hashing function on the pool, rejecting with 503 when the queue is full"""
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests, try again later",
+                    headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+                )
+            self.pending += 1
+
+        start_time = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.total_time += time.perf_counter() - start_time
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self.pending,
+                "queued": max(self.pending - self.workers, 0),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_time / self.completed * 1000, 1) if self.completed else 0.0,
+            }
+
+# Global password hashing pool
+password_pool = PasswordHashPool()
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 16,
+                            samples: int = 3) -> Tuple[int, Dict[int, float]]:
+    """Pick the highest bcrypt cost whose hash time stays within target_ms on this host
+
+    Returns the chosen cost and the median hash time (ms) of every cost tried.
+    """
+    from passlib.hash import bcrypt
+
+    chosen = min_rounds
+    measured: Dict[int, float] = {}
+    for rounds in range(min_rounds, max_rounds + 1):
+        hasher = bcrypt.using(rounds=rounds)
+        timings = []
+        for _ in range(samples):
+            start_time = time.perf_counter()
+            hasher.hash("calibration-password")
+            timings.append((time.perf_counter() - start_time) * 1000)
+        elapsed = sorted(timings)[len(timings) // 2]
+        measured[rounds] = elapsed
+        logger.info("bcrypt rounds=%d: %.0f ms", rounds, elapsed)
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+        # Каждый следующий cost в два раза дороже
+        if elapsed * 2 > target_ms:
+            break
+    return chosen, measured
+
+if __name__ == "__main__":
+    # python -m app.core.passwords [target_ms]
+    import sys
+
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else 250.0
+    print(f"⏱️ Calibrating bcrypt cost for ~{target:.0f} ms per hash...")
+    rounds, measured = calibrate_bcrypt_rounds(target)
+    for cost, elapsed in measured.items():
+        print(f"  rounds={cost}: {elapsed:.0f} ms")
+    print(f"✅ Recommended: BCRYPT_ROUNDS={rounds}")
@@ -0,0 +1,167 @@
+# backend/app/core/pool.py
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool, StaticPool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from threading import Lock
+from typing import Tuple
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool configuration: connections per worker process, shared by the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Share of the budget for the sync engine (Telegram bot, health checks); the rest goes to the async API
+DB_SYNC_POOL_SHARE = float(os.getenv("DB_SYNC_POOL_SHARE", "0.2"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side connection limit (Postgres max_connections), used for worker sizing
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+
+# Checkouts slower than this are counted as "slow waits"
+SLOW_CHECKOUT_SECONDS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_SECONDS", "0.1"))
+
+class PoolMetrics:
+    """Checkout-wait statistics for the connection pool"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        self.checkouts = 0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_timeout_at = None
+
+    def record_checkout(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            if wait >= SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+            self.last_timeout_at = time.time()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg_wait = self.total_wait / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "slow_checkouts": self.slow_checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(avg_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "last_timeout_at": self.last_timeout_at,
+            }
+
+# Global pool metrics instances (sync and async engines)
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+class _InstrumentedPoolMixin:
+    """Records how long callers wait for a connection"""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics = pool_metrics
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+def is_memory_sqlite(database_url: str) -> bool:
+    """Check if URL points to an in-memory SQLite database"""
+    if not database_url.startswith("sqlite"):
+        return False
+    return database_url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in database_url
+
+def split_pool_budget(total: int, sync_share: float = DB_SYNC_POOL_SHARE, minimum: int = 1) -> Tuple[int, int]:
+    """Split a per-worker connection count into (sync, async) parts
+
+    Each engine gets at least ``minimum`` connections, so the sum may exceed
+    a very small total.
+    """
+    sync = max(round(total * sync_share), minimum)
+    return sync, max(total - sync, minimum)
+
+def get_engine_kwargs(database_url: str, is_async: bool = False) -> dict:
+    """Build create_engine() pool arguments for the given database URL"""
+    connect_args = {"check_same_thread": False} if "sqlite" in database_url else {}
+
+    # In-memory SQLite lives inside a single connection, so it must be shared
+    if is_memory_sqlite(database_url):
+        return {"poolclass": StaticPool, "connect_args": connect_args}
+
+    # Оба движка живут в каждом воркере: делим один бюджет, а не удваиваем его
+    part = 1 if is_async else 0
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": split_pool_budget(DB_POOL_SIZE)[part],
+        "max_overflow": split_pool_budget(DB_MAX_OVERFLOW, minimum=0)[part],
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+def get_pool_status(engine) -> dict:
+    """Describe current pool usage and checkout-wait metrics"""
+    pool = engine.pool
+    metrics = getattr(pool, "metrics", None)
+    status = {
+        "pool_class": type(pool).__name__,
+        "metrics": metrics.snapshot() if metrics else None,
+    }
+
+    if not isinstance(pool, QueuePool):
+        return status
+
+    size = pool.size()
+    checked_out = pool.checkedout()
+    max_connections = size + pool._max_overflow
+    status.update({
+        "size": size,
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+        "checked_in": pool.checkedin(),
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),
+        "max_connections": max_connections,
+        "utilization": round(checked_out / max_connections, 3) if max_connections else 0.0,
+        "exhausted": checked_out >= max_connections,
+    })
+
+    return status
+
+def get_worker_budget(pool_statuses: dict) -> dict:
+    """Connections one worker can open across all its engines and the worker count that fits the database"""
+    max_connections = sum(status.get("max_connections", 0) for status in pool_statuses.values())
+    budget = {"max_connections_per_worker": max_connections}
+
+    # How many workers fit into the database's connection limit
+    if DB_MAX_CONNECTIONS and max_connections:
+        budget["db_max_connections"] = DB_MAX_CONNECTIONS
+        budget["recommended_max_workers"] = DB_MAX_CONNECTIONS // max_connections
+
+    return budget
@@ -0,0 +1,90 @@
+# backend/app/core/query_stats.py
+"""
+Per-request SQL statistics and N+1 detection.
+
+Engine event hooks add every statement and its duration to the QueryStats
+of the current request (a context variable set by the request middleware).
+The same SQL text executed many times within one request is reported as a
+likely N+1 pattern (e.g. lazy relationship loads inside a loop).
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import time
+import os
+
+from sqlalchemy import event
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Same statement repeated this many times in one request is reported as N+1
+NPLUSONE_THRESHOLD = int(os.getenv("NPLUSONE_THRESHOLD", "5"))
+
+class QueryStats:
+    """Statements executed during one request"""
+
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+
+    def repeated(self, threshold: int = NPLUSONE_THRESHOLD) -> Dict[str, int]:
+        """Statements executed at least `threshold` times"""
+        return {statement: n for statement, n in self.statements.items() if n >= threshold}
+
+# Stats of the current request; None outside requests
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_instrumented_engines: List = []
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.statements[statement] += 1
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    starts = conn.info.get("query_start")
+    if stats is not None and starts:
+        stats.duration += time.perf_counter() - starts.pop()
+
+def instrument_engine(engine):
+    """Track statements of the current request (sync Engine or AsyncEngine.sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        _instrumented_engines.append(engine)
+
+@contextmanager
+def query_budget(max_queries: int, engines: Optional[List] = None):
+    """Test helper: fail when the block executes more than max_queries statements
+
+    Counts statements on all instrumented engines (or the given ones) from
+    any thread, so it also covers requests made through TestClient:
+
+        with query_budget(3):
+            client.get("/api/v1/subscriptions", headers=headers)
+    """
+    engines = engines if engines is not None else list(_instrumented_engines)
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", record)
+
+    if len(statements) > max_queries:
+        listing = "\n".join(f"  {i + 1}. {statement}" for i, statement in enumerate(statements))
+        raise AssertionError(f"{len(statements)} queries executed, budget is {max_queries}:\n{listing}")
@@ -0,0 +1,229 @@
+# backend/app/core/sessions.py
+"""
+Session-backed tokens and revocation.
+
+Every login creates a UserSession row; its session_token is embedded into
+the JWTs as ``sid``. Logout deactivates the row and, once that is
+committed, adds the sid to a revocation set held in process memory, so
+checking a token costs one set lookup and no database round-trip. The memory
+backend reloads deactivated sessions from the database every
+REVOCATION_SYNC_SECONDS to pick up logouts handled by other workers. With
+REVOCATION_BACKEND=redis, revocations are also written to a Redis sorted set
+(score = expiry) and every worker pulls it at most once per
+REVOCATION_SYNC_SECONDS instead.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import secrets
+import time
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_BACKEND = os.getenv("REVOCATION_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REVOCATION_REDIS_KEY = os.getenv("REVOCATION_REDIS_KEY", "revoked_sessions")
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+
+class MemoryRevocationStore:
+    """Revoked session ids in a dict: sid -> expiry (unix time)
+
+    Reloaded from the database every ``reload_interval`` seconds: other
+    workers' logouts only reach this process that way.
+    """
+
+    def __init__(self, reload_interval: float = REVOCATION_SYNC_SECONDS):
+        self._lock = Lock()
+        self._revoked: Dict[str, float] = {}
+        self.reload_interval = reload_interval
+        self.loaded = False
+        self.loaded_at = 0.0
+
+    def needs_load(self) -> bool:
+        return not self.loaded or time.monotonic() - self.loaded_at >= self.reload_interval
+
+    def _add(self, revoked: Dict[str, float]):
+        with self._lock:
+            self._revoked.update(revoked)
+
+    def _purge(self, now: float):
+        with self._lock:
+            expired = [sid for sid, expires_at in self._revoked.items() if expires_at <= now]
+            for sid in expired:
+                del self._revoked[sid]
+
+    async def revoke(self, session_id: str, expires_at: float):
+        """Revoke a session until its tokens expire"""
+        self._add({session_id: expires_at})
+
+    async def is_revoked(self, session_id: str) -> bool:
+        expires_at = self._revoked.get(session_id)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            self._purge(time.time())
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._revoked)
+
+class RedisRevocationStore(MemoryRevocationStore):
+    """Memory store shared between workers through a Redis sorted set"""
+
+    def __init__(self, client, key: str = REVOCATION_REDIS_KEY, sync_interval: float = REVOCATION_SYNC_SECONDS):
+        super().__init__()
+        self.client = client
+        self.key = key
+        self.sync_interval = sync_interval
+        self._synced_at = 0.0
+
+    def needs_load(self) -> bool:
+        # Revocations of other workers arrive through sync()
+        return not self.loaded
+
+    async def sync(self):
+        """Pull revocations made by other workers and drop expired ones"""
+        now = time.time()
+        await self.client.zremrangebyscore(self.key, "-inf", now)
+        members = await self.client.zrangebyscore(self.key, now, "+inf", withscores=True)
+        self._purge(now)
+        self._add({
+            (sid.decode() if isinstance(sid, bytes) else sid): float(score)
+            for sid, score in members
+        })
+        self._synced_at = time.monotonic()
+
+    async def revoke(self, session_id: str, expires_at: float):
+        await super().revoke(session_id, expires_at)
+        await self.client.zadd(self.key, {session_id: expires_at})
+
+    async def is_revoked(self, session_id: str) -> bool:
+        if time.monotonic() - self._synced_at >= self.sync_interval:
+            try:
+                await self.sync()
+            except Exception as e:
+                # Redis недоступен: работаем с локальным набором
+                logger.warning("Revocation sync failed: %s", e)
+                self._synced_at = time.monotonic()
+        return await super().is_revoked(session_id)
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio sorted-set commands used here"""
+
+    def __init__(self):
+        self._zsets: Dict[str, Dict[str, float]] = {}
+
+    async def zadd(self, key: str, mapping: Dict[str, float]):
+        self._zsets.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def zrangebyscore(self, key: str, min_score, max_score, withscores: bool = False):
+        low, high = float(min_score), float(max_score)
+        members = sorted(
+            (score, member) for member, score in self._zsets.get(key, {}).items()
+            if low <= score <= high
+        )
+        if withscores:
+            return [(member.encode(), score) for score, member in members]
+        return [member.encode() for _, member in members]
+
+    async def zremrangebyscore(self, key: str, min_score, max_score):
+        low, high = float(min_score), float(max_score)
+        zset = self._zsets.get(key, {})
+        removed = [member for member, score in zset.items() if low <= score <= high]
+        for member in removed:
+            del zset[member]
+        return len(removed)
+
+def create_revocation_store(backend: str = REVOCATION_BACKEND):
+    """Build the revocation store configured by REVOCATION_BACKEND (memory|redis|fake)"""
+    if backend == "redis":
+        import redis.asyncio as redis
+        return RedisRevocationStore(redis.from_url(REDIS_URL))
+    if backend == "fake":
+        return RedisRevocationStore(FakeRedis())
+    return MemoryRevocationStore()
+
+# Global revocation store
+revocation_store = create_revocation_store()
+# Первые параллельные запросы ждут одну загрузку, а не грузят каждый сам
+_load_lock = asyncio.Lock()
+
+def _as_timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+async def create_session(db: AsyncSession, user_id: int, lifetime: timedelta,
+                         device_info: Optional[str] = None, ip_address: Optional[str] = None,
+                         user_agent: Optional[str] = None) -> str:
+    """Create a UserSession row (no commit) and return its session id"""
+    from ..models.database import UserSession
+
+    session_id = secrets.token_urlsafe(24)
+    db.add(UserSession(
+        user_id=user_id,
+        session_token=session_id,
+        device_info=device_info,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        expires_at=datetime.utcnow() + lifetime
+    ))
+    return session_id
+
+async def load_revocations(db: AsyncSession, store=None):
+    """Fill the store with deactivated sessions that have not expired yet"""
+    from ..models.database import UserSession
+
+    store = store or revocation_store
+    result = await db.execute(
+        select(UserSession.session_token, UserSession.expires_at).where(
+            and_(UserSession.is_active == False, UserSession.expires_at > datetime.utcnow())
+        )
+    )
+    for session_id, expires_at in result.all():
+        await store.revoke(session_id, _as_timestamp(expires_at))
+    store.loaded = True
+    store.loaded_at = time.monotonic()
+
+async def is_session_revoked(db: AsyncSession, session_id: str) -> bool:
+    """O(1) revocation check (deactivated sessions are loaded once and then every REVOCATION_SYNC_SECONDS)"""
+    if revocation_store.needs_load():
+        async with _load_lock:
+            if revocation_store.needs_load():
+                await load_revocations(db)
+    return await revocation_store.is_revoked(session_id)
+
+async def revoke_sessions(db: AsyncSession, user_id: int,
+                          session_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+    """Deactivate the user's sessions (all when session_ids is None), no commit
+
+    Returns (session id, expiry) pairs to pass to publish_revocations() after
+    the commit succeeded.
+    """
+    from ..models.database import UserSession
+
+    conditions = [UserSession.user_id == user_id, UserSession.is_active == True]
+    if session_ids is not None:
+        conditions.append(UserSession.session_token.in_(list(session_ids)))
+
+    result = await db.execute(select(UserSession).where(and_(*conditions)))
+    revoked = []
+    for session in result.scalars():
+        session.is_active = False
+        revoked.append((session.session_token, _as_timestamp(session.expires_at)))
+    return revoked
+
+async def publish_revocations(revoked: Iterable[Tuple[str, float]]):
+    """Revoke committed session deactivations in the revocation store"""
+    for session_id, expires_at in revoked:
+        await revocation_store.revoke(session_id, expires_at)
@@ -2,11 +2,22 @@
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 import os
+import secrets
 import time
+import logging
 from dotenv import load_dotenv
 
+from .core.logs import setup_logging, redact
+from .core import metrics
+from .core.query_stats import QueryStats, current_query_stats
+
+setup_logging()
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
+
 # Import our modules
 from .core.database import get_db, create_tables
 from .core.auth import auth_manager, get_current_user
@@ -20,12 +31,12 @@ def run_migration():
         from alembic import command
         import os
         
-        print("🔄 Running database migration...")
+        logger.info("Running database migration...")
         
         # Check database connection
         from .core.database import get_database_url
         db_url = get_database_url()
-        print(f"🔗 Database URL: {db_url[:50]}..." if len(db_url) > 50 else f"🔗 Database URL: {db_url}")
+        logger.debug("Database URL: %s", redact(db_url))
         
         # Test database connection
         try:
@@ -33,43 +44,43 @@ def run_migration():
             engine = create_engine(db_url)
             with engine.connect() as conn:
                 result = conn.execute(text("SELECT 1"))
-                print("✅ Database connection test successful!")
+                logger.info("Database connection test successful!")
                 
                 # Check if subscriptions table exists
                 result = conn.execute(text("SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'subscriptions'"))
                 table_exists = result.scalar()
-                print(f"📊 Subscriptions table exists: {table_exists > 0}")
+                logger.debug("Subscriptions table exists: %s", table_exists > 0)
                 
                 if table_exists > 0:
                     # Check current columns
                     result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name = 'subscriptions' ORDER BY ordinal_position"))
                     columns = [row[0] for row in result.fetchall()]
-                    print(f"📊 Current columns: {columns}")
+                    logger.debug("Current columns: %s", columns)
                     
                     # Check if advanced columns already exist
                     advanced_columns = ['subscription_type', 'has_trial', 'trial_start_date', 'interval_unit']
                     existing_advanced = [col for col in advanced_columns if col in columns]
-                    print(f"📊 Advanced columns already exist: {existing_advanced}")
+                    logger.debug("Advanced columns already exist: %s", existing_advanced)
                     
         except Exception as e:
-            print(f"❌ Database connection test failed: {e}")
+            logger.error("Database connection test failed: %s", e)
             return
         
         # Change to the root directory where alembic.ini is located
         os.chdir("/app")
-        print(f"📁 Current directory: {os.getcwd()}")
-        print(f"📁 Alembic.ini exists: {os.path.exists('alembic.ini')}")
-        print(f"📁 Files in /app: {os.listdir('/app')}")
-        print(f"📁 Alembic directory exists: {os.path.exists('alembic')}")
+        logger.debug("Current directory: %s", os.getcwd())
+        logger.debug("Alembic.ini exists: %s", os.path.exists('alembic.ini'))
+        logger.debug("Files in /app: %s", os.listdir('/app'))
+        logger.debug("Alembic directory exists: %s", os.path.exists('alembic'))
         if os.path.exists('alembic'):
-            print(f"📁 Files in alembic: {os.listdir('alembic')}")
+            logger.debug("Files in alembic: %s", os.listdir('alembic'))
             if os.path.exists('alembic/versions'):
-                print(f"📁 Files in alembic/versions: {os.listdir('alembic/versions')}")
+                logger.debug("Files in alembic/versions: %s", os.listdir('alembic/versions'))
         
         alembic_cfg = Config("alembic.ini")
-        print(f"📁 Alembic config loaded: {alembic_cfg}")
+        logger.debug("Alembic config loaded: %s", alembic_cfg)
         
-        print("🚀 Starting Alembic upgrade command...")
+        logger.info("Starting Alembic upgrade command...")
         
         # Add timeout and more detailed logging
         import signal
@@ -84,22 +95,26 @@ def run_migration():
         try:
             command.upgrade(alembic_cfg, "head")
             signal.alarm(0)  # Cancel timeout
-            print("✅ Database migration completed!")
-            print("🎉 All advanced subscription fields should now be available in the database!")
+            logger.info("Database migration completed!")
+            logger.info("All advanced subscription fields should now be available in the database!")
         except TimeoutError:
-            print("⏰ Migration timed out after 30 seconds")
-            print("❌ Migration may have failed or is taking too long")
+            logger.warning("Migration timed out after 30 seconds")
+            logger.error("Migration may have failed or is taking too long")
         except Exception as e:
             signal.alarm(0)  # Cancel timeout
-            print(f"❌ Migration failed with error: {e}")
+            logger.error("Migration failed with error: %s", e)
             raise
     except Exception as e:
-        print(f"⚠️ Migration failed (this might be normal for first run): {e}")
-        print(f"⚠️ Error details: {str(e)}")
+        logger.warning("Migration failed (this might be normal for first run): %s", e)
         # Continue anyway - tables will be created by create_tables()
 
 load_dotenv()
 
+# Debug mode: per-request SQL stats are added as X-DB-* response headers
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+# Bearer token for /metrics and the /debug/pool, /debug/cache, /debug/password-pool endpoints
+OPS_TOKEN = os.getenv("OPS_TOKEN", "")
+
 # Create FastAPI app
 app = FastAPI(
     title="Subscription Tracker API",
@@ -119,17 +134,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add request logging middleware
+# Add request logging and metrics middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    print(f"📥 Incoming request: {request.method} {request.url.path}")
-    print(f"🔑 Authorization header: {request.headers.get('authorization', 'Not present')}")
+    start_time = time.perf_counter()
+    queries = QueryStats()
+    queries_token = current_query_stats.set(queries)
+    metrics.http_requests_in_flight.inc()
+    status_code = 500
+    response = None
+    
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        process_time = time.perf_counter() - start_time
+        metrics.http_requests_in_flight.dec()
+        current_query_stats.reset(queries_token)
+        
+        # Route template keeps label cardinality bounded (no ids in labels)
+        route = metrics.route_template(request.scope)
+        metrics.http_requests_total.inc((request.method, route, str(status_code)))
+        metrics.http_request_duration_seconds.observe(process_time, (request.method, route))
+        metrics.db_queries_total.inc((route,), queries.count)
+        metrics.db_queries_per_request.observe(queries.count, (route,))
+        metrics.db_query_seconds_total.inc((route,), queries.duration)
+    
+    repeated = queries.repeated()
+    if repeated:
+        metrics.db_nplusone_total.inc((route,))
+        statement, times = max(repeated.items(), key=lambda item: item[1])
+        logger.warning(
+            "Possible N+1 in %s %s: statement executed %s times: %s",
+            request.method, route, times, statement[:200]
+        )
     
-    response = await call_next(request)
+    if DEBUG:
+        response.headers["X-DB-Query-Count"] = str(queries.count)
+        response.headers["X-DB-Query-Time-Ms"] = f"{queries.duration * 1000:.2f}"
+        if repeated:
+            response.headers["X-DB-Repeated-Queries"] = str(max(repeated.values()))
     
-    process_time = time.time() - start_time
-    print(f"📤 Response: {response.status_code} (took {process_time:.2f}s)")
+    access_logger.info(
+        "%s %s -> %s (%.1f ms)", request.method, request.url.path, status_code, process_time * 1000,
+        extra={"method": request.method, "path": request.url.path, "route": route,
+               "status": status_code, "duration_ms": round(process_time * 1000, 1),
+               "queries": queries.count, "db_ms": round(queries.duration * 1000, 2)}
+    )
     
     return response
 
@@ -210,6 +261,52 @@ def debug_data():
     finally:
         db.close()
 
+def require_ops_access(request: Request):
+    """Operational endpoints: OPS_TOKEN as a Bearer token, or any caller in DEBUG mode
+
+    Without DEBUG and OPS_TOKEN the endpoints do not exist (404).
+    """
+    if OPS_TOKEN:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and secrets.compare_digest(token.encode(), OPS_TOKEN.encode()):
+            return
+        if not DEBUG:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid ops token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    elif not DEBUG:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+# Debug endpoint to check connection pool usage
+@app.get("/debug/pool", dependencies=[Depends(require_ops_access)])
+def debug_pool():
+    """Debug endpoint to diagnose connection pool exhaustion"""
+    from .core.database import get_pool_report
+    return get_pool_report()
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_ops_access)])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (per worker process)"""
+    from .core.database import get_pool_stats
+    return PlainTextResponse(
+        metrics.render_metrics(get_pool_stats()),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/debug/cache", dependencies=[Depends(require_ops_access)])
+def debug_cache():
+    """Debug endpoint with in-process cache hit/miss counters"""
+    from .core.auth import user_cache, auth_manager
+    return {"users": user_cache.stats(), "tokens": auth_manager.token_cache.stats()}
+
+@app.get("/debug/password-pool", dependencies=[Depends(require_ops_access)])
+def debug_password_pool():
+    """Debug endpoint with bcrypt pool queue depth and timings"""
+    from .core.passwords import password_pool
+    return password_pool.stats()
+
 # Root endpoint
 @app.get("/")
 def root():
@@ -1,5 +1,7 @@
 # backend/app/models.py
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, DateTime, Text, Enum, Index
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -8,6 +10,13 @@ import enum
 
 Base = declarative_base()
 
+# SQLite хранит CURRENT_TIMESTAMP строкой без микросекунд; параметры сравнений
+# (курсор по created_at) должны иметь тот же формат, иначе строки не совпадают
+CreatedAt = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
 class FrequencyEnum(str, enum.Enum):
     DAILY = "daily"
     WEEKLY = "weekly"
@@ -37,6 +46,8 @@ class User(Base):
     last_login = Column(DateTime(timezone=True), nullable=True)
     timezone = Column(String, default="Europe/Moscow")
     language = Column(String, default="ru")
+    # Bumped on every change of the user's subscriptions (ETag source)
+    subscriptions_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     subscriptions = relationship("Subscription", back_populates="user", cascade="all, delete-orphan")
@@ -74,13 +85,22 @@ class Subscription(Base):
     provider = Column(String, nullable=True)  # Netflix, Spotify, etc.
     logo_url = Column(String, nullable=True)
     website_url = Column(String, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(CreatedAt, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     cancelled_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="subscriptions")
     notifications = relationship("Notification", back_populates="subscription", cascade="all, delete-orphan")
+    
+    # Индексы под реальные запросы (см. миграцию 002)
+    __table_args__ = (
+        # Upcoming billing, аналитика (candidate_filter), Telegram /list и /stats
+        Index("ix_subscriptions_user_active_billing", "user_id", "is_active", "next_billing_date"),
+        # Cursor-пагинация: порядок keyset_order() - (column IS NULL, column, id)
+        Index("ix_subscriptions_user_billing_keyset", user_id, next_billing_date.is_(None), next_billing_date, id),
+        Index("ix_subscriptions_user_created_keyset", user_id, created_at.is_(None), created_at, id),
+    )
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -128,7 +148,61 @@ class Analytics(Base):
     currency = Column(String, nullable=False)
     subscription_count = Column(Integer, default=0)
     category_breakdown = Column(Text, nullable=True)  # JSON string
+    rates_digest = Column(String, nullable=True)  # курсы, по которым посчитаны суммы
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    
+    # Один rollup на пользователя и период (месяц или год)
+    __table_args__ = (
+        Index("ix_analytics_user_period", "user_id", "period_start", "period_end", unique=True),
+    )
+
+class ExchangeRate(Base):
+    __tablename__ = "exchange_rates"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    currency = Column(String, unique=True, index=True, nullable=False)
+    rate = Column(Float, nullable=False)  # Стоимость 1 единицы валюты в базовой валюте
+    base_currency = Column(String, nullable=False)
+    source = Column(String, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+# Полнотекстовый поиск по подпискам (см. services/search.py и миграцию 006)
+# Postgres: GIN-индекс по взвешенному tsvector (name > provider > description)
+SUBSCRIPTION_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(provider, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+# SQLite: внешняя FTS5-таблица поверх subscriptions, синхронизируется триггерами
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS subscriptions_fts USING fts5("
+    "name, provider, description, content='subscriptions', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS subscriptions_fts_ai AFTER INSERT ON subscriptions BEGIN "
+    "INSERT INTO subscriptions_fts(rowid, name, provider, description) "
+    "VALUES (new.id, new.name, new.provider, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS subscriptions_fts_ad AFTER DELETE ON subscriptions BEGIN "
+    "INSERT INTO subscriptions_fts(subscriptions_fts, rowid, name, provider, description) "
+    "VALUES ('delete', old.id, old.name, old.provider, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS subscriptions_fts_au AFTER UPDATE OF name, provider, description ON subscriptions BEGIN "
+    "INSERT INTO subscriptions_fts(subscriptions_fts, rowid, name, provider, description) "
+    "VALUES ('delete', old.id, old.name, old.provider, old.description); "
+    "INSERT INTO subscriptions_fts(rowid, name, provider, description) "
+    "VALUES (new.id, new.name, new.provider, new.description); END",
+)
+
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Subscription.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Subscription.__table__, "after_create",
+    DDL(f"CREATE INDEX IF NOT EXISTS ix_subscriptions_search ON subscriptions USING gin (({SUBSCRIPTION_SEARCH_VECTOR}))")
+    .execute_if(dialect="postgresql")
+)
+event.listen(
+    Subscription.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS subscriptions_fts").execute_if(dialect="sqlite")
+)
@@ -1,259 +1,192 @@
 # backend/app/routers/analytics_simple.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, extract
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_, extract, select
 from typing import List, Optional
 from datetime import date, datetime, timedelta
-from collections import defaultdict
 import json
+import logging
 
-from ..core.database import get_db
+from ..core.database import get_async_db
 from ..core.auth import get_current_user, require_premium
 from ..models.database import User, Subscription, Analytics
 from ..schemas.schemas import AnalyticsResponse
+from ..services.rollups import month_bounds, year_bounds, get_rollup
+from ..services.projection import GRANULARITIES, load_schedule_rows, project
+from ..services.recurrence import add_interval
+from ..services.currency import BASE_CURRENCY, get_rates, rates_digest
+from ..services.versions import get_subscriptions_version
+from ..utils.etag import make_etag, etag_matches, not_modified
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.get("/monthly")
-def get_monthly_analytics(
+async def get_monthly_analytics(
+    request: Request,
+    response: Response,
     year: int = Query(None, description="Year for monthly analytics"),
     month: int = Query(None, description="Month for monthly analytics"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get monthly analytics for subscriptions - ULTRA SIMPLE VERSION"""
-    
+    """Get monthly analytics for subscriptions (served from rollups, with ETag)"""
+
     # Используем текущую дату, если параметры не указаны
     if year is None or month is None:
         now = datetime.now()
         year = now.year
         month = now.month
-    
-    print(f"🔍 Analytics request for {year}-{month:02d} by user {current_user.id}")
-    
+
+    logger.debug("Analytics request for %s-%02d by user %s", year, month, current_user.id)
+
     try:
         # Рассчитываем период
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = date(year, month + 1, 1) - timedelta(days=1)
-        
-        print(f"🔍 Period: {start_date} to {end_date}")
-        
-        # Подсчитываем подписки за период
-        total_subscriptions = db.query(Subscription).filter(
-            and_(
-                Subscription.user_id == current_user.id,
-                Subscription.is_active == True,
-                or_(
-                    # Recurring подписки с next_billing_date в периоде
-                    and_(
-                        Subscription.subscription_type == "recurring",
-                        Subscription.next_billing_date >= start_date,
-                        Subscription.next_billing_date <= end_date
-                    ),
-                    # One-time подписки созданные в периоде (или с start_date в периоде)
-                    and_(
-                        Subscription.subscription_type == "one_time",
-                        or_(
-                            # Если есть start_date - используем его
-                            and_(
-                                Subscription.start_date.isnot(None),
-                                Subscription.start_date >= start_date,
-                                Subscription.start_date <= end_date
-                            ),
-                            # Если start_date отсутствует - используем created_at
-                            and_(
-                                Subscription.start_date.is_(None),
-                                func.date(Subscription.created_at) >= start_date,
-                                func.date(Subscription.created_at) <= end_date
-                            )
-                        )
-                    )
-                )
-            )
-        ).count()
-        
-        print(f"🔍 Subscriptions in period: {total_subscriptions}")
-        
-        # Расчет расходов за период
-        total_spent = 0.0
-        subscriptions = db.query(Subscription).filter(
-            and_(
-                Subscription.user_id == current_user.id,
-                Subscription.is_active == True,
-                or_(
-                    # Recurring подписки с next_billing_date в периоде
-                    and_(
-                        Subscription.subscription_type == "recurring",
-                        Subscription.next_billing_date >= start_date,
-                        Subscription.next_billing_date <= end_date
-                    ),
-                    # One-time подписки созданные в периоде (или с start_date в периоде)
-                    and_(
-                        Subscription.subscription_type == "one_time",
-                        or_(
-                            # Если есть start_date - используем его
-                            and_(
-                                Subscription.start_date.isnot(None),
-                                Subscription.start_date >= start_date,
-                                Subscription.start_date <= end_date
-                            ),
-                            # Если start_date отсутствует - используем created_at
-                            and_(
-                                Subscription.start_date.is_(None),
-                                func.date(Subscription.created_at) >= start_date,
-                                func.date(Subscription.created_at) <= end_date
-                            )
-                        )
-                    )
-                )
-            )
-        ).all()
-        
-        # Расчет расходов с учетом пробных периодов и группировкой по категориям
-        category_breakdown = defaultdict(float)
-        
-        for sub in subscriptions:
-            print(f"🔍 Subscription: {sub.name} ({sub.subscription_type}) - {sub.amount} {sub.currency}")
-            
-            # Проверяем пробный период
-            if sub.has_trial and sub.trial_start_date and sub.trial_end_date:
-                # Если подписка в пробном периоде в этом месяце
-                if (sub.trial_start_date <= end_date and 
-                    sub.trial_end_date >= start_date):
-                    print(f"🔍 Trial period for {sub.name}: cost = 0")
-                    category_breakdown[sub.category or "uncategorized"] += 0
-                else:
-                    # Обычная подписка
-                    total_spent += sub.amount
-                    category_breakdown[sub.category or "uncategorized"] += sub.amount
-            else:
-                # Обычная подписка без пробного периода
-                total_spent += sub.amount
-                category_breakdown[sub.category or "uncategorized"] += sub.amount
-        
-        print(f"🔍 Total spent in period: {total_spent}")
-        print(f"🔍 Category breakdown: {dict(category_breakdown)}")
-        
-        return {
-            "user_id": current_user.id,
-            "period_start": start_date.isoformat(),
-            "period_end": end_date.isoformat(),
-            "total_spent": total_spent,
-            "currency": "RUB",
-            "subscription_count": total_subscriptions,
-            "category_breakdown": json.dumps(dict(category_breakdown))
-        }
-        
+        start_date, end_date = month_bounds(year, month)
+
+        # Результат зависит только от версии подписок, периода и курсов валют
+        version = await get_subscriptions_version(db, current_user.id)
+        rates = await get_rates(db)
+        etag = make_etag("analytics-monthly", current_user.id, version, year, month, rates_digest(rates))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        analytics = await get_rollup(db, current_user.id, start_date, end_date)
+
+        logger.debug("Total spent in period: %s", analytics['total_spent'])
+
+        response.headers["ETag"] = etag
+        return analytics
+
     except Exception as e:
-        print(f"❌ Error in analytics: {e}")
+        logger.error("Error in analytics: %s", e)
         return {"error": str(e)}
 
 @router.get("/yearly")
-def get_yearly_analytics(
+async def get_yearly_analytics(
     year: int = Query(None, description="Year for yearly analytics"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get yearly analytics for subscriptions"""
-    
+    """Get yearly analytics for subscriptions (served from rollups)"""
+
     # Используем текущий год, если не указан
     if year is None:
         year = datetime.now().year
-    
-    print(f"🔍 Yearly analytics request for {year} by user {current_user.id}")
-    
+
+    logger.debug("Yearly analytics request for %s by user %s", year, current_user.id)
+
     try:
         # Рассчитываем период (весь год)
-        start_date = date(year, 1, 1)
-        end_date = date(year, 12, 31)
-        
-        print(f"🔍 Year period: {start_date} to {end_date}")
-        
-        # Подсчитываем подписки за год
-        total_subscriptions = db.query(Subscription).filter(
-            and_(
-                Subscription.user_id == current_user.id,
-                Subscription.is_active == True,
-                or_(
-                    # Recurring подписки с next_billing_date в году
-                    and_(
-                        Subscription.subscription_type == "recurring",
-                        Subscription.next_billing_date >= start_date,
-                        Subscription.next_billing_date <= end_date
-                    ),
-                    # One-time подписки созданные в году
-                    and_(
-                        Subscription.subscription_type == "one_time",
-                        func.date(Subscription.created_at) >= start_date,
-                        func.date(Subscription.created_at) <= end_date
-                    )
-                )
-            )
-        ).count()
-        
-        print(f"🔍 Subscriptions in year: {total_subscriptions}")
-        
-        # Расчет расходов за год
-        total_spent = 0.0
-        subscriptions = db.query(Subscription).filter(
-            and_(
-                Subscription.user_id == current_user.id,
-                Subscription.is_active == True,
-                or_(
-                    # Recurring подписки с next_billing_date в году
-                    and_(
-                        Subscription.subscription_type == "recurring",
-                        Subscription.next_billing_date >= start_date,
-                        Subscription.next_billing_date <= end_date
-                    ),
-                    # One-time подписки созданные в году
-                    and_(
-                        Subscription.subscription_type == "one_time",
-                        func.date(Subscription.created_at) >= start_date,
-                        func.date(Subscription.created_at) <= end_date
-                    )
-                )
-            )
-        ).all()
-        
-        # Расчет расходов с учетом пробных периодов и группировкой по категориям
-        category_breakdown = defaultdict(float)
-        
-        for sub in subscriptions:
-            print(f"🔍 Yearly subscription: {sub.name} ({sub.subscription_type}) - {sub.amount} {sub.currency}")
-            
-            # Проверяем пробный период
-            if sub.has_trial and sub.trial_start_date and sub.trial_end_date:
-                # Если подписка в пробном периоде в этом году
-                if (sub.trial_start_date <= end_date and 
-                    sub.trial_end_date >= start_date):
-                    print(f"🔍 Trial period for {sub.name}: cost = 0")
-                    category_breakdown[sub.category or "uncategorized"] += 0
-                else:
-                    # Обычная подписка
-                    total_spent += sub.amount
-                    category_breakdown[sub.category or "uncategorized"] += sub.amount
-            else:
-                # Обычная подписка без пробного периода
-                total_spent += sub.amount
-                category_breakdown[sub.category or "uncategorized"] += sub.amount
-        
-        print(f"🔍 Total spent in year: {total_spent}")
-        print(f"🔍 Yearly category breakdown: {dict(category_breakdown)}")
-        
-        return {
-            "user_id": current_user.id,
-            "period_start": start_date.isoformat(),
-            "period_end": end_date.isoformat(),
-            "total_spent": total_spent,
-            "currency": "RUB",
-            "subscription_count": total_subscriptions,
-            "category_breakdown": json.dumps(dict(category_breakdown))
-        }
-        
+        start_date, end_date = year_bounds(year)
+
+        analytics = await get_rollup(db, current_user.id, start_date, end_date)
+
+        logger.debug("Total spent in year: %s", analytics['total_spent'])
+
+        return analytics
+
     except Exception as e:
-        print(f"❌ Error in yearly analytics: {e}")
+        logger.error("Error in yearly analytics: %s", e)
         return {"error": str(e)}
+
+@router.get("/forecast")
+async def get_spending_forecast(
+    months: int = Query(12, ge=1, le=36, description="Number of months to project"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Project spending per month and category from today over the next N months"""
+
+    start_date = date.today()
+    last_month = add_interval(start_date.replace(day=1), "month", months - 1)
+    _, end_date = month_bounds(last_month.year, last_month.month)
+
+    # Все активные подписки раскладываются на списания за один проход
+    rows = await load_schedule_rows(db, current_user.id, start_date, end_date)
+    projection = project(rows, start_date, end_date, granularity="month", rates=await get_rates(db))
+
+    categories = projection["categories"]
+    spent = projection["spent"]
+    monthly = []
+    for bucket, month_start in enumerate(projection["buckets"]):
+        month_start = month_start.astype(date)
+        monthly.append({
+            "month": month_start.strftime("%Y-%m"),
+            "total_spent": float(spent[bucket].sum()),
+            "category_breakdown": {
+                category: float(spent[bucket, code])
+                for code, category in enumerate(categories) if spent[bucket, code]
+            }
+        })
+
+    category_totals = spent.sum(axis=0)
+    return {
+        "user_id": current_user.id,
+        "period_start": start_date.isoformat(),
+        "period_end": end_date.isoformat(),
+        "months": months,
+        "currency": BASE_CURRENCY,
+        "total_spent": float(category_totals.sum()),
+        "category_totals": {
+            category: float(category_totals[code])
+            for code, category in enumerate(categories) if category_totals[code]
+        },
+        "monthly": monthly
+    }
+
+# Максимальное количество корзин в одном запросе timeseries
+MAX_TIMESERIES_BUCKETS = 260
+
+@router.get("/timeseries")
+async def get_spending_timeseries(
+    from_date: Optional[date] = Query(None, alias="from", description="Range start (default: 11 months ago)"),
+    to_date: Optional[date] = Query(None, alias="to", description="Range end (default: end of current month)"),
+    granularity: str = Query("month", description="Bucket size: month or week"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get spending for many periods in one request as columnar arrays"""
+
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"granularity must be one of: {list(GRANULARITIES)}"
+        )
+
+    today = date.today()
+    if to_date is None:
+        _, to_date = month_bounds(today.year, today.month)
+    if from_date is None:
+        from_date = add_interval(to_date.replace(day=1), "month", -11)
+    if from_date > to_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must not be after 'to'"
+        )
+
+    days = (to_date - from_date).days
+    buckets = days // 7 + 2 if granularity == "week" else days // 28 + 2
+    if buckets > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range too large (max {MAX_TIMESERIES_BUCKETS} buckets)"
+        )
+
+    # Все корзины считаются за один проход по списаниям
+    rows = await load_schedule_rows(db, current_user.id, from_date, to_date)
+    projection = project(rows, from_date, to_date, granularity=granularity, rates=await get_rates(db))
+    spent = projection["spent"]
+
+    return {
+        "user_id": current_user.id,
+        "period_start": from_date.isoformat(),
+        "period_end": to_date.isoformat(),
+        "granularity": granularity,
+        "currency": BASE_CURRENCY,
+        "buckets": [str(bucket) for bucket in projection["buckets"]],
+        "total_spent": spent.sum(axis=1).round(2).tolist(),
+        "charge_count": projection["charges"].sum(axis=1).tolist(),
+        "categories": projection["categories"],
+        "category_spent": spent.T.round(2).tolist()
+    }
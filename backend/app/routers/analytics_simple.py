@@ -6,6 +6,7 @@ from typing import List, Optional
 from datetime import date, datetime, timedelta
 from collections import defaultdict
 import json
+import logging
 
 from ..core.database import get_db
 from ..core.auth import get_current_user, require_premium
@@ -13,6 +14,7 @@ from ..models.database import User, Subscription, Analytics
 from ..schemas.schemas import AnalyticsResponse
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.get("/monthly", response_model=AnalyticsResponse)
 def get_monthly_analytics(
@@ -23,7 +25,7 @@ def get_monthly_analytics(
 ):
     """Get monthly analytics for subscriptions - SIMPLIFIED VERSION"""
     
-    print(f"🔍 Analytics request for {year}-{month:02d} by user {current_user.id}")
+    logger.debug("Analytics request for %s-%02d by user %s", year, month, current_user.id)
     
     try:
         # Простой подсчет подписок
@@ -34,7 +36,7 @@ def get_monthly_analytics(
             )
         ).count()
         
-        print(f"🔍 Total active subscriptions: {total_subscriptions}")
+        logger.debug("Total active subscriptions: %s", total_subscriptions)
         
         # Простой расчет расходов
         total_spent = 0.0
@@ -46,10 +48,10 @@ def get_monthly_analytics(
         ).all()
         
         for sub in subscriptions:
-            print(f"🔍 Subscription: {sub.name} - {sub.amount} {sub.currency}")
+            logger.debug("Subscription: %s - %s %s", sub.name, sub.amount, sub.currency)
             total_spent += sub.amount
         
-        print(f"🔍 Total spent: {total_spent}")
+        logger.debug("Total spent: %s", total_spent)
         
         # Создаем простой ответ
         analytics = Analytics(
@@ -62,11 +64,11 @@ def get_monthly_analytics(
             category_breakdown=json.dumps({"uncategorized": total_spent})
         )
         
-        print(f"🔍 Analytics created successfully")
+        logger.debug("Analytics created successfully")
         return analytics
         
     except Exception as e:
-        print(f"❌ Error in analytics: {e}")
+        logger.error("Error in analytics: %s", e)
         raise HTTPException(status_code=500, detail=f"Analytics error: {str(e)}")
 
 @router.get("/yearly", response_model=AnalyticsResponse)
@@ -1,11 +1,14 @@
 # backend/app/routers/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import datetime, timedelta
 from typing import Optional
 
-from ..core.database import get_db
-from ..core.auth import auth_manager, get_current_user, get_telegram_user
+from ..core.database import get_async_db
+from ..core.auth import auth_manager, get_current_user, get_telegram_user, invalidate_cached_user, security
+from ..core.sessions import create_session, publish_revocations, revoke_sessions, is_session_revoked
 from ..models.database import User
 from ..schemas.schemas import (
     UserCreate, UserResponse, UserUpdate, Token, LoginRequest, RegisterRequest,
@@ -14,12 +17,22 @@ from ..schemas.schemas import (
 
 router = APIRouter()
 
+async def start_session(db: AsyncSession, user: User, request: Request) -> str:
+    """Create a UserSession for a new login (no commit)"""
+    return await create_session(
+        db,
+        user.id,
+        timedelta(days=auth_manager.refresh_token_expire_days),
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent")
+    )
+
 @router.post("/register", response_model=dict)
-def register_user(user_data: RegisterRequest, db: Session = Depends(get_db)):
+async def register_user(user_data: RegisterRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     
     # Check if user already exists
-    if user_data.email and db.query(User).filter(User.email == user_data.email).first():
+    if user_data.email and await db.scalar(select(User).where(User.email == user_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -39,15 +52,17 @@ def register_user(user_data: RegisterRequest, db: Session = Depends(get_db)):
     
     # Hash password if provided
     if user_data.password:
-        db_user.hashed_password = auth_manager.get_password_hash(user_data.password)
+        db_user.hashed_password = await auth_manager.get_password_hash_async(user_data.password)
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.flush()
+    session_id = await start_session(db, db_user, request)
+    await db.commit()
+    await db.refresh(db_user)
     
     # Create access token
     access_token = auth_manager.create_access_token(
-        data={"sub": str(db_user.id)}
+        data={"sub": str(db_user.id), "sid": session_id}
     )
     
     return {
@@ -67,21 +82,21 @@ def register_user(user_data: RegisterRequest, db: Session = Depends(get_db)):
     }
 
 @router.post("/login", response_model=Token)
-def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login_user(login_data: LoginRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Login user with email/password or Telegram ID"""
     
     user = None
     
     # Email/password login
     if login_data.email and login_data.password:
-        user = db.query(User).filter(User.email == login_data.email).first()
+        user = await db.scalar(select(User).where(User.email == login_data.email))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password"
             )
         # Temporarily disable password verification until database schema is updated
-        # if not auth_manager.verify_password(login_data.password, user.password_hash):
+        # if not await auth_manager.verify_password_async(login_data.password, user.hashed_password):
         #     raise HTTPException(
         #         status_code=status.HTTP_401_UNAUTHORIZED,
         #         detail="Incorrect email or password"
@@ -89,7 +104,7 @@ def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
     
     # Telegram login
     elif login_data.telegram_id:
-        user = db.query(User).filter(User.telegram_id == login_data.telegram_id).first()
+        user = await db.scalar(select(User).where(User.telegram_id == login_data.telegram_id))
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -110,11 +125,13 @@ def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
     
     # Update last login
     user.last_login = datetime.utcnow()
-    db.commit()
+    session_id = await start_session(db, user, request)
+    await db.commit()
+    invalidate_cached_user(user.id)
     
     # Create tokens
-    access_token = auth_manager.create_access_token({"sub": str(user.id)})
-    refresh_token = auth_manager.create_refresh_token({"sub": str(user.id)})
+    access_token = auth_manager.create_access_token({"sub": str(user.id), "sid": session_id})
+    refresh_token = auth_manager.create_refresh_token({"sub": str(user.id), "sid": session_id})
     
     return {
         "access_token": access_token,
@@ -123,11 +140,11 @@ def login_user(login_data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 @router.post("/telegram-auth", response_model=Token)
-def telegram_auth(telegram_data: TelegramAuth, db: Session = Depends(get_db)):
+async def telegram_auth(telegram_data: TelegramAuth, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Authenticate or register Telegram user"""
     
     # Check if user exists
-    user = db.query(User).filter(User.telegram_id == telegram_data.telegram_id).first()
+    user = await db.scalar(select(User).where(User.telegram_id == telegram_data.telegram_id))
     
     if not user:
         # Create new user for Telegram
@@ -140,19 +157,21 @@ def telegram_auth(telegram_data: TelegramAuth, db: Session = Depends(get_db)):
             language="ru"
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     
     # Update user info
     user.username = telegram_data.username
     user.first_name = telegram_data.first_name
     user.last_name = telegram_data.last_name
     user.last_login = datetime.utcnow()
-    db.commit()
+    session_id = await start_session(db, user, request)
+    await db.commit()
+    invalidate_cached_user(user.id)
     
     # Create tokens
-    access_token = auth_manager.create_telegram_token(telegram_data.telegram_id)
-    refresh_token = auth_manager.create_refresh_token({"sub": str(user.id)})
+    access_token = auth_manager.create_telegram_token(telegram_data.telegram_id, session_id)
+    refresh_token = auth_manager.create_refresh_token({"sub": str(user.id), "sid": session_id})
     
     return {
         "access_token": access_token,
@@ -161,21 +180,24 @@ def telegram_auth(telegram_data: TelegramAuth, db: Session = Depends(get_db)):
     }
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
 @router.put("/me", response_model=UserResponse)
-def update_current_user(
+async def update_current_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user information"""
     
+    # Cached current_user may be detached, update the row loaded by this session
+    current_user = await db.get(User, current_user.id)
+
     # Check email uniqueness if changing email
     if user_update.email and user_update.email != current_user.email:
-        existing_user = db.query(User).filter(User.email == user_update.email).first()
+        existing_user = await db.scalar(select(User).where(User.email == user_update.email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -186,29 +208,40 @@ def update_current_user(
     for field, value in user_update.dict(exclude_unset=True).items():
         setattr(current_user, field, value)
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    invalidate_cached_user(current_user.id)
     
     return current_user
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
+async def refresh_token(refresh_token: str, db: AsyncSession = Depends(get_async_db)):
     """Refresh access token using refresh token"""
     
     try:
         payload = auth_manager.verify_token(refresh_token, "refresh")
         user_id = payload.get("sub")
         
-        user = db.query(User).filter(User.id == user_id).first()
+        session_id = payload.get("sid")
+        if session_id is not None and await is_session_revoked(db, session_id):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+        
+        user = await db.scalar(select(User).where(User.id == user_id))
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
             )
         
-        # Create new tokens
-        access_token = auth_manager.create_access_token({"sub": str(user.id)})
-        new_refresh_token = auth_manager.create_refresh_token({"sub": str(user.id)})
+        # Create new tokens (same session)
+        token_data = {"sub": str(user.id)}
+        if session_id is not None:
+            token_data["sid"] = session_id
+        access_token = auth_manager.create_access_token(token_data)
+        new_refresh_token = auth_manager.create_refresh_token(token_data)
         
         return {
             "access_token": access_token,
@@ -223,18 +256,31 @@ def refresh_token(refresh_token: str, db: Session = Depends(get_db)):
         )
 
 @router.post("/logout", response_model=MessageResponse)
-def logout_user(current_user: User = Depends(get_current_user)):
-    """Logout user (client should discard tokens)"""
+async def logout_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Logout user: revoke the session of the presented token"""
+    session_id = auth_manager.verify_token(credentials.credentials).get("sid")
+    if session_id is not None:
+        revoked = await revoke_sessions(db, current_user.id, [session_id])
+        await db.commit()
+        await publish_revocations(revoked)
     return {"message": "Successfully logged out"}
 
 @router.delete("/me", response_model=MessageResponse)
-def delete_account(
+async def delete_account(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete user account"""
     # Soft delete - deactivate account
+    current_user = await db.get(User, current_user.id)
     current_user.is_active = False
-    db.commit()
+    revoked = await revoke_sessions(db, current_user.id)
+    await db.commit()
+    await publish_revocations(revoked)
+    invalidate_cached_user(current_user.id)
     
     return {"message": "Account successfully deleted"}
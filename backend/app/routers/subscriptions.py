@@ -1,31 +1,77 @@
 # backend/app/routers/subscriptions.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select, func, delete
+from typing import List, Optional, Union
 from datetime import date, datetime, timedelta
+from uuid import uuid4
+import logging
 
-from ..core.database import get_db
+from ..core.database import get_async_db
 from ..core.auth import get_current_user, require_premium
-from ..models.database import User, Subscription, FrequencyEnum
+from ..models.database import User, Subscription, Notification, FrequencyEnum
 from ..schemas.schemas import (
     SubscriptionCreate, SubscriptionUpdate, SubscriptionResponse,
-    PaginationParams, PaginatedResponse, MessageResponse
+    PaginationParams, PaginatedResponse, CursorPaginatedResponse, MessageResponse,
+    BulkCreateRequest, BulkUpdateRequest, BulkDeleteRequest, BulkResponse
 )
+from ..services.rollups import affected_window, refresh_rollups
+from ..services.search import search_terms, apply_search
+from ..services.export import EXPORT_FORMATS, EXPORT_MAX_DAYS, stream_subscriptions, stream_charges
+from ..services.importer import IMPORT_ENCODINGS, import_progress, import_subscriptions, new_progress
+from ..services.detection import detect_recurring, normalize_merchant, read_transactions
+from ..services.subscriptions import (
+    subscription_values, check_batch_size, item_error, validate_items, insert_subscriptions
+)
+from ..services.versions import bump_subscriptions_version, get_subscriptions_version
+from ..utils.pagination import (
+    CURSOR_SORT_KEYS, encode_cursor, decode_cursor, keyset_order, keyset_after
+)
+from ..utils.serialization import (
+    FastJSONResponse, SUBSCRIPTION_RESPONSE_COLUMNS, SUBSCRIPTION_COLUMNS_BY_NAME,
+    parse_fields, subscription_columns, rows_to_dicts
+)
+from ..utils.etag import make_etag, etag_matches, not_modified
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-@router.get("", response_model=PaginatedResponse)
-def get_subscriptions(
+@router.get("", response_model=Union[PaginatedResponse, CursorPaginatedResponse])
+async def get_subscriptions(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     category: Optional[str] = None,
     is_active: Optional[bool] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Keyset cursor; pass an empty value to start cursor mode"),
+    order_by: str = Query("next_billing_date", description="Cursor mode sort key: next_billing_date or created_at"),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,name,amount,currency,next_billing_date")
 ):
-    """Get user's subscriptions with pagination and filtering"""
+    """Get user's subscriptions with pagination and filtering
+    
+    Page mode (default) returns total/pages. Cursor mode (``cursor`` present)
+    skips the COUNT and returns ``next_cursor`` for the following page.
+    ``fields`` limits both the selected columns and the item keys.
+    Responses carry a strong ETag; a matching If-None-Match gets 304
+    without querying the subscriptions table.
+    """
+    
+    response_fields = parse_fields(fields)
+    if cursor is not None and order_by not in CURSOR_SORT_KEYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"order_by must be one of: {list(CURSOR_SORT_KEYS)}"
+        )
+    
+    # ETag = collection version + query string
+    version = await get_subscriptions_version(db, current_user.id)
+    etag = make_etag("subscriptions", current_user.id, version, request.url.query)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
     # Check free tier limit (temporarily disabled for testing)
     # if not current_user.is_premium:
@@ -36,91 +82,405 @@ def get_subscriptions(
     #             detail="Free tier limit reached. Upgrade to premium for unlimited subscriptions."
     #         )
     
-    # Build query
-    query = db.query(Subscription).filter(Subscription.user_id == current_user.id)
+    # Build query (only response columns, returned as rows instead of ORM objects)
+    # Cursor mode also needs the sort column to build next_cursor
+    columns = subscription_columns(response_fields, extra=(order_by,) if cursor is not None else ())
+    query = select(*columns).where(Subscription.user_id == current_user.id)
     
     # Apply filters
     if category:
-        query = query.filter(Subscription.category == category)
+        query = query.where(Subscription.category == category)
     
     if is_active is not None:
-        query = query.filter(Subscription.is_active == is_active)
-    
-    if search:
-        query = query.filter(
-            or_(
-                Subscription.name.ilike(f"%{search}%"),
-                Subscription.description.ilike(f"%{search}%"),
-                Subscription.provider.ilike(f"%{search}%")
+        query = query.where(Subscription.is_active == is_active)
+    
+    # Full-text search (prefix match on every term, see services/search.py)
+    search_rank = None
+    terms = search_terms(search)
+    if terms:
+        query, search_rank = apply_search(query, terms, db.get_bind().dialect.name)
+    
+    next_cursor = None
+    if cursor is not None:
+        # Keyset pagination over (sort column, id); order_by is validated above
+        sort_column = SUBSCRIPTION_COLUMNS_BY_NAME[order_by]
+        null_tail = False
+        if cursor:
+            value, last_id = decode_cursor(cursor, order_by)
+            query = query.where(keyset_after(sort_column, Subscription.id, value, last_id))
+            null_tail = value is None
+        
+        result = await db.execute(
+            query.order_by(*keyset_order(sort_column, Subscription.id, null_tail)).limit(size + 1)
+        )
+        subscriptions = result.all()
+        if len(subscriptions) > size:
+            subscriptions = subscriptions[:size]
+            last = subscriptions[-1]
+            next_cursor = encode_cursor(order_by, getattr(last, order_by), last.id)
+    else:
+        # Get total count
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        
+        # Best matches first when searching
+        if search_rank is not None:
+            query = query.order_by(search_rank, Subscription.id)
+        
+        # Apply pagination
+        offset = (page - 1) * size
+        result = await db.execute(query.offset(offset).limit(size))
+        subscriptions = result.all()
+        
+        # Calculate pages
+        pages = (total + size - 1) // size
+    
+    logger.debug("Returning %s subscriptions for user %s", len(subscriptions), current_user.id)
+    
+    # Rows are encoded straight to JSON: no per-item pydantic model, no re-validation
+    items = rows_to_dicts(subscriptions, response_fields)
+    
+    if cursor is not None:
+        return FastJSONResponse({
+            "items": items,
+            "size": size,
+            "next_cursor": next_cursor
+        }, headers={"ETag": etag})
+    
+    return FastJSONResponse({
+        "items": items,
+        "total": total,
+        "page": page,
+        "size": size,
+        "pages": pages
+    }, headers={"ETag": etag})
+
+@router.get("/search", response_model=List[SubscriptionResponse])
+async def search_subscriptions(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text; every word is matched as a prefix"),
+    limit: int = Query(10, ge=1, le=50),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Ranked search-as-you-type over name, provider and description"""
+    
+    terms = search_terms(q)
+    if not terms:
+        return FastJSONResponse([])
+    
+    response_fields = parse_fields(fields)
+    query = select(*subscription_columns(response_fields)).where(Subscription.user_id == current_user.id)
+    query, rank = apply_search(query, terms, db.get_bind().dialect.name)
+    query = query.order_by(rank, Subscription.id) if rank is not None else query.order_by(Subscription.name)
+    
+    result = await db.execute(query.limit(limit))
+    return FastJSONResponse(rows_to_dicts(result.all(), response_fields))
+
+@router.get("/export")
+async def export_subscriptions(
+    format: str = Query("csv", description="csv or ndjson"),
+    data: str = Query("subscriptions", description="subscriptions or charges (charge history)"),
+    fields: Optional[str] = Query(None, description="Comma-separated subscription fields"),
+    start_date: Optional[date] = Query(None, description="Charges from (default: one year before end_date)"),
+    end_date: Optional[date] = Query(None, description="Charges until (default: today)"),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream all subscriptions or their charge history as CSV / NDJSON
+    
+    Rows are fetched with a server-side cursor in chunks and written as they
+    arrive, so memory does not grow with the account size.
+    """
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {list(EXPORT_FORMATS)}"
+        )
+    
+    if data == "subscriptions":
+        body = stream_subscriptions(current_user.id, subscription_columns(parse_fields(fields)), format)
+    elif data == "charges":
+        end_date = end_date or date.today()
+        start_date = start_date or end_date - timedelta(days=365)
+        if start_date > end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start_date must not be after end_date"
+            )
+        if (end_date - start_date).days >= EXPORT_MAX_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Period too long (max {EXPORT_MAX_DAYS} days)"
             )
+        body = stream_charges(current_user.id, start_date, end_date, format)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data must be one of: ['subscriptions', 'charges']"
         )
     
-    # Get total count
-    total = query.count()
+    filename = f"{data}-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/import")
+async def import_subscriptions_csv(
+    request: Request,
+    encoding: str = Query("utf-8", description="utf-8 or cp1251"),
+    delimiter: Optional[str] = Query(None, description="Field delimiter; detected from the header when omitted"),
+    default_frequency: FrequencyEnum = Query(FrequencyEnum.MONTHLY, description="Used when the file has no frequency column"),
+    debits_only: bool = Query(False, description="Bank statements: skip incoming rows and import only recurring debits"),
+    import_id: Optional[str] = Query(None, max_length=64, description="Client-chosen id for polling progress"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Import subscriptions from a CSV request body (text/csv)
+    
+    The body is parsed as it arrives and written in batches, each committed
+    separately; progress can be polled with GET /import/{import_id}.
+    Rows matching an existing subscription by (name, amount, provider) only
+    move its next billing date forward. Bank statements (``debits_only``)
+    are imported as the recurring charges found in them, matched by
+    normalized merchant.
+    """
     
-    # Apply pagination
-    offset = (page - 1) * size
-    subscriptions = query.offset(offset).limit(size).all()
+    if encoding not in IMPORT_ENCODINGS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"encoding must be one of: {list(IMPORT_ENCODINGS)}"
+        )
+    if delimiter is not None and len(delimiter) != 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="delimiter must be one character")
+    
+    import_id = import_id or uuid4().hex
+    progress = new_progress(import_id)
+    import_progress.set((current_user.id, import_id), progress)
+    
+    try:
+        await import_subscriptions(
+            db, current_user.id, request.stream(), progress,
+            encoding=encoding, delimiter=delimiter,
+            default_frequency=default_frequency.value, debits_only=debits_only
+        )
+    except Exception:
+        # Уже закоммиченные батчи остаются
+        progress["status"] = "failed"
+        raise
     
-    # Calculate pages
-    pages = (total + size - 1) // size
+    return progress
+
+@router.get("/import/{import_id}")
+async def get_import_progress(
+    import_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Progress of a running or recent import (same worker process)"""
     
-    # Debug logging
-    print(f"🔍 Returning {len(subscriptions)} subscriptions for user {current_user.id}")
-    for sub in subscriptions:
-        print(f"🔍 Subscription: name='{sub.name}', amount={sub.amount}, next_billing_date={sub.next_billing_date}")
-    
-    # Convert subscriptions to response format
-    subscription_responses = []
-    for sub in subscriptions:
-        try:
-            response = SubscriptionResponse.from_orm(sub).dict()
-            subscription_responses.append(response)
-            print(f"🔍 Converted subscription: {response}")
-        except Exception as e:
-            print(f"❌ Error converting subscription {sub.id}: {e}")
-            # Fallback: create response manually
-            subscription_responses.append({
-                "id": sub.id,
-                "name": sub.name,
-                "description": sub.description,
-                "amount": sub.amount,
-                "currency": sub.currency,
-                "frequency": sub.frequency,
-                "next_billing_date": sub.next_billing_date.isoformat() if sub.next_billing_date else None,
-                "is_active": sub.is_active,
-                "category": sub.category,
-                "provider": sub.provider,
-                "logo_url": sub.logo_url,
-                "website_url": sub.website_url,
-                "created_at": sub.created_at.isoformat() if sub.created_at else None,
-                "updated_at": sub.updated_at.isoformat() if sub.updated_at else None
-            })
-    
-    print(f"🔍 Final subscription_responses: {len(subscription_responses)} items")
-    
-    return PaginatedResponse(
-        items=subscription_responses,
-        total=total,
-        page=page,
-        size=size,
-        pages=pages
+    progress = import_progress.get((current_user.id, import_id))
+    if progress is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import not found")
+    return progress
+
+@router.post("/detect")
+async def detect_recurring_subscriptions(
+    request: Request,
+    encoding: str = Query("utf-8", description="utf-8 or cp1251"),
+    delimiter: Optional[str] = Query(None, description="Field delimiter; detected from the header when omitted"),
+    min_confidence: float = Query(0.0, ge=0, le=1),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Propose recurring subscriptions found in a CSV bank statement (nothing is saved)
+    
+    Transactions are grouped by normalized merchant and checked for weekly,
+    monthly or yearly periodicity. Proposals already tracked by the user
+    carry ``existing_id``; the rest can be created via POST /bulk.
+    """
+    
+    if encoding not in IMPORT_ENCODINGS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"encoding must be one of: {list(IMPORT_ENCODINGS)}"
+        )
+    if delimiter is not None and len(delimiter) != 1:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="delimiter must be one character")
+    
+    dates, merchants, amounts, currencies, invalid = await read_transactions(request.stream(), encoding, delimiter)
+    proposals = [
+        proposal for proposal in detect_recurring(dates, merchants, amounts, currencies, today=date.today())
+        if proposal["confidence"] >= min_confidence
+    ]
+    
+    # Отмечаем уже отслеживаемые подписки
+    result = await db.execute(
+        select(Subscription.id, Subscription.name, Subscription.currency)
+        .where(Subscription.user_id == current_user.id)
     )
+    tracked = {(normalize_merchant(row.name), row.currency): row.id for row in result.all()}
+    for proposal in proposals:
+        proposal["existing_id"] = tracked.get((proposal["name"].lower(), proposal["currency"]))
+    
+    return FastJSONResponse({
+        "transactions": len(dates),
+        "invalid": invalid,
+        "proposals": proposals
+    })
+
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_create_subscriptions(
+    payload: BulkCreateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many subscriptions in one transaction
+    
+    Items are validated one by one; invalid ones are listed in ``errors``
+    (by index) and the rest are inserted with a single INSERT ... RETURNING.
+    With ``atomic`` any invalid item rejects the whole batch (422).
+    """
+    
+    check_batch_size(len(payload.items))
+    valid, errors = validate_items(payload.items, SubscriptionCreate)
+    if errors and payload.atomic:
+        return FastJSONResponse({"items": [], "deleted": [], "errors": errors}, status_code=422)
+    
+    rows = await insert_subscriptions(db, current_user.id, [data for _, data in valid])
+    if rows:
+        await refresh_rollups(db, current_user.id, [affected_window(row) for row in rows])
+        await bump_subscriptions_version(db, current_user.id)
+        await db.commit()
+    
+    logger.info("Bulk create for user %s: %s created, %s rejected", current_user.id, len(rows), len(errors))
+    
+    return FastJSONResponse({"items": rows_to_dicts(rows), "deleted": [], "errors": errors})
+
+@router.patch("/bulk", response_model=BulkResponse)
+async def bulk_update_subscriptions(
+    payload: BulkUpdateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Update many subscriptions by id in one transaction (same fields as PUT /{id})"""
+    
+    check_batch_size(len(payload.items))
+    valid, errors = validate_items(payload.items, SubscriptionUpdate)
+    
+    # id is required and must be unique within the batch
+    updates = {}
+    for index, data in valid:
+        item_id = payload.items[index].get("id")
+        if not isinstance(item_id, int) or isinstance(item_id, bool):
+            errors.append(item_error(index, [{"loc": ["id"], "msg": "Integer id is required"}]))
+        elif item_id in updates:
+            errors.append(item_error(index, [{"loc": ["id"], "msg": "Duplicate id in batch"}], item_id))
+        else:
+            updates[item_id] = (index, data)
+    
+    # One SELECT for all subscriptions of the batch
+    subscriptions = {}
+    if updates:
+        result = await db.execute(select(Subscription).where(
+            and_(
+                Subscription.user_id == current_user.id,
+                Subscription.id.in_(list(updates))
+            )
+        ))
+        subscriptions = {subscription.id: subscription for subscription in result.scalars()}
+    for item_id, (index, _) in list(updates.items()):
+        if item_id not in subscriptions:
+            errors.append(item_error(index, [{"msg": "Subscription not found"}], item_id))
+            del updates[item_id]
+    
+    errors.sort(key=lambda error: error["index"])
+    if errors and payload.atomic:
+        return FastJSONResponse({"items": [], "deleted": [], "errors": errors}, status_code=422)
+    
+    rows = []
+    if updates:
+        windows = []
+        for item_id, (_, data) in updates.items():
+            subscription = subscriptions[item_id]
+            windows.append(affected_window(subscription))
+            for field, value in data.dict(exclude_unset=True).items():
+                setattr(subscription, field, value)
+            windows.append(affected_window(subscription))
+        
+        await refresh_rollups(db, current_user.id, windows)
+        await bump_subscriptions_version(db, current_user.id)
+        result = await db.execute(
+            select(*SUBSCRIPTION_RESPONSE_COLUMNS)
+            .where(Subscription.id.in_(list(updates)))
+            .order_by(Subscription.id)
+        )
+        rows = result.all()
+        await db.commit()
+    
+    return FastJSONResponse({"items": rows_to_dicts(rows), "deleted": [], "errors": errors})
+
+@router.delete("/bulk", response_model=BulkResponse)
+async def bulk_delete_subscriptions(
+    payload: BulkDeleteRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Delete many subscriptions by id in one transaction"""
+    
+    check_batch_size(len(payload.ids))
+    
+    # Columns needed to find the rollups affected by each subscription
+    result = await db.execute(select(*SUBSCRIPTION_RESPONSE_COLUMNS).where(
+        and_(
+            Subscription.user_id == current_user.id,
+            Subscription.id.in_(payload.ids)
+        )
+    ))
+    found = {row.id: row for row in result.all()}
+    
+    errors = []
+    seen = set()
+    for index, item_id in enumerate(payload.ids):
+        if item_id in seen:
+            errors.append(item_error(index, [{"loc": ["ids"], "msg": "Duplicate id in batch"}], item_id))
+        elif item_id not in found:
+            errors.append(item_error(index, [{"msg": "Subscription not found"}], item_id))
+        seen.add(item_id)
+    
+    if errors and payload.atomic:
+        return FastJSONResponse({"items": [], "deleted": [], "errors": errors}, status_code=422)
+    
+    deleted = sorted(found)
+    if deleted:
+        # Core DELETE skips ORM cascades: remove notifications explicitly
+        await db.execute(delete(Notification).where(Notification.subscription_id.in_(deleted)))
+        await db.execute(delete(Subscription).where(Subscription.id.in_(deleted)))
+        await refresh_rollups(db, current_user.id, [affected_window(row) for row in found.values()])
+        await bump_subscriptions_version(db, current_user.id)
+        await db.commit()
+    
+    logger.info("Bulk delete for user %s: %s deleted", current_user.id, len(deleted))
+    
+    return FastJSONResponse({"items": [], "deleted": deleted, "errors": errors})
 
 @router.get("/{subscription_id}", response_model=SubscriptionResponse)
-def get_subscription(
+async def get_subscription(
     subscription_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,name,amount,currency,next_billing_date")
 ):
     """Get specific subscription by ID"""
     
-    subscription = db.query(Subscription).filter(
+    response_fields = parse_fields(fields)
+    result = await db.execute(select(*subscription_columns(response_fields)).where(
         and_(
             Subscription.id == subscription_id,
             Subscription.user_id == current_user.id
         )
-    ).first()
+    ))
+    subscription = result.one_or_none()
     
     if not subscription:
         raise HTTPException(
@@ -128,19 +488,19 @@ def get_subscription(
             detail="Subscription not found"
         )
     
-    return subscription
+    return FastJSONResponse(rows_to_dicts([subscription], response_fields)[0])
 
 @router.post("", response_model=SubscriptionResponse)
-def create_subscription(
+async def create_subscription(
     subscription_data: SubscriptionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new subscription"""
     
     # Debug logging
-    print(f"🔍 Creating subscription for user {current_user.id}")
-    print(f"🔍 Subscription data received: {subscription_data.dict()}")
+    logger.debug("Creating subscription for user %s", current_user.id)
+    logger.debug("Subscription data received: %s", subscription_data.dict())
     
     # Check free tier limit (temporarily disabled for testing)
     # if not current_user.is_premium:
@@ -151,105 +511,44 @@ def create_subscription(
     #             detail="Free tier limit reached. Upgrade to premium for unlimited subscriptions."
     #         )
     
-    # Create subscription with all advanced fields
-    subscription = Subscription(
-        user_id=current_user.id,
-        name=subscription_data.name,
-        description=subscription_data.description,
-        amount=subscription_data.amount,
-        currency=subscription_data.currency,
-        next_billing_date=subscription_data.next_billing_date,
-        frequency=subscription_data.frequency,
-        subscription_type=subscription_data.subscription_type,
-        interval_unit=subscription_data.interval_unit,
-        interval_count=subscription_data.interval_count,
-        has_trial=subscription_data.has_trial,
-        trial_start_date=subscription_data.trial_start_date,
-        trial_end_date=subscription_data.trial_end_date,
-        start_date=subscription_data.start_date,
-        duration_type=subscription_data.duration_type,
-        duration_value=subscription_data.duration_value,
-        end_date=subscription_data.end_date,
-        category=subscription_data.category,
-        provider=subscription_data.provider,
-        logo_url=subscription_data.logo_url,
-        website_url=subscription_data.website_url,
-    )
+    # Create subscription with all advanced fields (derived dates included)
+    subscription = Subscription(**subscription_values(current_user.id, subscription_data))
     
-    print(f"🔍 Saving advanced fields: subscription_type={subscription_data.subscription_type}, has_trial={subscription_data.has_trial}")
-    
-    # Умная логика на основе типа подписки
-    if subscription_data.subscription_type == "one_time":
-        # Для одноразовых подписок - рассчитываем end_date
-        if subscription_data.start_date and subscription_data.duration_type and subscription_data.duration_value:
-            from datetime import timedelta
-            
-            start_date = subscription_data.start_date
-            duration_type = subscription_data.duration_type
-            duration_value = subscription_data.duration_value
-            
-            if duration_type == "days":
-                end_date = start_date + timedelta(days=duration_value)
-            elif duration_type == "weeks":
-                end_date = start_date + timedelta(weeks=duration_value)
-            elif duration_type == "months":
-                end_date = start_date + timedelta(days=duration_value * 30)
-            elif duration_type == "years":
-                end_date = start_date + timedelta(days=duration_value * 365)
-            
-            subscription.end_date = end_date
-            print(f"🔍 Calculated end_date for one_time subscription: {end_date}")
-    
-    elif subscription_data.subscription_type == "recurring":
-        # Для регулярных подписок - рассчитываем следующий платеж
-        if subscription_data.interval_unit and subscription_data.interval_count:
-            from datetime import timedelta
-            
-            current_date = subscription_data.next_billing_date
-            interval_unit = subscription_data.interval_unit
-            interval_count = subscription_data.interval_count
-            
-            if interval_unit == "day":
-                next_payment = current_date + timedelta(days=interval_count)
-            elif interval_unit == "week":
-                next_payment = current_date + timedelta(weeks=interval_count)
-            elif interval_unit == "month":
-                next_payment = current_date + timedelta(days=interval_count * 30)
-            elif interval_unit == "year":
-                next_payment = current_date + timedelta(days=interval_count * 365)
-            
-            subscription.next_billing_date = next_payment
-            print(f"🔍 Calculated next payment for recurring subscription: {next_payment}")
+    logger.debug("Saving advanced fields: subscription_type=%s, has_trial=%s", subscription_data.subscription_type, subscription_data.has_trial)
     
     # Логика для пробного периода
     if subscription_data.has_trial and subscription_data.trial_start_date and subscription_data.trial_end_date:
-        print(f"🔍 Trial period: {subscription_data.trial_start_date} to {subscription_data.trial_end_date}")
+        logger.debug("Trial period: %s to %s", subscription_data.trial_start_date, subscription_data.trial_end_date)
     
     db.add(subscription)
-    db.commit()
-    db.refresh(subscription)
+    await db.flush()
+    await db.refresh(subscription)
+    await refresh_rollups(db, current_user.id, [affected_window(subscription)])
+    await bump_subscriptions_version(db, current_user.id)
+    await db.commit()
     
-    print(f"🔍 Created subscription: {subscription.name}, amount: {subscription.amount}")
-    print(f"🔍 Subscription created successfully")
-    print(f"🔍 Subscription object: {subscription}")
+    logger.debug("Created subscription: %s, amount: %s", subscription.name, subscription.amount)
+    logger.debug("Subscription created successfully")
+    logger.debug("Subscription object: %s", subscription)
     
     return subscription
 
 @router.put("/{subscription_id}", response_model=SubscriptionResponse)
-def update_subscription(
+async def update_subscription(
     subscription_id: int,
     subscription_update: SubscriptionUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a subscription"""
     
-    subscription = db.query(Subscription).filter(
+    result = await db.execute(select(Subscription).where(
         and_(
             Subscription.id == subscription_id,
             Subscription.user_id == current_user.id
         )
-    ).first()
+    ))
+    subscription = result.scalar_one_or_none()
     
     if not subscription:
         raise HTTPException(
@@ -258,28 +557,33 @@ def update_subscription(
         )
     
     # Update fields
+    windows = [affected_window(subscription)]
     for field, value in subscription_update.dict(exclude_unset=True).items():
         setattr(subscription, field, value)
+    windows.append(affected_window(subscription))
     
-    db.commit()
-    db.refresh(subscription)
+    await refresh_rollups(db, current_user.id, windows)
+    await bump_subscriptions_version(db, current_user.id)
+    await db.commit()
+    await db.refresh(subscription)
     
     return subscription
 
 @router.delete("/{subscription_id}", response_model=MessageResponse)
-def delete_subscription(
+async def delete_subscription(
     subscription_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a subscription"""
     
-    subscription = db.query(Subscription).filter(
+    result = await db.execute(select(Subscription).where(
         and_(
             Subscription.id == subscription_id,
             Subscription.user_id == current_user.id
         )
-    ).first()
+    ))
+    subscription = result.scalar_one_or_none()
     
     if not subscription:
         raise HTTPException(
@@ -288,30 +592,33 @@ def delete_subscription(
         )
     
     # Hard delete - actually remove from database
-    print(f"🗑️ Deleting subscription {subscription_id} from database")
-    print(f"🗑️ Subscription name: {subscription.name}")
+    logger.debug("Deleting subscription %s (%s)", subscription_id, subscription.name)
     
-    db.delete(subscription)
-    db.commit()
+    windows = [affected_window(subscription)]
+    await db.delete(subscription)
+    await refresh_rollups(db, current_user.id, windows)
+    await bump_subscriptions_version(db, current_user.id)
+    await db.commit()
     
-    print(f"✅ Subscription {subscription_id} successfully deleted from database")
+    logger.info("Subscription %s deleted", subscription_id)
     
     return {"message": "Subscription successfully deleted"}
 
 @router.post("/{subscription_id}/activate", response_model=SubscriptionResponse)
-def activate_subscription(
+async def activate_subscription(
     subscription_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Activate a cancelled subscription"""
     
-    subscription = db.query(Subscription).filter(
+    result = await db.execute(select(Subscription).where(
         and_(
             Subscription.id == subscription_id,
             Subscription.user_id == current_user.id
         )
-    ).first()
+    ))
+    subscription = result.scalar_one_or_none()
     
     if not subscription:
         raise HTTPException(
@@ -322,25 +629,28 @@ def activate_subscription(
     subscription.is_active = True
     subscription.cancelled_at = None
     
-    db.commit()
-    db.refresh(subscription)
+    await refresh_rollups(db, current_user.id, [affected_window(subscription)])
+    await bump_subscriptions_version(db, current_user.id)
+    await db.commit()
+    await db.refresh(subscription)
     
     return subscription
 
 @router.post("/{subscription_id}/cancel", response_model=SubscriptionResponse)
-def cancel_subscription(
+async def cancel_subscription(
     subscription_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cancel a subscription"""
     
-    subscription = db.query(Subscription).filter(
+    result = await db.execute(select(Subscription).where(
         and_(
             Subscription.id == subscription_id,
             Subscription.user_id == current_user.id
         )
-    ).first()
+    ))
+    subscription = result.scalar_one_or_none()
     
     if not subscription:
         raise HTTPException(
@@ -351,46 +661,51 @@ def cancel_subscription(
     subscription.is_active = False
     subscription.cancelled_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(subscription)
+    await refresh_rollups(db, current_user.id, [affected_window(subscription)])
+    await bump_subscriptions_version(db, current_user.id)
+    await db.commit()
+    await db.refresh(subscription)
     
     return subscription
 
 @router.get("/upcoming/billing", response_model=List[SubscriptionResponse])
-def get_upcoming_billing(
+async def get_upcoming_billing(
     days: int = Query(30, ge=1, le=365),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,name,amount,currency,next_billing_date")
 ):
     """Get subscriptions with upcoming billing dates"""
     
+    response_fields = parse_fields(fields)
     today = date.today()
     future_date = today + timedelta(days=days)
     
-    subscriptions = db.query(Subscription).filter(
+    result = await db.execute(select(*subscription_columns(response_fields)).where(
         and_(
             Subscription.user_id == current_user.id,
             Subscription.is_active == True,
             Subscription.next_billing_date >= today,
             Subscription.next_billing_date <= future_date
         )
-    ).order_by(Subscription.next_billing_date).all()
+    ).order_by(Subscription.next_billing_date))
     
-    return subscriptions
+    return FastJSONResponse(rows_to_dicts(result.all(), response_fields))
 
 @router.get("/categories/list", response_model=List[str])
-def get_categories(
+async def get_categories(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get list of categories used by user"""
     
-    categories = db.query(Subscription.category).filter(
+    result = await db.execute(select(Subscription.category).where(
         and_(
             Subscription.user_id == current_user.id,
             Subscription.category.isnot(None)
         )
-    ).distinct().all()
+    ).distinct())
+    categories = result.all()
     
     return [cat[0] for cat in categories if cat[0]]
 
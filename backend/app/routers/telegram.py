@@ -7,20 +7,24 @@ import hmac
 import hashlib
 import json
 from datetime import datetime, timedelta
+import logging
 
 from ..core.database import get_db
-from ..core.auth import get_telegram_user, auth_manager
+from ..core.auth import get_telegram_user, auth_manager, invalidate_cached_user
 from ..models.database import User, Subscription, Notification, NotificationChannelEnum
 from ..schemas.schemas import TelegramWebhook, MessageResponse, Token
+from ..services.rollups import invalidate_rollups
+from ..services.versions import bump_subscriptions_version_sync
 import aiohttp
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 async def send_telegram_message(chat_id: int, text: str):
     """Send message via Telegram Bot API"""
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
     if not bot_token:
-        print(f"TELEGRAM_BOT_TOKEN not found, would send: {text}")
+        logger.warning("TELEGRAM_BOT_TOKEN not found, would send: %s", text)
         return
     
     url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
@@ -34,11 +38,11 @@ async def send_telegram_message(chat_id: int, text: str):
         async with aiohttp.ClientSession() as session:
             async with session.post(url, json=data) as response:
                 if response.status == 200:
-                    print(f"Message sent successfully to {chat_id}")
+                    logger.info("Message sent successfully to %s", chat_id)
                 else:
-                    print(f"Failed to send message: {await response.text()}")
+                    logger.warning("Failed to send message: %s", await response.text())
     except Exception as e:
-        print(f"Error sending message: {e}")
+        logger.error("Error sending message: %s", e)
 
 # Telegram Bot Commands
 BOT_COMMANDS = {
@@ -150,6 +154,7 @@ def get_or_create_telegram_user(telegram_id: int, telegram_user: dict, db: Sessi
         user.last_name = telegram_user.get("last_name")
         user.last_login = datetime.utcnow()
         db.commit()
+        invalidate_cached_user(user.id)
     
     return user
 
@@ -263,7 +268,7 @@ async def start_add_subscription(user: User):
 Частота: ежемесячно
     """
     
-    print(f"Starting add subscription for user {user.telegram_id}: {message}")
+    logger.debug("Starting add subscription for user %s: %s", user.telegram_id, message)
 
 async def send_statistics(user: User, db: Session):
     """Send spending statistics"""
@@ -380,6 +385,8 @@ async def parse_subscription_data(text: str, user: User, db: Session):
             )
             
             db.add(subscription)
+            invalidate_rollups(db, user.id)
+            bump_subscriptions_version_sync(db, user.id)
             db.commit()
             
             message = f"""
@@ -392,13 +399,13 @@ async def parse_subscription_data(text: str, user: User, db: Session):
 Используйте /list чтобы увидеть все подписки.
             """
             
-            print(f"Subscription added for user {user.telegram_id}: {message}")
+            logger.info("Subscription added for user %s: %s", user.telegram_id, message)
         else:
             await send_unknown_command(user)
             
     except Exception as e:
         message = f"❌ Ошибка при добавлении подписки: {str(e)}"
-        print(f"Error adding subscription for user {user.telegram_id}: {message}")
+        logger.error("Error adding subscription for user %s: %s", user.telegram_id, message)
 
 async def handle_callback_query(data: str, user: User, db: Session):
     """Handle callback queries from inline keyboards"""
@@ -1,6 +1,6 @@
 # backend/app/schemas.py
 from pydantic import BaseModel, EmailStr, validator
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import date, datetime
 from enum import Enum
 
@@ -254,6 +254,34 @@ class PaginatedResponse(BaseModel):
     size: int
     pages: int
 
+class CursorPaginatedResponse(BaseModel):
+    items: List[dict]
+    size: int
+    next_cursor: Optional[str] = None
+
+# Bulk Schemas (items are validated one by one, invalid ones are reported in errors)
+class BulkCreateRequest(BaseModel):
+    items: List[Dict[str, Any]]  # SubscriptionCreate fields
+    atomic: bool = False  # True: write nothing if any item is invalid
+
+class BulkUpdateRequest(BaseModel):
+    items: List[Dict[str, Any]]  # "id" + SubscriptionUpdate fields
+    atomic: bool = False
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[int]
+    atomic: bool = False
+
+class BulkItemError(BaseModel):
+    index: int
+    id: Optional[int] = None
+    errors: List[dict]
+
+class BulkResponse(BaseModel):
+    items: List[dict] = []
+    deleted: List[int] = []
+    errors: List[BulkItemError] = []
+
 # Telegram Bot Schemas
 class TelegramWebhook(BaseModel):
     update_id: int
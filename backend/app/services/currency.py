@@ -0,0 +1,142 @@
+# backend/app/services/currency.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from typing import Dict, Optional, Sequence
+import hashlib
+import json
+import logging
+import os
+import time
+from dotenv import load_dotenv
+
+import numpy as np
+
+from ..models.database import ExchangeRate, Analytics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Reporting currency for analytics totals
+BASE_CURRENCY = os.getenv("DEFAULT_CURRENCY", "RUB")
+EXCHANGE_RATES_FILE = os.getenv(
+    "EXCHANGE_RATES_FILE",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "exchange_rates.json")
+)
+EXCHANGE_RATE_TTL_SECONDS = int(os.getenv("EXCHANGE_RATE_TTL_SECONDS", "3600"))
+
+class RateCache:
+    """In-process exchange rate cache with TTL"""
+
+    def __init__(self, ttl: int = EXCHANGE_RATE_TTL_SECONDS):
+        self.ttl = ttl
+        self._rates: Optional[Dict[str, float]] = None
+        self._loaded_at = 0.0
+
+    def get(self) -> Optional[Dict[str, float]]:
+        if self._rates is None or time.monotonic() - self._loaded_at > self.ttl:
+            return None
+        return self._rates
+
+    def set(self, rates: Dict[str, float]):
+        self._rates = dict(rates)
+        self._loaded_at = time.monotonic()
+
+    def clear(self):
+        self._rates = None
+
+# Global rate cache instance
+rate_cache = RateCache()
+
+def load_rates_file(path: str = EXCHANGE_RATES_FILE) -> Dict[str, float]:
+    """Load rates (units of base currency per 1 unit) from the local rates file"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    rates = {currency.upper(): float(rate) for currency, rate in data["rates"].items()}
+    file_base = data.get("base", BASE_CURRENCY).upper()
+    if file_base != BASE_CURRENCY:
+        # Rebase file rates onto the reporting currency
+        if BASE_CURRENCY not in rates:
+            raise ValueError(f"Rates file has no rate for base currency {BASE_CURRENCY}")
+        base_rate = rates[BASE_CURRENCY]
+        rates = {currency: rate / base_rate for currency, rate in rates.items()}
+    rates[BASE_CURRENCY] = 1.0
+    return rates
+
+async def store_rates(db: AsyncSession, rates: Dict[str, float], source: str = "file"):
+    """Upsert rates into exchange_rates and drop stale analytics rollups"""
+    result = await db.execute(select(ExchangeRate))
+    existing = {row.currency: row for row in result.scalars()}
+
+    changed = False
+    for currency, rate in rates.items():
+        row = existing.get(currency)
+        if row is None:
+            db.add(ExchangeRate(currency=currency, rate=rate, base_currency=BASE_CURRENCY, source=source))
+            changed = True
+        elif row.rate != rate or row.base_currency != BASE_CURRENCY:
+            row.rate = rate
+            row.base_currency = BASE_CURRENCY
+            row.source = source
+            changed = True
+
+    # Rollups hold converted totals, recompute them with the new rates
+    if changed:
+        await db.execute(delete(Analytics))
+    await db.commit()
+    rate_cache.set(rates)
+
+async def get_rates(db: AsyncSession, refresh: bool = False) -> Dict[str, float]:
+    """Get exchange rates: process cache, then exchange_rates table, then rates file
+
+    ``refresh`` skips the process cache (rates may have been changed by another worker).
+    """
+    rates = None if refresh else rate_cache.get()
+    if rates is not None:
+        return rates
+
+    result = await db.execute(
+        select(ExchangeRate.currency, ExchangeRate.rate)
+        .where(ExchangeRate.base_currency == BASE_CURRENCY)
+    )
+    rates = {currency: rate for currency, rate in result.all()}
+    if not rates:
+        # Table not populated yet: use the bundled rates file
+        rates = load_rates_file()
+
+    rates[BASE_CURRENCY] = 1.0
+    rate_cache.set(rates)
+    return rates
+
+def rates_digest(rates: Dict[str, float]) -> str:
+    """Short digest of a rate table (part of analytics ETags)"""
+    payload = json.dumps(sorted(rates.items()), separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+def conversion_factors(currencies: Sequence[Optional[str]], rates: Dict[str, float]) -> np.ndarray:
+    """Vector of base-currency factors for a column of currency codes"""
+    codes, inverse = np.unique(
+        np.array([(currency or BASE_CURRENCY).upper() for currency in currencies], dtype=object),
+        return_inverse=True
+    )
+    missing = [code for code in codes if code not in rates]
+    if missing:
+        logger.warning("No exchange rate for %s, amounts left unconverted", missing)
+    factors = np.array([rates.get(code, 1.0) for code in codes], dtype=np.float64)
+    return factors[inverse]
+
+async def refresh_rates_from_file(path: str = EXCHANGE_RATES_FILE):
+    """Load the rates file into the exchange_rates table"""
+    from ..core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        await store_rates(db, load_rates_file(path), source=os.path.basename(path))
+
+if __name__ == "__main__":
+    # python -m app.services.currency [rates.json]
+    import asyncio
+    import sys
+
+    asyncio.run(refresh_rates_from_file(*sys.argv[1:2]))
+    print(f"✅ Exchange rates loaded, base currency {BASE_CURRENCY}")
@@ -0,0 +1,202 @@
+# backend/app/services/detection.py
+"""
+Recurring-charge detection over raw transactions.
+
+Transactions are grouped by (normalized merchant, currency), sorted once
+by (group, date) and analysed with NumPy: gaps between consecutive charges,
+median gap and regularity per group (bincount / sorted-segment tricks), and
+amount stability. Only detected groups reach Python code, so the cost is
+O(n log n) in the number of transactions with no pairwise comparisons.
+"""
+from fastapi import HTTPException, status
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+import re
+
+import numpy as np
+
+from .importer import IMPORT_MAX_ROWS, iter_csv_rows, map_header, parse_amount, parse_date
+from .recurrence import add_interval
+
+# frequency, interval unit, nominal gap in days, tolerance in days, min charges
+PERIODS = (
+    ("weekly", "week", 7.0, 2.0, 4),
+    ("monthly", "month", 30.44, 5.0, 3),
+    ("yearly", "year", 365.25, 15.0, 2),
+)
+
+# Share of gaps that must be within tolerance of the period
+DETECTION_MIN_REGULARITY = 0.75
+# Max coefficient of variation of the charged amounts
+DETECTION_MAX_AMOUNT_CV = 0.25
+
+# Words that are not part of the merchant name in bank descriptors
+MERCHANT_STOP_WORDS = {
+    "www", "com", "ru", "net", "org", "io", "inc", "ltd", "llc", "ооо", "ип",
+    "pos", "payment", "purchase", "card", "оплата", "покупка", "списание", "платеж", "карта",
+}
+MERCHANT_MAX_WORDS = 3
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def normalize_merchant(descriptor: str) -> str:
+    """'NETFLIX.COM 866-579-7172' -> 'netflix', 'Оплата YANDEX*PLUS' -> 'yandex plus'
+
+    Words with digits (card numbers, order ids), domain parts and payment
+    boilerplate are dropped; the first MERCHANT_MAX_WORDS remaining words are kept.
+    """
+    words = [
+        word for word in _WORD_RE.findall(str(descriptor).lower())
+        if word.isalpha() and word not in MERCHANT_STOP_WORDS
+    ]
+    return " ".join(words[:MERCHANT_MAX_WORDS])
+
+def _group_medians(values: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Median of values per group (NaN for empty groups) via one lexsort"""
+    medians = np.full(n_groups, np.nan)
+    if len(values) == 0:
+        return medians
+    order = np.lexsort((values, groups))
+    values, groups = values[order], groups[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    present = counts > 0
+    lo = starts[present] + (counts[present] - 1) // 2
+    hi = starts[present] + counts[present] // 2
+    medians[present] = (values[lo] + values[hi]) / 2.0
+    return medians
+
+def detect_recurring(dates: Sequence, merchants: Sequence[str], amounts: Sequence[float],
+                     currencies: Optional[Sequence[str]] = None, today: Optional[date] = None) -> List[Dict]:
+    """Propose recurring subscriptions from transactions
+
+    ``amounts`` may be signed (bank statements): when any amount is
+    negative only negative ones (debits) are analysed. Returns proposals
+    ready for SubscriptionCreate plus ``last_charge_date``, ``charges`` and
+    ``confidence``, best first. With ``today`` the next billing date is
+    rolled forward past it and lapsed subscriptions are left out.
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    amounts = np.asarray(amounts, dtype=np.float64)
+    merchants = np.asarray(merchants, dtype=object)
+    currencies = np.asarray(currencies if currencies is not None else ["RUB"] * len(days), dtype=object)
+
+    charge = amounts < 0 if (amounts < 0).any() else amounts > 0
+    days, amounts, merchants, currencies = days[charge], np.abs(amounts[charge]), merchants[charge], currencies[charge]
+    if len(days) == 0:
+        return []
+
+    # Нормализуем каждый уникальный дескриптор один раз
+    descriptors, descriptor_codes = np.unique(merchants.astype(str), return_inverse=True)
+    names = np.array([normalize_merchant(descriptor) for descriptor in descriptors], dtype=object)
+    keys = names[descriptor_codes] + "|" + np.char.upper(currencies.astype(str)).astype(object)
+    group_keys, groups = np.unique(keys.astype(str), return_inverse=True)
+    n_groups = len(group_keys)
+
+    order = np.lexsort((days, groups))
+    groups, days, amounts = groups[order], days[order].astype(np.int64), amounts[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    last = np.cumsum(counts) - 1
+
+    # Gaps between consecutive charges of the same group; same-day charges are merged
+    same_group = groups[1:] == groups[:-1]
+    gaps = np.diff(days)[same_group].astype(np.float64)
+    gap_groups = groups[1:][same_group]
+    positive = gaps > 0
+    gaps, gap_groups = gaps[positive], gap_groups[positive]
+    gap_counts = np.bincount(gap_groups, minlength=n_groups)
+
+    # Period by median gap
+    medians = _group_medians(gaps, gap_groups, n_groups)
+    nominal = np.array([period[2] for period in PERIODS])
+    tolerance = np.array([period[3] for period in PERIODS])
+    min_charges = np.array([period[4] for period in PERIODS])
+    period = np.full(n_groups, -1)
+    for index in range(len(PERIODS)):
+        period[np.abs(medians - nominal[index]) <= tolerance[index]] = index
+    detected = period >= 0
+
+    # Regularity: share of gaps close to the group's period
+    gap_period = period[gap_groups]
+    close = (gap_period >= 0) & (np.abs(gaps - nominal[gap_period]) <= tolerance[gap_period])
+    regularity = np.divide(
+        np.bincount(gap_groups, weights=close, minlength=n_groups), gap_counts,
+        out=np.zeros(n_groups), where=gap_counts > 0
+    )
+
+    # Amount stability
+    mean = np.bincount(groups, weights=amounts, minlength=n_groups) / counts
+    variance = np.bincount(groups, weights=amounts ** 2, minlength=n_groups) / counts - mean ** 2
+    cv = np.sqrt(np.maximum(variance, 0)) / mean
+
+    safe_period = np.maximum(period, 0)
+    candidates = (
+        detected
+        & (gap_counts + 1 >= min_charges[safe_period])
+        & (regularity >= DETECTION_MIN_REGULARITY)
+        & (cv <= DETECTION_MAX_AMOUNT_CV)
+        & ~np.char.startswith(group_keys, "|")
+    )
+    if today is not None:
+        # Подписка, не списывавшаяся дольше двух периодов, считается отменённой
+        lapsed = np.datetime64(today, "D").astype(np.int64) - days[last] > 2 * nominal[safe_period] + tolerance[safe_period]
+        candidates &= ~lapsed
+
+    proposals = []
+    for group in np.flatnonzero(candidates):
+        frequency, unit = PERIODS[period[group]][:2]
+        name, currency = str(group_keys[group]).rsplit("|", 1)
+        last_charge = days[last[group]].astype("datetime64[D]").astype(date)
+        next_billing = add_interval(last_charge, unit)
+        while today is not None and next_billing < today:
+            next_billing = add_interval(next_billing, unit)
+        proposals.append({
+            "name": name.title(),
+            "amount": round(float(amounts[last[group]]), 2),
+            "currency": currency,
+            "frequency": frequency,
+            "subscription_type": "recurring",
+            "interval_unit": unit,
+            "interval_count": 1,
+            "next_billing_date": next_billing,
+            "last_charge_date": last_charge,
+            "charges": int(counts[group]),
+            "confidence": round(float(regularity[group] * (1 - cv[group])), 3),
+        })
+    proposals.sort(key=lambda proposal: (-proposal["confidence"], proposal["name"]))
+    return proposals
+
+async def read_transactions(chunks: AsyncIterator[bytes], encoding: str = "utf-8",
+                            delimiter: Optional[str] = None) -> Tuple[List[date], List[str], List[float], List[str], int]:
+    """Parse a CSV statement (same columns as the import) into transaction lists
+
+    Returns dates, merchant descriptors, signed amounts, currencies and the
+    number of unparseable rows. The date column is required here.
+    """
+    dates, merchants, amounts, currencies = [], [], [], []
+    columns = None
+    invalid = 0
+    async for row in iter_csv_rows(chunks, encoding, delimiter):
+        if columns is None:
+            columns = map_header(row)
+            if "next_billing_date" not in columns:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CSV header has no date column")
+            continue
+        if len(dates) >= IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File has more than {IMPORT_MAX_ROWS} rows"
+            )
+        try:
+            values = {field: row[index].strip() for field, index in columns.items()}
+            day, amount = parse_date(values["next_billing_date"]), parse_amount(values["amount"])
+        except (IndexError, ValueError):
+            invalid += 1
+            continue
+        dates.append(day)
+        merchants.append(values["name"])
+        amounts.append(amount)
+        currencies.append(values.get("currency") or "RUB")
+    if columns is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CSV file is empty")
+    return dates, merchants, amounts, currencies, invalid
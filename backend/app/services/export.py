@@ -0,0 +1,126 @@
+# backend/app/services/export.py
+"""
+Streaming export of subscriptions and charge history (CSV / NDJSON).
+
+Rows are read through a server-side cursor in EXPORT_BATCH_SIZE chunks
+(``yield_per``) and every chunk is encoded and sent before the next one is
+fetched, so memory stays flat regardless of account size.
+
+Charge history is also bounded in time: the period is limited to
+EXPORT_MAX_DAYS and every chunk is expanded in EXPORT_WINDOW_DAYS windows,
+so a chunk never holds more than one window of charges.
+
+The generators open their own session: dependencies with ``yield`` are
+closed before a StreamingResponse body is sent.
+"""
+from sqlalchemy import select
+from datetime import date, timedelta
+from typing import AsyncIterator, Iterable, Iterator, List, Sequence, Tuple
+import csv
+import io
+import os
+from dotenv import load_dotenv
+
+import numpy as np
+import orjson
+
+from ..core.database import AsyncSessionLocal
+from ..models.database import Subscription
+from .projection import candidate_filter
+from .recurrence import SCHEDULE_COLUMNS, build_schedules, expand_schedules
+
+load_dotenv()
+
+# Rows fetched from the cursor per chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+# Longest charge history period per request
+EXPORT_MAX_DAYS = int(os.getenv("EXPORT_MAX_DAYS", "3660"))
+# Charges of a chunk are expanded window by window
+EXPORT_WINDOW_DAYS = int(os.getenv("EXPORT_WINDOW_DAYS", "92"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+CHARGE_FIELDS = ("date", "subscription_id", "name", "amount", "currency", "category", "free_trial")
+
+def _csv_value(value):
+    # Как в JSON-ответах: значение enum, даты в ISO 8601
+    if isinstance(value, date):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+def encode_rows(rows: Iterable[Sequence], fields: Sequence[str], fmt: str) -> bytes:
+    """Encode one chunk of rows (tuples in ``fields`` order)"""
+    if fmt == "ndjson":
+        return b"".join(
+            orjson.dumps(dict(zip(fields, row)), option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) + b"\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+def csv_header(fields: Sequence[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(fields)
+    return buffer.getvalue().encode()
+
+async def stream_subscriptions(user_id: int, columns: Tuple, fmt: str) -> AsyncIterator[bytes]:
+    """Subscriptions of the user, ordered by id"""
+    fields = [column.key for column in columns]
+    if fmt == "csv":
+        yield csv_header(fields)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(*columns)
+            .where(Subscription.user_id == user_id)
+            .order_by(Subscription.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            yield encode_rows(rows, fields, fmt)
+
+def charge_rows(rows: Sequence, start_date: date, end_date: date) -> List[tuple]:
+    """Charges of a chunk of schedule rows within the period, by subscription then date"""
+    index, dates, free = expand_schedules(build_schedules(rows), start_date, end_date)
+    order = np.lexsort((dates, index))
+    return [
+        (day.astype(date), rows[i].id, rows[i].name, 0.0 if is_free else rows[i].amount,
+         rows[i].currency, rows[i].category, bool(is_free))
+        for i, day, is_free in zip(index[order].tolist(), dates[order], free[order].tolist())
+    ]
+
+def date_windows(start_date: date, end_date: date, days: int = EXPORT_WINDOW_DAYS) -> Iterator[Tuple[date, date]]:
+    """Split [start_date, end_date] into consecutive windows of at most ``days`` days"""
+    step = timedelta(days=max(days, 1))
+    while start_date <= end_date:
+        window_end = min(start_date + step - timedelta(days=1), end_date)
+        yield start_date, window_end
+        start_date = window_end + timedelta(days=1)
+
+async def stream_charges(user_id: int, start_date: date, end_date: date, fmt: str) -> AsyncIterator[bytes]:
+    """Charge history of the user's active subscriptions within the period
+
+    Charges are expanded from the subscription schedules (the same model the
+    analytics endpoints use); trial charges are listed with amount 0. Within
+    a chunk of subscriptions rows go window by window, then by subscription
+    and date.
+    """
+    if fmt == "csv":
+        yield csv_header(CHARGE_FIELDS)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(
+            select(*SCHEDULE_COLUMNS, Subscription.name, Subscription.amount, Subscription.currency, Subscription.category)
+            .where(candidate_filter(user_id, start_date, end_date))
+            .order_by(Subscription.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            for window_start, window_end in date_windows(start_date, end_date, EXPORT_WINDOW_DAYS):
+                charges = charge_rows(rows, window_start, window_end)
+                if charges:
+                    yield encode_rows(charges, CHARGE_FIELDS, fmt)
@@ -0,0 +1,426 @@
+# backend/app/services/importer.py
+"""
+Streaming CSV import of subscriptions (own files and bank statements).
+
+The request body is decoded and parsed chunk by chunk; only the current
+batch of rows is kept in memory. Rows are mapped to SubscriptionCreate
+(so the usual validators apply), deduplicated by (name, amount, provider)
+against the file and the user's existing subscriptions, and written per
+batch: new subscriptions with one INSERT ... RETURNING, repeated charges
+of known ones as a bulk UPDATE of next_billing_date. Every batch is
+committed and its counters are published to ``import_progress``.
+
+Bank statements are recognised by their column names (Tinkoff / Sber
+style exports: "Дата операции", "Сумма операции", "Описание", ...),
+including ";" delimiters, decimal commas and cp1251 encoding. With
+``debits_only`` (statements) rows are not subscriptions yet: the debits are
+collected and only charges that recur (see detection.detect_recurring) are
+imported, one subscription per normalized merchant.
+"""
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from datetime import date, datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from array import array
+import codecs
+import csv
+import logging
+import os
+from dotenv import load_dotenv
+
+import numpy as np
+
+from ..core.cache import TTLCache
+from ..models.database import Subscription
+from ..schemas.schemas import SubscriptionCreate
+from .rollups import affected_window, refresh_rollups
+from .subscriptions import insert_subscriptions, subscription_values
+from .versions import bump_subscriptions_version
+
+load_dotenv()
+
+# Rows per INSERT/UPDATE batch (one commit each)
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+# Max data rows per file
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "100000"))
+# Max row errors kept in the report (the rest are only counted)
+IMPORT_MAX_ERRORS = 100
+IMPORT_ENCODINGS = ("utf-8", "cp1251")
+
+# Progress of recent imports: (user_id, import_id) -> counters (per worker process)
+import_progress = TTLCache(maxsize=1024, ttl=3600)
+
+logger = logging.getLogger(__name__)
+
+# Column names per SubscriptionCreate field, in priority order (lowercase)
+COLUMN_ALIASES = {
+    "name": ("name", "название", "merchant", "получатель", "описание", "description"),
+    "amount": ("amount", "сумма", "сумма операции", "сумма платежа"),
+    "currency": ("currency", "валюта", "валюта операции", "валюта платежа"),
+    "next_billing_date": ("next_billing_date", "date", "дата", "дата операции", "дата платежа"),
+    "frequency": ("frequency", "периодичность"),
+    "category": ("category", "категория"),
+    "provider": ("provider", "сервис", "провайдер"),
+}
+
+EPOCH = date(1970, 1, 1)
+
+FREQUENCY_UNITS = {"daily": "day", "weekly": "week", "monthly": "month", "yearly": "year"}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y")
+
+Key = Tuple[str, float, str]
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes], encoding: str = "utf-8",
+                        delimiter: Optional[str] = None) -> AsyncIterator[List[str]]:
+    """Parse CSV rows from a byte stream without buffering the whole file
+
+    A record is handed to the csv module only once all its quotes are
+    closed, so quoted fields may contain newlines and span chunks. The
+    delimiter (',' or ';') is detected from the header line when not given.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig" if encoding == "utf-8" else encoding)(errors="replace")
+    pending = ""
+    record: List[str] = []
+    quotes = 0
+
+    def complete_records(lines: List[str]) -> List[str]:
+        nonlocal record, quotes
+        records = []
+        for line in lines:
+            record.append(line)
+            quotes += line.count('"')
+            if quotes % 2 == 0:
+                records.append("\n".join(record))
+                record, quotes = [], 0
+        return records
+
+    async def records() -> AsyncIterator[str]:
+        nonlocal pending
+        async for chunk in chunks:
+            lines = (pending + decoder.decode(chunk)).split("\n")
+            pending = lines.pop()
+            for item in complete_records(lines):
+                yield item
+        tail = pending + decoder.decode(b"", final=True)
+        for item in complete_records([tail] if tail else []):
+            yield item
+        if record:
+            yield "\n".join(record)
+
+    async for text in records():
+        if not text.strip():
+            continue
+        if delimiter is None:
+            delimiter = ";" if text.count(";") > text.count(",") else ","
+        for row in csv.reader([text], delimiter=delimiter):
+            yield row
+
+def map_header(header: List[str]) -> Dict[str, int]:
+    """Column index per SubscriptionCreate field; name and amount are required"""
+    names = [column.strip().strip('"').lower() for column in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    missing = [field for field in ("name", "amount") if field not in columns]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"CSV header has no column for: {missing}. Known columns: {COLUMN_ALIASES}"
+        )
+    return columns
+
+def parse_amount(text: str) -> float:
+    """'-1 299,00' / '1,299.00' / '299' -> float"""
+    value = text.strip().replace("−", "-")
+    for space in (" ", " ", " ", "'"):
+        value = value.replace(space, "")
+    if "," in value and "." in value:
+        # Разделитель тысяч - тот, что стоит раньше
+        thousands = "," if value.index(",") < value.index(".") else "."
+        value = value.replace(thousands, "")
+    return float(value.replace(",", "."))
+
+def parse_date(text: str) -> date:
+    value = text.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value!r}")
+
+def map_row(row: List[str], columns: Dict[str, int], default_frequency: str, debits_only: bool) -> Optional[dict]:
+    """Raw CSV row -> SubscriptionCreate input (None = skip the row)
+
+    Amounts are taken as absolute values; with ``debits_only`` positive
+    amounts (incoming transfers in bank statements) are skipped. The row
+    date is the last charge: the next billing date is derived from it.
+    """
+    values = {field: row[index].strip() for field, index in columns.items() if index < len(row)}
+    if not any(values.values()):
+        return None
+
+    data = {key: value for key, value in values.items() if value}
+    if "amount" in data:
+        amount = parse_amount(data["amount"])
+        if debits_only and amount > 0:
+            return None
+        data["amount"] = abs(amount)
+    if "currency" in data:
+        data["currency"] = data["currency"].upper()
+
+    frequency = data.get("frequency", default_frequency).lower()
+    data["frequency"] = frequency
+    if "next_billing_date" in data:
+        data["next_billing_date"] = parse_date(data["next_billing_date"])
+        if frequency in FREQUENCY_UNITS:
+            data["interval_unit"] = FREQUENCY_UNITS[frequency]
+            data["interval_count"] = 1
+    return data
+
+def dedup_key(name: str, amount: float, provider: Optional[str],
+              normalize: Optional[Callable[[str], str]] = None) -> Key:
+    if normalize is not None:
+        name = normalize(name)
+    return (name.strip().casefold(), round(float(amount), 2), (provider or "").strip().casefold())
+
+class StatementDebits:
+    """Bank statement debits kept as compact columns until the end of the file
+
+    Per row only the date, a merchant code, the amount and a currency code
+    are stored; SubscriptionCreate input is built only for the charges that
+    detect_recurring() finds. One-off debits are dropped, and charges whose
+    descriptors differ only by order ids or payment boilerplate become one
+    subscription dated by the last charge.
+    """
+
+    def __init__(self):
+        # detection импортирует этот модуль
+        from .detection import normalize_merchant
+
+        self.normalize = normalize_merchant
+        self.days = array("q")  # days since 1970-01-01
+        self.amounts = array("d")
+        self.merchant_codes = array("l")
+        self.currency_codes = array("l")
+        self.merchants: Dict[str, int] = {}
+        self.currencies: Dict[str, int] = {}
+        # Per (merchant, currency): day and record number of the last charge, its category
+        self.last: Dict[Tuple[str, str], Tuple[int, int, Optional[str]]] = {}
+
+    def __len__(self):
+        return len(self.days)
+
+    def add(self, record: int, data: dict):
+        """Keep a mapped statement row (see map_row); ValueError for unusable rows"""
+        if "next_billing_date" not in data:
+            raise ValueError("Statement row has no date")
+        if not data.get("name") or not data.get("amount"):
+            raise ValueError("Statement row has no description or amount")
+        merchant = self.normalize(data["name"])
+        currency = data.get("currency", "RUB")
+        day = (data["next_billing_date"] - EPOCH).days
+
+        self.days.append(day)
+        self.amounts.append(data["amount"])
+        self.merchant_codes.append(self.merchants.setdefault(merchant, len(self.merchants)))
+        self.currency_codes.append(self.currencies.setdefault(currency, len(self.currencies)))
+        last = self.last.get((merchant, currency))
+        if last is None or day >= last[0]:
+            self.last[(merchant, currency)] = (day, record, data.get("category"))
+
+    def recurring(self, today: Optional[date] = None) -> List[Tuple[int, dict]]:
+        """(record of the last charge, SubscriptionCreate input) per recurring merchant
+
+        With ``today`` merchants that stopped charging are left out, as in /detect.
+        """
+        from .detection import detect_recurring
+
+        merchants = list(self.merchants)
+        currencies = list(self.currencies)
+        proposals = detect_recurring(
+            np.frombuffer(self.days, dtype=np.int64).astype("datetime64[D]"),
+            [merchants[code] for code in self.merchant_codes],
+            self.amounts,
+            [currencies[code] for code in self.currency_codes],
+            today=today
+        )
+        charges = []
+        for proposal in proposals:
+            _, record, category = self.last.get((proposal["name"].lower(), proposal["currency"]), (None, None, None))
+            charges.append((record, {
+                "name": proposal["name"],
+                "amount": proposal["amount"],
+                "currency": proposal["currency"],
+                "frequency": proposal["frequency"],
+                "interval_unit": proposal["interval_unit"],
+                "interval_count": proposal["interval_count"],
+                "next_billing_date": proposal["last_charge_date"],
+                "category": category,
+            }))
+        return charges
+
+class SubscriptionImporter:
+    """Deduplicates mapped rows and writes them in batches for one user"""
+
+    def __init__(self, db: AsyncSession, user_id: int, progress: dict, batch_size: int = IMPORT_BATCH_SIZE,
+                 normalize: Optional[Callable[[str], str]] = None):
+        self.db = db
+        self.user_id = user_id
+        self.progress = progress
+        self.batch_size = batch_size
+        # Statements: names are compared as normalized merchants
+        self.normalize = normalize
+        self.existing: Dict[Key, Tuple[int, Optional[date]]] = {}
+        self.pending: Dict[Key, Tuple[SubscriptionCreate, Optional[date]]] = {}
+
+    async def load_existing(self):
+        """Dedup keys of the user's subscriptions (one SELECT of four columns)"""
+        result = await self.db.execute(
+            select(Subscription.id, Subscription.name, Subscription.amount, Subscription.provider,
+                   Subscription.next_billing_date)
+            .where(Subscription.user_id == self.user_id)
+        )
+        for row in result.all():
+            key = dedup_key(row.name, row.amount, row.provider, self.normalize)
+            self.existing[key] = (row.id, row.next_billing_date)
+
+    async def add(self, data: SubscriptionCreate):
+        key = dedup_key(data.name, data.amount, data.provider, self.normalize)
+        next_date = subscription_values(self.user_id, data)["next_billing_date"]
+        current = self.pending.get(key)
+        if current is not None:
+            # Повтор в том же батче: оставляем самое позднее списание
+            self.progress["skipped"] += 1
+            if next_date is not None and (current[1] is None or next_date > current[1]):
+                self.pending[key] = (data, next_date)
+        else:
+            self.pending[key] = (data, next_date)
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """Insert new subscriptions, move next_billing_date of known ones forward, commit"""
+        if not self.pending:
+            return
+        inserts, updates, windows = [], [], []
+        for key, (data, next_date) in self.pending.items():
+            known = self.existing.get(key)
+            if known is None:
+                inserts.append((key, data))
+            elif next_date is not None and (known[1] is None or next_date > known[1]):
+                updates.append({"id": known[0], "next_billing_date": next_date})
+                windows.append((min(day for day in (known[1], next_date) if day is not None), None))
+                self.existing[key] = (known[0], next_date)
+            else:
+                self.progress["skipped"] += 1
+        self.pending = {}
+
+        rows = await insert_subscriptions(self.db, self.user_id, [data for _, data in inserts])
+        for (key, _), row in zip(inserts, rows):
+            self.existing[key] = (row.id, row.next_billing_date)
+            windows.append(affected_window(row))
+        if updates:
+            # ORM bulk UPDATE by primary key (executemany)
+            await self.db.execute(update(Subscription), updates)
+
+        if windows:
+            # Одно окно на батч: от самой ранней даты
+            start = min(window[0] for window in windows)
+            end = None if any(window[1] is None for window in windows) else max(window[1] for window in windows)
+            await refresh_rollups(self.db, self.user_id, [(start, end)])
+            await bump_subscriptions_version(self.db, self.user_id)
+        await self.db.commit()
+
+        self.progress["created"] += len(rows)
+        self.progress["updated"] += len(updates)
+        self.progress["batches"] += 1
+
+def new_progress(import_id: str) -> dict:
+    return {
+        "import_id": import_id,
+        "status": "running",
+        "rows": 0,
+        "created": 0,
+        "updated": 0,
+        "skipped": 0,
+        "invalid": 0,
+        "batches": 0,
+        "errors": [],
+    }
+
+def _row_error(progress: dict, record: int, errors: list):
+    # record: CSV record number, the header is 1
+    progress["invalid"] += 1
+    if len(progress["errors"]) < IMPORT_MAX_ERRORS:
+        progress["errors"].append({"row": record, "errors": errors})
+
+async def import_subscriptions(db: AsyncSession, user_id: int, chunks: AsyncIterator[bytes], progress: dict,
+                               encoding: str = "utf-8", delimiter: Optional[str] = None,
+                               default_frequency: str = "monthly", debits_only: bool = False) -> dict:
+    """Run an import from a CSV byte stream; ``progress`` is updated in place
+
+    With ``debits_only`` the file is a bank statement: its debits are kept
+    as compact columns until the end of the file and only recurring charges
+    are imported.
+    """
+    debits = StatementDebits() if debits_only else None
+    importer = SubscriptionImporter(db, user_id, progress, normalize=debits.normalize if debits else None)
+    await importer.load_existing()
+
+    rows = iter_csv_rows(chunks, encoding, delimiter)
+    columns = None
+    record = 0
+    async for row in rows:
+        record += 1
+        if columns is None:
+            columns = map_header(row)
+            continue
+
+        progress["rows"] += 1
+        if progress["rows"] > IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File has more than {IMPORT_MAX_ROWS} rows"
+            )
+        try:
+            data = map_row(row, columns, default_frequency, debits_only)
+            if data is None:
+                progress["skipped"] += 1
+                continue
+            if debits is not None:
+                debits.add(record, data)
+            else:
+                await importer.add(SubscriptionCreate.model_validate(data))
+        except ValidationError as error:
+            _row_error(progress, record, error.errors(include_url=False, include_context=False, include_input=False))
+        except ValueError as error:
+            _row_error(progress, record, [{"msg": str(error)}])
+
+    if columns is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CSV file is empty")
+    if debits is not None:
+        charges = debits.recurring(today=date.today())
+        # Разовые списания, прекратившиеся и повторы одной подписки
+        progress["skipped"] += len(debits) - len(charges)
+        for last_record, data in charges:
+            try:
+                await importer.add(SubscriptionCreate.model_validate(data))
+            except ValidationError as error:
+                _row_error(progress, last_record,
+                           error.errors(include_url=False, include_context=False, include_input=False))
+    await importer.flush()
+
+    progress["status"] = "done"
+    logger.info(
+        "Import %s for user %s: %s rows, %s created, %s updated, %s skipped, %s invalid",
+        progress["import_id"], user_id, progress["rows"], progress["created"],
+        progress["updated"], progress["skipped"], progress["invalid"]
+    )
+    return progress
@@ -0,0 +1,108 @@
+# backend/app/services/projection.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, and_, or_, select
+from datetime import date
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from ..models.database import Subscription
+from .recurrence import SCHEDULE_COLUMNS, build_schedules, expand_schedules
+from .currency import conversion_factors
+
+GRANULARITIES = ("month", "week")
+
+def candidate_filter(user_id: int, start_date: date, end_date: date):
+    """Active subscriptions that may have charges within the period"""
+    return and_(
+        Subscription.user_id == user_id,
+        Subscription.is_active == True,
+        or_(
+            # One-time: start_date (или created_at) в периоде
+            and_(
+                Subscription.subscription_type == "one_time",
+                or_(
+                    and_(
+                        Subscription.start_date.isnot(None),
+                        Subscription.start_date >= start_date,
+                        Subscription.start_date <= end_date
+                    ),
+                    and_(
+                        Subscription.start_date.is_(None),
+                        func.date(Subscription.created_at) >= start_date,
+                        func.date(Subscription.created_at) <= end_date
+                    )
+                )
+            ),
+            # Recurring: есть дата списания и подписка не закончилась до периода
+            and_(
+                Subscription.subscription_type != "one_time",
+                or_(
+                    Subscription.next_billing_date.isnot(None),
+                    Subscription.start_date.isnot(None)
+                ),
+                or_(
+                    Subscription.end_date.is_(None),
+                    Subscription.end_date >= start_date
+                )
+            )
+        )
+    )
+
+async def load_schedule_rows(db: AsyncSession, user_id: int, start_date: date, end_date: date) -> list:
+    """Load schedule columns of subscriptions that may charge within the range"""
+    result = await db.execute(
+        select(*SCHEDULE_COLUMNS, Subscription.amount, Subscription.currency, Subscription.category)
+        .where(candidate_filter(user_id, start_date, end_date))
+    )
+    return result.all()
+
+def bucket_start(days: np.ndarray, granularity: str) -> np.ndarray:
+    """Floor datetime64[D] values to the start of their month or ISO week"""
+    if granularity == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    # 1970-01-01 was a Thursday: shift so that weeks start on Monday
+    weekday = (days.astype(np.int64) + 3) % 7
+    return days - weekday.astype("timedelta64[D]")
+
+def bucket_range(start_date: date, end_date: date, granularity: str) -> np.ndarray:
+    """Start dates of all buckets covering [start_date, end_date]"""
+    first = bucket_start(np.array([start_date], dtype="datetime64[D]"), granularity)[0]
+    last = bucket_start(np.array([end_date], dtype="datetime64[D]"), granularity)[0]
+    if granularity == "month":
+        months = np.arange(first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1)
+        return months.astype("datetime64[D]")
+    return np.arange(first, last + 1, 7)
+
+def project(rows: Sequence, start_date: date, end_date: date, granularity: str = "month",
+            rates: Optional[Dict[str, float]] = None) -> dict:
+    """Expand all rows once and sum charges per (bucket, category)
+
+    Returns bucket start dates, category names and two (buckets x categories)
+    matrices: charged amount and number of charges (including free trial ones).
+    With ``rates`` amounts are converted to the base currency before summing.
+    """
+    buckets = bucket_range(start_date, end_date, granularity)
+    categories, category_codes = np.unique(
+        np.array([row.category or "uncategorized" for row in rows], dtype=object),
+        return_inverse=True
+    )
+    amounts = np.array([row.amount for row in rows], dtype=np.float64)
+    if rates is not None:
+        # Один курс на подписку, умножение векторное
+        amounts *= conversion_factors([row.currency for row in rows], rates)
+
+    index, dates, free = expand_schedules(build_schedules(rows), start_date, end_date)
+
+    bucket_codes = np.searchsorted(buckets, bucket_start(dates, granularity))
+    cells = bucket_codes * len(categories) + category_codes[index]
+    size = len(buckets) * len(categories)
+    charged = np.where(free, 0.0, amounts[index])
+
+    return {
+        "buckets": buckets,
+        "categories": [str(category) for category in categories],
+        "spent": np.bincount(cells, weights=charged, minlength=size).reshape(len(buckets), len(categories)),
+        "charges": np.bincount(cells, minlength=size).reshape(len(buckets), len(categories)),
+        "index": index,
+    }
@@ -0,0 +1,223 @@
+# backend/app/services/recurrence.py
+"""
+Recurrence engine: expands subscriptions into charge dates.
+
+Charge k of a recurring subscription is ``anchor + k * interval`` where the
+anchor is ``next_billing_date`` (or ``start_date``). Month/year intervals
+are calendar-correct: they are counted from the anchor and clamped to the
+month end (Jan 31 -> Feb 28 -> Mar 31), never approximated as 30/365 days.
+Charges are limited to the subscription lifetime (start_date or created_at
+up to end_date); charges inside a trial window are marked as free.
+"""
+from datetime import date, datetime
+from typing import Optional, Sequence, Tuple
+import calendar
+
+import numpy as np
+
+from ..models.database import Subscription
+
+# Internal unit codes
+UNIT_ONCE = 0
+UNIT_DAY = 1
+UNIT_MONTH = 2
+
+# interval_unit -> (unit code, multiplier)
+INTERVAL_UNITS = {
+    "day": (UNIT_DAY, 1),
+    "week": (UNIT_DAY, 7),
+    "month": (UNIT_MONTH, 1),
+    "year": (UNIT_MONTH, 12),
+}
+
+# frequency -> interval_unit
+FREQUENCY_UNITS = {
+    "daily": "day",
+    "weekly": "week",
+    "monthly": "month",
+    "yearly": "year",
+}
+
+# Columns needed to build charge schedules (select these instead of ORM rows)
+SCHEDULE_COLUMNS = (
+    Subscription.id,
+    Subscription.subscription_type,
+    Subscription.frequency,
+    Subscription.interval_unit,
+    Subscription.interval_count,
+    Subscription.next_billing_date,
+    Subscription.start_date,
+    Subscription.end_date,
+    Subscription.has_trial,
+    Subscription.trial_start_date,
+    Subscription.trial_end_date,
+    Subscription.created_at,
+)
+
+def normalize_unit(unit: Optional[str]) -> Optional[str]:
+    """Normalize 'months' / 'Month' to 'month'"""
+    if not unit:
+        return None
+    unit = unit.strip().lower()
+    if unit.endswith("s"):
+        unit = unit[:-1]
+    return unit if unit in INTERVAL_UNITS else None
+
+def add_interval(day: date, unit: str, count: int = 1) -> date:
+    """Add count units (day/week/month/year) to a date, clamping to month end"""
+    code, multiplier = INTERVAL_UNITS[normalize_unit(unit)]
+    step = count * multiplier
+    if code == UNIT_DAY:
+        return date.fromordinal(day.toordinal() + step)
+
+    months = day.year * 12 + (day.month - 1) + step
+    year, month = divmod(months, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+def resolve_interval(subscription_type, frequency, interval_unit, interval_count) -> Tuple[int, int]:
+    """Resolve subscription fields to (unit code, step)"""
+    frequency = getattr(frequency, "value", frequency)
+    if subscription_type == "one_time":
+        return UNIT_ONCE, 0
+
+    unit = normalize_unit(interval_unit) or FREQUENCY_UNITS.get(frequency)
+    if unit is None:
+        return UNIT_ONCE, 0
+
+    code, multiplier = INTERVAL_UNITS[unit]
+    return code, max(interval_count or 1, 1) * multiplier
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+def build_schedules(rows: Sequence) -> dict:
+    """Convert SCHEDULE_COLUMNS rows into NumPy arrays for expand_schedules()"""
+    count = len(rows)
+    unit = np.zeros(count, dtype=np.int8)
+    step = np.zeros(count, dtype=np.int64)
+    anchor = np.full(count, np.datetime64("NaT"), dtype="datetime64[D]")
+    lower = np.full(count, np.datetime64("NaT"), dtype="datetime64[D]")
+    upper = np.full(count, np.datetime64("NaT"), dtype="datetime64[D]")
+    trial_start = np.full(count, np.datetime64("NaT"), dtype="datetime64[D]")
+    trial_end = np.full(count, np.datetime64("NaT"), dtype="datetime64[D]")
+
+    for i, row in enumerate(rows):
+        unit[i], step[i] = resolve_interval(
+            row.subscription_type, row.frequency, row.interval_unit, row.interval_count
+        )
+        created = _as_date(row.created_at)
+        if unit[i] == UNIT_ONCE:
+            # One-time charge on start_date (created_at if missing)
+            first = row.start_date or created
+            if row.subscription_type != "one_time":
+                first = row.next_billing_date or first
+            start = first
+            end = None
+        else:
+            first = row.next_billing_date or row.start_date
+            start = row.start_date or created
+            if first is not None and (start is None or start > first):
+                start = first
+            end = row.end_date
+
+        if first is not None:
+            anchor[i] = first
+        if start is not None:
+            lower[i] = start
+        if end is not None:
+            upper[i] = end
+        if row.has_trial and row.trial_start_date and row.trial_end_date:
+            trial_start[i] = row.trial_start_date
+            trial_end[i] = row.trial_end_date
+
+    return {
+        "unit": unit,
+        "step": step,
+        "anchor": anchor,
+        "lower": lower,
+        "upper": upper,
+        "trial_start": trial_start,
+        "trial_end": trial_end,
+    }
+
+def _month_index(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[M]").astype(np.int64)
+
+def expand_schedules(schedules: dict, range_start: date, range_end: date):
+    """Expand all schedules into charges within [range_start, range_end]
+
+    Returns (index, dates, free): for every charge the row index it belongs
+    to, its date (datetime64[D]) and whether it falls into a trial window.
+    """
+    unit = schedules["unit"]
+    step = schedules["step"]
+    anchor = schedules["anchor"]
+    range_start = np.datetime64(range_start, "D")
+    range_end = np.datetime64(range_end, "D")
+
+    # Effective window per schedule: period clipped to the subscription lifetime
+    lower = schedules["lower"]
+    upper = schedules["upper"]
+    lo = np.where(np.isnat(lower) | (lower < range_start), range_start, lower)
+    hi = np.where(np.isnat(upper) | (upper > range_end), range_end, upper)
+
+    valid = ~np.isnat(anchor) & (lo <= hi)
+    safe_anchor = np.where(valid, anchor, range_start)
+    safe_step = np.where(step > 0, step, 1)
+
+    # Candidate k range per schedule
+    is_day = unit == UNIT_DAY
+    is_month = unit == UNIT_MONTH
+    day_lo = (lo - safe_anchor).astype(np.int64)
+    day_hi = (hi - safe_anchor).astype(np.int64)
+    anchor_month = _month_index(safe_anchor)
+    month_lo = _month_index(lo) - anchor_month
+    month_hi = _month_index(hi) - anchor_month
+
+    k_min = np.zeros(len(unit), dtype=np.int64)
+    k_max = np.zeros(len(unit), dtype=np.int64)
+    k_min = np.where(is_day, -((-day_lo) // safe_step), k_min)
+    k_max = np.where(is_day, day_hi // safe_step, k_max)
+    k_min = np.where(is_month, -((-month_lo) // safe_step), k_min)
+    k_max = np.where(is_month, month_hi // safe_step, k_max)
+
+    counts = np.where(valid, np.maximum(k_max - k_min + 1, 0), 0)
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, np.zeros(0, dtype="datetime64[D]"), np.zeros(0, dtype=bool)
+
+    # Flatten (schedule, k) pairs without a Python loop
+    index = np.repeat(np.arange(len(unit)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    k = np.repeat(k_min, counts) + offsets
+    k_step = k * safe_step[index]
+    base = safe_anchor[index]
+
+    # Day units: plain offset
+    day_dates = base + k_step.astype("timedelta64[D]")
+
+    # Month units: same day of month, clamped to month length
+    months = (anchor_month[index] + k_step).astype("datetime64[M]")
+    month_start = months.astype("datetime64[D]")
+    month_length = ((months + 1).astype("datetime64[D]") - month_start).astype(np.int64)
+    anchor_day = (base - base.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64)
+    month_dates = month_start + np.minimum(anchor_day, month_length - 1).astype("timedelta64[D]")
+
+    dates = np.where(unit[index] == UNIT_MONTH, month_dates, day_dates)
+
+    # Drop candidates outside the window (month units can land before lo)
+    keep = (dates >= lo[index]) & (dates <= hi[index])
+    index, dates = index[keep], dates[keep]
+
+    free = (dates >= schedules["trial_start"][index]) & (dates <= schedules["trial_end"][index])
+    return index, dates, free
+
+def charge_dates(subscription, range_start: date, range_end: date) -> list:
+    """All charge dates of a single subscription within the range"""
+    schedules = build_schedules([subscription])
+    _, dates, free = expand_schedules(schedules, range_start, range_end)
+    return [day.astype(date) for day in dates[~free]]
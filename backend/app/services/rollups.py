@@ -0,0 +1,169 @@
+# backend/app/services/rollups.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, and_, or_, select, delete, inspect
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+import json
+
+import numpy as np
+
+from ..models.database import Subscription, Analytics
+from .projection import load_schedule_rows, project
+from .currency import BASE_CURRENCY, get_rates, rates_digest
+
+Period = Tuple[date, date]
+
+def month_bounds(year: int, month: int) -> Period:
+    """First and last day of a month"""
+    start_date = date(year, month, 1)
+    if month == 12:
+        end_date = date(year + 1, 1, 1) - timedelta(days=1)
+    else:
+        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    return start_date, end_date
+
+def year_bounds(year: int) -> Period:
+    """First and last day of a year"""
+    return date(year, 1, 1), date(year, 12, 31)
+
+async def aggregate_period(db: AsyncSession, user_id: int, start_date: date, end_date: date,
+                           rates: Optional[Dict[str, float]] = None) -> dict:
+    """Sum all charges per category within the period, in the base currency"""
+
+    rows = await load_schedule_rows(db, user_id, start_date, end_date)
+    projection = project(rows, start_date, end_date, rates=rates or await get_rates(db))
+
+    # Подписки в пробном периоде учитываются в количестве, но ничего не стоят
+    spent = projection["spent"].sum(axis=0)
+    present = projection["charges"].sum(axis=0) > 0
+    category_breakdown = {
+        category: float(spent[code])
+        for code, category in enumerate(projection["categories"]) if present[code]
+    }
+
+    return {
+        "total_spent": float(spent.sum()),
+        "subscription_count": int(len(np.unique(projection["index"]))),
+        "category_breakdown": category_breakdown
+    }
+
+def rollup_to_dict(rollup: Analytics) -> dict:
+    """Convert stored rollup row to analytics response fields"""
+    return {
+        "user_id": rollup.user_id,
+        "period_start": rollup.period_start.isoformat(),
+        "period_end": rollup.period_end.isoformat(),
+        "total_spent": rollup.total_spent,
+        "currency": rollup.currency,
+        "subscription_count": rollup.subscription_count,
+        "category_breakdown": rollup.category_breakdown
+    }
+
+async def _store_rollup(db: AsyncSession, user_id: int, start_date: date, end_date: date,
+                        rates: Optional[Dict[str, float]] = None) -> Analytics:
+    """Recompute a period and replace its rollup row (no flush or commit)"""
+    rates = rates or await get_rates(db)
+    totals = await aggregate_period(db, user_id, start_date, end_date, rates)
+
+    await db.execute(delete(Analytics).where(
+        and_(
+            Analytics.user_id == user_id,
+            Analytics.period_start == start_date,
+            Analytics.period_end == end_date
+        )
+    ))
+    rollup = Analytics(
+        user_id=user_id,
+        period_start=start_date,
+        period_end=end_date,
+        total_spent=totals["total_spent"],
+        currency=BASE_CURRENCY,
+        subscription_count=totals["subscription_count"],
+        category_breakdown=json.dumps(totals["category_breakdown"]),
+        rates_digest=rates_digest(rates)
+    )
+    db.add(rollup)
+    return rollup
+
+async def get_rollup(db: AsyncSession, user_id: int, start_date: date, end_date: date) -> dict:
+    """Read a period rollup, recomputing and storing it on miss
+
+    A rollup converted with other exchange rates is a miss. Rates may have
+    been changed by another worker, so they are reloaded from the database
+    before the rollup is recomputed: a worker with a stale rate cache then
+    neither serves nor writes back rollups in the old rates.
+    """
+    rates = await get_rates(db)
+    rollup = await db.scalar(select(Analytics).where(
+        and_(
+            Analytics.user_id == user_id,
+            Analytics.period_start == start_date,
+            Analytics.period_end == end_date
+        )
+    ))
+    if rollup is not None and rollup.rates_digest == rates_digest(rates):
+        return rollup_to_dict(rollup)
+    if rollup is not None:
+        rates = await get_rates(db, refresh=True)
+        if rollup.rates_digest == rates_digest(rates):
+            return rollup_to_dict(rollup)
+
+    data = rollup_to_dict(await _store_rollup(db, user_id, start_date, end_date, rates))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Concurrent request stored the same period first
+        await db.rollback()
+    return data
+
+def affected_window(subscription: Subscription) -> Tuple[date, Optional[date]]:
+    """Date window whose rollups depend on this subscription (None = open-ended)
+
+    Accepts an ORM object or a selected row with the same column names.
+    """
+    # created_at is server-generated; never trigger a lazy load for it
+    state = inspect(subscription, raiseerr=False)
+    created_at = state.attrs.created_at.loaded_value if state is not None else subscription.created_at
+    days = [
+        subscription.next_billing_date,
+        subscription.start_date,
+        subscription.end_date,
+        subscription.trial_start_date,
+        subscription.trial_end_date,
+        created_at.date() if isinstance(created_at, datetime) else date.today(),
+    ]
+    days = [day for day in days if day is not None]
+
+    # Recurring charges repeat past next_billing_date, so the window is open-ended
+    if subscription.subscription_type == "one_time":
+        return min(days), max(days)
+    return min(days), None
+
+async def refresh_rollups(db: AsyncSession, user_id: int, windows: Iterable[Tuple[date, Optional[date]]]):
+    """Recompute the user's stored rollups overlapping the windows (no commit)"""
+    overlaps = [
+        and_(
+            Analytics.period_end >= window_start,
+            True if window_end is None else Analytics.period_start <= window_end
+        )
+        for window_start, window_end in windows
+    ]
+    if not overlaps:
+        return
+
+    await db.flush()
+    result = await db.execute(
+        select(Analytics.period_start, Analytics.period_end).where(
+            and_(Analytics.user_id == user_id, or_(*overlaps))
+        )
+    )
+    rates = await get_rates(db)
+    for start_date, end_date in result.all():
+        await _store_rollup(db, user_id, start_date, end_date, rates)
+    await db.flush()
+
+def invalidate_rollups(db: Session, user_id: int):
+    """Drop all rollups of a user from a sync session (recomputed on next read)"""
+    db.execute(delete(Analytics).where(Analytics.user_id == user_id))
@@ -0,0 +1,71 @@
+# backend/app/services/search.py
+"""
+Full-text search over subscription name, provider and description.
+
+Postgres matches a weighted tsvector (GIN index ix_subscriptions_search)
+against a prefix tsquery and ranks with ts_rank. SQLite joins the FTS5
+table subscriptions_fts and ranks with bm25. Every term is matched as a
+prefix, so "yand mus" finds "Yandex Music" while the user is still typing.
+Other dialects fall back to ILIKE.
+"""
+from sqlalchemy import and_, column, func, literal_column, or_, table
+from sqlalchemy.sql import Select
+from typing import List, Optional, Tuple
+import re
+
+from ..models.database import Subscription, SUBSCRIPTION_SEARCH_VECTOR
+
+# Extra terms beyond this are ignored (bounded query cost)
+MAX_SEARCH_TERMS = 8
+
+# Column weights for bm25: name, provider, description (same order as ts weights A, B, C)
+SQLITE_BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+subscriptions_fts = table("subscriptions_fts", column("rowid"))
+
+def search_terms(search: Optional[str]) -> List[str]:
+    """Split user input into lowercase word terms (punctuation and operators are dropped)"""
+    if not search:
+        return []
+    return _TERM_RE.findall(search.lower())[:MAX_SEARCH_TERMS]
+
+def tsquery_text(terms: List[str]) -> str:
+    """Postgres to_tsquery text: every term as a prefix, all required"""
+    return " & ".join(f"{term}:*" for term in terms)
+
+def fts5_query_text(terms: List[str]) -> str:
+    """SQLite FTS5 MATCH text: every term as a quoted prefix, all required"""
+    return " AND ".join(f'"{term}"*' for term in terms)
+
+def apply_search(query: Select, terms: List[str], dialect: str) -> Tuple[Select, Optional[object]]:
+    """Add the search filter to a subscriptions SELECT
+
+    Returns the query and an ORDER BY expression putting the best matches
+    first (None when the dialect has no ranking).
+    """
+    if dialect == "postgresql":
+        vector = literal_column(f"({SUBSCRIPTION_SEARCH_VECTOR})")
+        tsquery = func.to_tsquery(literal_column("'simple'"), tsquery_text(terms))
+        rank = func.ts_rank(vector, tsquery)
+        return query.where(vector.op("@@")(tsquery)), rank.desc()
+
+    if dialect == "sqlite":
+        fts = literal_column("subscriptions_fts")
+        query = (
+            query.join(subscriptions_fts, subscriptions_fts.c.rowid == Subscription.id)
+            .where(fts.op("MATCH")(fts5_query_text(terms)))
+        )
+        # bm25: lower is better
+        return query, func.bm25(fts, *SQLITE_BM25_WEIGHTS).asc()
+
+    # Без индекса: подстрока в любом из полей
+    return query.where(and_(*(
+        or_(
+            Subscription.name.ilike(f"%{term}%"),
+            Subscription.provider.ilike(f"%{term}%"),
+            Subscription.description.ilike(f"%{term}%")
+        )
+        for term in terms
+    ))), None
@@ -0,0 +1,112 @@
+# backend/app/services/subscriptions.py
+"""
+Building and bulk-writing subscriptions.
+
+subscription_values() turns a validated SubscriptionCreate into column
+values (including the derived end_date / next_billing_date) and is shared
+by the single create endpoint and the bulk endpoints. Bulk writes validate
+items one by one, so a bad row is reported by index instead of failing the
+whole batch, and insert all valid rows with one INSERT ... RETURNING.
+"""
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+import logging
+import os
+from dotenv import load_dotenv
+
+from ..models.database import Subscription
+from ..schemas.schemas import SubscriptionCreate
+from ..utils.serialization import SUBSCRIPTION_RESPONSE_COLUMNS
+from .recurrence import add_interval, normalize_unit
+
+load_dotenv()
+
+# Max items per bulk request
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "500"))
+
+logger = logging.getLogger(__name__)
+
+def subscription_values(user_id: int, data: SubscriptionCreate) -> Dict[str, Any]:
+    """Column values for a new subscription"""
+    values = {
+        "user_id": user_id,
+        "name": data.name,
+        "description": data.description,
+        "amount": data.amount,
+        "currency": data.currency,
+        "next_billing_date": data.next_billing_date,
+        "frequency": data.frequency,
+        "subscription_type": data.subscription_type,
+        "interval_unit": data.interval_unit,
+        "interval_count": data.interval_count,
+        "has_trial": data.has_trial,
+        "trial_start_date": data.trial_start_date,
+        "trial_end_date": data.trial_end_date,
+        "start_date": data.start_date,
+        "duration_type": data.duration_type,
+        "duration_value": data.duration_value,
+        "end_date": data.end_date,
+        "category": data.category,
+        "provider": data.provider,
+        "logo_url": data.logo_url,
+        "website_url": data.website_url,
+    }
+
+    # Умная логика на основе типа подписки
+    if data.subscription_type == "one_time":
+        # Для одноразовых подписок - рассчитываем end_date
+        # duration_type: days/weeks/months/years (indefinite - без end_date)
+        if data.start_date and data.duration_type and data.duration_value and normalize_unit(data.duration_type):
+            values["end_date"] = add_interval(data.start_date, data.duration_type, data.duration_value)
+            logger.debug("Calculated end_date for one_time subscription: %s", values["end_date"])
+
+    elif data.subscription_type == "recurring":
+        # Для регулярных подписок - рассчитываем следующий платеж
+        if data.next_billing_date and normalize_unit(data.interval_unit) and data.interval_count:
+            values["next_billing_date"] = add_interval(data.next_billing_date, data.interval_unit, data.interval_count)
+            logger.debug("Calculated next payment for recurring subscription: %s", values["next_billing_date"])
+
+    return values
+
+def check_batch_size(count: int, limit: int = BULK_MAX_ITEMS):
+    """Reject empty and oversized batches"""
+    if count == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Batch is empty")
+    if count > limit:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch has {count} items, the limit is {limit}"
+        )
+
+def item_error(index: int, errors: List[dict], item_id: Optional[int] = None) -> dict:
+    """Per-item error entry of a bulk response"""
+    return {"index": index, "id": item_id, "errors": errors}
+
+def validate_items(items: Iterable[Any], model: Type[BaseModel]) -> Tuple[List[Tuple[int, BaseModel]], List[dict]]:
+    """Validate each item separately: (index, model) for valid ones, error entries for the rest"""
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as error:
+            item_id = item.get("id") if isinstance(item, dict) else None
+            details = error.errors(include_url=False, include_context=False, include_input=False)
+            errors.append(item_error(index, details, item_id if isinstance(item_id, int) else None))
+    return valid, errors
+
+async def insert_subscriptions(db: AsyncSession, user_id: int, items: Sequence[SubscriptionCreate]) -> list:
+    """Insert subscriptions with one INSERT ... RETURNING (no commit)
+
+    Returns response column rows in the order of ``items``.
+    """
+    if not items:
+        return []
+    # RETURNING rows of a multi-row INSERT come in no guaranteed order; with
+    # sort_by_parameter_order SQLAlchemy correlates them to the parameters
+    # (PostgreSQL keeps one batched statement, SQLite inserts row by row)
+    statement = insert(Subscription).returning(*SUBSCRIPTION_RESPONSE_COLUMNS, sort_by_parameter_order=True)
+    result = await db.execute(statement, [subscription_values(user_id, data) for data in items])
+    return result.all()
@@ -0,0 +1,27 @@
+# backend/app/services/versions.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+
+from ..models.database import User
+
+def _bump_statement(user_id: int):
+    # updated_at stays as is: the user profile itself did not change
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(subscriptions_version=User.subscriptions_version + 1, updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+async def bump_subscriptions_version(db: AsyncSession, user_id: int):
+    """Mark the user's subscriptions as changed (no commit, part of the mutation)"""
+    await db.execute(_bump_statement(user_id))
+
+def bump_subscriptions_version_sync(db: Session, user_id: int):
+    """Same as bump_subscriptions_version() for sync sessions"""
+    db.execute(_bump_statement(user_id))
+
+async def get_subscriptions_version(db: AsyncSession, user_id: int) -> int:
+    """Current version of the user's subscriptions (primary key lookup on users)"""
+    return await db.scalar(select(User.subscriptions_version).where(User.id == user_id)) or 0
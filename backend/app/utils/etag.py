@@ -0,0 +1,22 @@
+# backend/app/utils/etag.py
+from fastapi import Request, Response
+import hashlib
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the values that fully determine a response"""
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against the ETag (weak comparison, as RFC 9110 requires)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the ETag"""
+    return Response(status_code=304, headers={"ETag": etag})
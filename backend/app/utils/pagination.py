@@ -0,0 +1,59 @@
+# backend/app/utils/pagination.py
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, true
+from datetime import date, datetime
+from typing import Optional, Tuple
+import base64
+import json
+
+# Sort keys allowed in cursor mode
+CURSOR_SORT_KEYS = ("next_billing_date", "created_at")
+
+def encode_cursor(sort_key: str, value, row_id: int) -> str:
+    """Encode keyset position into an opaque cursor token"""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    payload = json.dumps({"k": sort_key, "v": value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_key: str) -> Tuple[Optional[object], int]:
+    """Decode cursor token into (value, id) for the given sort key"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["k"] != sort_key:
+            raise ValueError("Cursor sort key mismatch")
+        value = payload["v"]
+        if value is not None:
+            if sort_key == "next_billing_date":
+                value = date.fromisoformat(value)
+            else:
+                value = datetime.fromisoformat(value)
+        return value, int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def keyset_order(column, id_column, null_tail: bool = False):
+    """Order by (column, id) with NULL values last
+
+    Matches the (user_id, column IS NULL, column, id) indexes, so pages are
+    read in index order. In the NULL tail (cursor value None) every row has
+    a NULL column and ordering by id alone keeps the index order.
+    """
+    if null_tail:
+        return (id_column,)
+    return (column.is_(None), column, id_column)
+
+def keyset_after(column, id_column, value, row_id: int):
+    """Filter rows positioned after (value, id) in keyset_order()"""
+    if value is None:
+        # Условие на выражение индекса нужно SQLite, чтобы искать по (IS NULL, column, id)
+        return and_(column.is_(None) == true(), column.is_(None), id_column > row_id)
+    return or_(
+        column > value,
+        and_(column == value, id_column > row_id),
+        column.is_(None)
+    )
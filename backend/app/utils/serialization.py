@@ -0,0 +1,63 @@
+# backend/app/utils/serialization.py
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from typing import Any, Iterable, Optional, Sequence, Tuple
+import orjson
+
+from ..models.database import Subscription
+from ..schemas.schemas import SubscriptionResponse
+
+# Fields of SubscriptionResponse, in schema order
+SUBSCRIPTION_FIELDS = tuple(SubscriptionResponse.model_fields)
+
+# Columns selected for SubscriptionResponse, in schema field order
+SUBSCRIPTION_RESPONSE_COLUMNS = tuple(getattr(Subscription, field) for field in SUBSCRIPTION_FIELDS)
+
+# Allowlist: the only names that may be turned into columns
+SUBSCRIPTION_COLUMNS_BY_NAME = dict(zip(SUBSCRIPTION_FIELDS, SUBSCRIPTION_RESPONSE_COLUMNS))
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson response; UTC datetimes end with 'Z' like pydantic output"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse ?fields=name,amount into response field names (None = all fields)
+
+    ``id`` is always included so clients can address the returned items.
+    """
+    if fields is None or not fields.strip():
+        return None
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in SUBSCRIPTION_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {unknown}. Allowed: {list(SUBSCRIPTION_FIELDS)}"
+        )
+    return tuple(field for field in SUBSCRIPTION_FIELDS if field == "id" or field in requested)
+
+def subscription_columns(fields: Optional[Tuple[str, ...]], extra: Iterable[str] = ()) -> tuple:
+    """Columns to SELECT for the requested fields plus any extra ones the handler needs
+
+    Only response column names are accepted; anything else is a 400.
+    """
+    names = list(fields if fields is not None else SUBSCRIPTION_FIELDS)
+    names += [name for name in extra if name not in names]
+    unknown = [name for name in names if name not in SUBSCRIPTION_COLUMNS_BY_NAME]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {unknown}. Allowed: {list(SUBSCRIPTION_FIELDS)}"
+        )
+    if fields is None:
+        return SUBSCRIPTION_RESPONSE_COLUMNS
+    return tuple(SUBSCRIPTION_COLUMNS_BY_NAME[name] for name in names)
+
+def rows_to_dicts(rows: Sequence, fields: Optional[Tuple[str, ...]] = None) -> list:
+    """Convert selected column rows to plain dicts limited to the requested fields"""
+    if fields is None:
+        return [row._asdict() for row in rows]
+    return [{field: getattr(row, field) for field in fields} for row in rows]
@@ -0,0 +1 @@
+# Benchmarks (run from backend/: python -m benchmarks.<name>)
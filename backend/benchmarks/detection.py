@@ -0,0 +1,56 @@
+# backend/benchmarks/detection.py
+"""
+Recurring-charge detection over a synthetic bank statement.
+
+Generates monthly / weekly / yearly subscriptions with date jitter and
+occasional price changes, buried in random one-off purchases, and times
+detect_recurring().
+
+    cd backend && python -m benchmarks.detection [transactions] [repeat]
+"""
+from datetime import date
+import sys
+import time
+
+import numpy as np
+
+from app.services.detection import detect_recurring
+
+def synthetic_transactions(total: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    start = np.datetime64("2024-01-01")
+    dates, merchants, amounts = [], [], []
+
+    # Регулярные списания: ~10% выписки
+    subscriptions = max(total // 300, 1)
+    for i in range(subscriptions):
+        step, count, jitter = [(30, 24, 2), (7, 100, 1), (365, 3, 3)][i % 3]
+        offsets = np.arange(count) * step + rng.integers(-jitter, jitter + 1, count) + rng.integers(0, step)
+        dates.extend(start + offsets)
+        name = "".join(letters[rng.integers(0, 26, 8)]).upper()
+        merchants.extend(f"{name} PLUS*{code} MOSCOW" for code in rng.integers(10**6, size=count))
+        amounts.extend(-(199.0 + i) * (1 + (np.arange(count) > count // 2) * 0.1))
+
+    # Разовые покупки
+    rest = total - len(dates)
+    dates.extend(start + rng.integers(0, 730, rest))
+    merchants.extend(f"SHOP {code} {rng.integers(10**4)}" for code in rng.integers(0, 20000, rest))
+    amounts.extend(-rng.uniform(50, 5000, rest))
+    return np.array(dates, dtype="datetime64[D]"), merchants, np.array(amounts)
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    dates, merchants, amounts = synthetic_transactions(total)
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proposals = detect_recurring(dates, merchants, amounts, today=date(2026, 1, 1))
+        best = min(best, time.perf_counter() - start)
+
+    print(f"{len(dates)} transactions: {len(proposals)} recurring charges detected in {best:.3f} s (best of {repeat})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# backend/benchmarks/serialization.py
+"""
+Per-item cost of serializing the subscriptions list.
+
+Compares the previous path (ORM objects -> SubscriptionResponse.from_orm ->
+PaginatedResponse -> jsonable_encoder -> json) with the current one
+(selected column rows -> dicts -> orjson).
+
+    cd backend && python -m benchmarks.serialization [items] [repeat]
+"""
+from datetime import date, timedelta
+import json
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models.database import Base, User, Subscription
+from app.schemas.schemas import SubscriptionResponse, PaginatedResponse
+from app.utils.serialization import SUBSCRIPTION_RESPONSE_COLUMNS, FastJSONResponse, rows_to_dicts
+
+def seed(engine, items: int):
+    with Session(engine) as db:
+        db.add(User(id=1, email="bench@example.com"))
+        for i in range(items):
+            db.add(Subscription(
+                user_id=1,
+                name=f"Subscription {i}",
+                description="Benchmark subscription with a description",
+                amount=100 + i % 50,
+                currency="RUB",
+                frequency="monthly",
+                next_billing_date=date(2026, 1, 1) + timedelta(days=i % 365),
+                category=f"category{i % 7}",
+                provider="Provider",
+                logo_url="https://example.com/logo.png",
+                website_url="https://example.com",
+            ))
+        db.commit()
+
+def orm_path(db: Session, items: int) -> bytes:
+    subscriptions = db.scalars(select(Subscription).where(Subscription.user_id == 1).limit(items)).all()
+    responses = [SubscriptionResponse.from_orm(sub).dict() for sub in subscriptions]
+    page = PaginatedResponse(items=responses, total=items, page=1, size=items, pages=1)
+    return json.dumps(jsonable_encoder(page)).encode()
+
+def row_path(db: Session, items: int) -> bytes:
+    rows = db.execute(select(*SUBSCRIPTION_RESPONSE_COLUMNS).where(Subscription.user_id == 1).limit(items)).all()
+    content = {"items": rows_to_dicts(rows), "total": items, "page": 1, "size": items, "pages": 1}
+    return FastJSONResponse(content).body
+
+def measure(func, engine, items: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            func(db, items)
+            best = min(best, time.perf_counter() - start)
+    return best / items * 1e6
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    seed(engine, items)
+
+    with Session(engine) as db:
+        assert json.loads(orm_path(db, items))["items"] == json.loads(row_path(db, items))["items"]
+
+    before = measure(orm_path, engine, items, repeat)
+    after = measure(row_path, engine, items, repeat)
+    print(f"{items} items, best of {repeat}")
+    print(f"  ORM + pydantic + json: {before:8.1f} us/item")
+    print(f"  rows + orjson:         {after:8.1f} us/item  ({before / after:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
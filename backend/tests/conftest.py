@@ -0,0 +1,42 @@
+# backend/tests/conftest.py
+"""
+Shared fixtures: the app on a throwaway SQLite database.
+
+DATABASE_URL must be set before app modules are imported (engines are
+created at import time), so it is done here at collection time.
+"""
+
+import os
+import tempfile
+import uuid
+
+_db_dir = tempfile.mkdtemp(prefix="subscription-tracker-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+
+import pytest
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.core.database import create_tables
+
+    create_tables()
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def register(client):
+    """Register a fresh user; returns (headers, user_id)"""
+    def _register(email=None, password="secret123"):
+        email = email or f"user-{uuid.uuid4().hex[:12]}@example.com"
+        response = client.post("/api/v1/auth/register", json={"email": email, "password": password})
+        assert response.status_code == 200, response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_id = client.get("/api/v1/auth/me", headers=headers).json()["id"]
+        return headers, user_id
+    return _register
+
+@pytest.fixture
+def headers(register):
+    return register()[0]
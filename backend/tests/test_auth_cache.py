@@ -0,0 +1,93 @@
+# backend/tests/test_auth_cache.py
+"""
+In-process auth caches: the authenticated-user cache and its invalidation,
+verified token payloads expiring with the token.
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import inspect
+
+from app.core import cache
+from app.core.auth import AuthManager, get_current_user, user_cache
+
+def current_user(headers):
+    """get_current_user() outside a request (cache hits need no database session)"""
+    token = headers["Authorization"].split(" ", 1)[1]
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(get_current_user(credentials, None))
+
+def test_put_me_invalidates_cached_user(client, register):
+    headers, user_id = register()
+    assert client.get("/api/v1/auth/me", headers=headers).json()["first_name"] is None
+    assert user_cache.get(str(user_id)) is not None
+
+    response = client.put("/api/v1/auth/me", json={"first_name": "Anna"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert user_cache.get(str(user_id)) is None
+
+    assert client.get("/api/v1/auth/me", headers=headers).json()["first_name"] == "Anna"
+    assert user_cache.get(str(user_id)).first_name == "Anna"
+
+def test_delete_account_invalidates_cached_user(client, register):
+    headers, user_id = register()
+    client.get("/api/v1/auth/me", headers=headers)
+
+    assert client.delete("/api/v1/auth/me", headers=headers).status_code == 200
+    assert user_cache.get(str(user_id)) is None
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+def test_cached_user_is_detached_copy(client, register):
+    headers, user_id = register()
+    client.get("/api/v1/auth/me", headers=headers)
+
+    cached = user_cache.get(str(user_id))
+    assert inspect(cached).session is None
+
+    first = current_user(headers)
+    assert first is not cached and inspect(first).session is None
+    # Изменение в одном запросе не видно в следующем
+    first.first_name = "Mallory"
+    first.is_premium = True
+    second = current_user(headers)
+    assert second.first_name is None
+    assert not second.is_premium
+    assert client.get("/api/v1/auth/me", headers=headers).json()["first_name"] is None
+
+def test_token_cache_entry_expires_at_token_exp(monkeypatch):
+    manager = AuthManager()
+    token = manager.create_access_token({"sub": "1"}, expires_delta=timedelta(minutes=5))
+    payload = manager.verify_token(token)
+    digest = hashlib.sha256(token.encode()).digest()
+    remaining = payload["exp"] - time.time()
+
+    # Часы кэша сдвигаются к exp токена
+    offset = [0.0]
+    monotonic = time.monotonic
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=lambda: monotonic() + offset[0]))
+    offset[0] = remaining - 1
+    assert manager.token_cache.get(digest) is not None
+    offset[0] = remaining + 1
+    assert manager.token_cache.get(digest) is None
+
+def test_expired_token_is_not_cached():
+    manager = AuthManager()
+    token = manager.create_access_token({"sub": "1"}, expires_delta=timedelta(seconds=-5))
+    with pytest.raises(HTTPException) as error:
+        manager.verify_token(token)
+    assert error.value.status_code == 401
+    assert manager.token_cache.stats()["size"] == 0
+
+def test_cached_payload_is_a_copy():
+    manager = AuthManager()
+    token = manager.create_access_token({"sub": "1"})
+    manager.verify_token(token)["sub"] = "2"
+    assert manager.verify_token(token)["sub"] == "1"
+    assert manager.token_cache.hits == 1
@@ -0,0 +1,117 @@
+# backend/tests/test_bulk.py
+"""
+Bulk subscription writes: per-item validation, derived column values and
+the /subscriptions/bulk endpoints (atomic mode, per-item errors).
+"""
+
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app.schemas.schemas import SubscriptionCreate
+from app.services.subscriptions import check_batch_size, subscription_values, validate_items
+
+def test_validate_items_reports_errors_by_index():
+    items = [
+        {"name": "Netflix", "amount": 999, "frequency": "monthly"},
+        {"name": "Bad", "amount": -1, "frequency": "monthly", "id": 7},
+        {"amount": 5},
+    ]
+    valid, errors = validate_items(items, SubscriptionCreate)
+    assert [index for index, _ in valid] == [0]
+    assert [(error["index"], error["id"]) for error in errors] == [(1, 7), (2, None)]
+    assert errors[1]["errors"][0]["loc"] == ("name",)
+    assert "input" not in errors[0]["errors"][0]
+
+def test_subscription_values_derives_next_billing_date():
+    data = SubscriptionCreate(
+        name="Spotify", amount=199, frequency="monthly",
+        next_billing_date=date(2026, 1, 31), interval_unit="month", interval_count=1
+    )
+    values = subscription_values(1, data)
+    assert values["user_id"] == 1
+    assert values["next_billing_date"] == date(2026, 2, 28)
+
+def test_check_batch_size():
+    check_batch_size(3, limit=3)
+    with pytest.raises(HTTPException) as error:
+        check_batch_size(4, limit=3)
+    assert error.value.status_code == 413
+    with pytest.raises(HTTPException):
+        check_batch_size(0)
+
+BULK_URL = "/api/v1/subscriptions/bulk"
+
+def item(name, amount=100, **extra):
+    return {"name": name, "amount": amount, "frequency": "monthly", **extra}
+
+def list_names(client, headers) -> list:
+    items = client.get("/api/v1/subscriptions", params={"size": 100}, headers=headers).json()["items"]
+    return sorted(subscription["name"] for subscription in items)
+
+def bulk_create(client, headers, items, atomic=False):
+    return client.post(BULK_URL, json={"items": items, "atomic": atomic}, headers=headers)
+
+def test_bulk_create_returns_items_in_request_order(client, headers):
+    names = [f"Item {i}" for i in (5, 1, 9, 3, 7)]
+    response = bulk_create(client, headers, [item(name, amount=10 + i) for i, name in enumerate(names)])
+    assert response.status_code == 200, response.text
+    items = response.json()["items"]
+    assert [(row["name"], row["amount"]) for row in items] == [(name, 10 + i) for i, name in enumerate(names)]
+    assert list_names(client, headers) == sorted(names)
+
+def test_bulk_create_partial_and_atomic(client, headers):
+    items = [item("Good"), item("Bad", amount=-5), item("Also good")]
+    body = bulk_create(client, headers, items).json()
+    assert [row["name"] for row in body["items"]] == ["Good", "Also good"]
+    assert [error["index"] for error in body["errors"]] == [1]
+
+    response = bulk_create(client, headers, [item("Atomic"), item("Bad", amount=-5)], atomic=True)
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["errors"]] == [1]
+    assert list_names(client, headers) == ["Also good", "Good"]
+
+def test_bulk_update_errors_and_atomic_rollback(client, headers, register):
+    first, second = [row["id"] for row in bulk_create(client, headers, [item("First"), item("Second")]).json()["items"]]
+    other_headers, _ = register()
+    foreign = bulk_create(client, other_headers, [item("Foreign")]).json()["items"][0]["id"]
+
+    response = client.patch(BULK_URL, json={"atomic": True, "items": [
+        {"id": first, "amount": 1}, {"id": foreign, "amount": 2},
+    ]}, headers=headers)
+    assert response.status_code == 422
+    assert [(error["index"], error["id"]) for error in response.json()["errors"]] == [(1, foreign)]
+    amounts = {row["name"]: row["amount"] for row in client.get(
+        "/api/v1/subscriptions", params={"size": 100}, headers=headers).json()["items"]}
+    assert amounts == {"First": 100, "Second": 100}
+
+    body = client.patch(BULK_URL, json={"items": [
+        {"id": first, "amount": 1}, {"id": first, "amount": 3}, {"id": 10 ** 9, "amount": 4},
+        {"amount": 5}, {"id": second, "name": "Renamed"},
+    ]}, headers=headers).json()
+    assert [(row["id"], row["name"], row["amount"]) for row in body["items"]] == [
+        (first, "First", 1), (second, "Renamed", 100)
+    ]
+    assert [(error["index"], error["errors"][0]["msg"]) for error in body["errors"]] == [
+        (1, "Duplicate id in batch"), (2, "Subscription not found"), (3, "Integer id is required")
+    ]
+    assert client.get(f"/api/v1/subscriptions/{foreign}", headers=other_headers).json()["amount"] == 100
+
+def test_bulk_delete_errors_and_atomic_rollback(client, headers):
+    ids = [row["id"] for row in bulk_create(client, headers, [item("A"), item("B"), item("C")]).json()["items"]]
+
+    response = client.request("DELETE", BULK_URL, json={"ids": [ids[0], 10 ** 9], "atomic": True}, headers=headers)
+    assert response.status_code == 422
+    assert list_names(client, headers) == ["A", "B", "C"]
+
+    body = client.request("DELETE", BULK_URL, json={"ids": [ids[0], ids[1], ids[0], 10 ** 9]}, headers=headers).json()
+    assert body["deleted"] == ids[:2]
+    assert [(error["index"], error["errors"][0]["msg"]) for error in body["errors"]] == [
+        (2, "Duplicate id in batch"), (3, "Subscription not found")
+    ]
+    assert list_names(client, headers) == ["C"]
+
+def test_bulk_batch_limits(client, headers):
+    assert bulk_create(client, headers, []).status_code == 400
+    assert client.request("DELETE", BULK_URL, json={"ids": []}, headers=headers).status_code == 400
@@ -0,0 +1,163 @@
+# backend/tests/test_currency.py
+"""
+Currency conversion: rate lookup and caching, rollup invalidation on rate
+changes (also from workers with a stale rate cache), and rates in the
+analytics ETag.
+"""
+
+import asyncio
+import logging
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.database import Analytics, Base, ExchangeRate, Subscription, User
+from app.services import currency
+from app.services.currency import BASE_CURRENCY, RateCache, conversion_factors, rates_digest, store_rates
+from app.services.rollups import get_rollup, month_bounds
+from app.services.projection import project
+
+RATES = {BASE_CURRENCY: 1.0, "USD": 90.0, "EUR": 100.0}
+
+@pytest.fixture
+def rate_cache(monkeypatch):
+    """Fresh process rate cache (the global one is shared with other tests)"""
+    cache = RateCache()
+    monkeypatch.setattr(currency, "rate_cache", cache)
+    return cache
+
+def test_conversion_to_base_currency():
+    factors = conversion_factors(["USD", BASE_CURRENCY.lower(), None, "eur", "USD"], RATES)
+    assert factors.tolist() == [90.0, 1.0, 1.0, 100.0, 90.0]
+
+    row = dict(
+        id=1, subscription_type="one_time", frequency="one_time", interval_unit=None, interval_count=None,
+        next_billing_date=None, start_date=date(2027, 3, 10), end_date=None, has_trial=False,
+        trial_start_date=None, trial_end_date=None, created_at=None, category="video"
+    )
+    rows = [SimpleNamespace(**row, amount=10.0, currency="USD"),
+            SimpleNamespace(**row, amount=500.0, currency=BASE_CURRENCY)]
+    projection = project(rows, date(2027, 3, 1), date(2027, 3, 31), rates=RATES)
+    assert projection["spent"].sum() == 10.0 * 90 + 500.0
+
+def test_missing_rate_leaves_amount_unconverted(caplog):
+    with caplog.at_level(logging.WARNING, logger=currency.__name__):
+        factors = conversion_factors(["JPY", "USD"], RATES)
+    assert factors.tolist() == [1.0, 90.0]
+    assert "JPY" in caplog.text
+
+def test_rate_cache_expires_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(currency, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = RateCache(ttl=60)
+    assert cache.get() is None
+
+    cache.set(RATES)
+    now[0] += 60
+    assert cache.get() == RATES
+    now[0] += 1
+    assert cache.get() is None
+
+    cache.set(RATES)
+    cache.clear()
+    assert cache.get() is None
+
+def test_rates_digest():
+    assert rates_digest(RATES) == rates_digest(dict(reversed(list(RATES.items()))))
+    assert rates_digest(RATES) != rates_digest({**RATES, "USD": 91.0})
+
+def test_store_rates_invalidates_rollups(tmp_path, rate_cache):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/rates.db")
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def rollup_count(db):
+        return await db.scalar(select(func.count()).select_from(Analytics))
+
+    async def add_rollup(db):
+        db.add(Analytics(user_id=1, period_start=date(2027, 3, 1), period_end=date(2027, 3, 31),
+                         total_spent=1.0, currency=BASE_CURRENCY, subscription_count=1, category_breakdown="{}"))
+        await db.commit()
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        counts = []
+        async with sessions() as db:
+            db.add(User(id=1, email="rates@example.com"))
+            await add_rollup(db)
+            await store_rates(db, RATES)
+            counts.append(await rollup_count(db))
+
+            # Те же курсы: свёртки остаются
+            await add_rollup(db)
+            await store_rates(db, dict(RATES))
+            counts.append(await rollup_count(db))
+
+            await store_rates(db, {**RATES, "USD": 95.0})
+            counts.append(await rollup_count(db))
+            stored = dict((await db.execute(select(ExchangeRate.currency, ExchangeRate.rate))).all())
+        await engine.dispose()
+        return counts, stored
+
+    counts, stored = asyncio.run(scenario())
+    assert counts == [0, 1, 0]
+    assert stored["USD"] == 95.0
+    assert rate_cache.get()["USD"] == 95.0
+
+def test_rollups_from_stale_rates_are_recomputed(tmp_path, rate_cache):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/stale.db")
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    start_date, end_date = month_bounds(2027, 3)
+    new_rates = {**RATES, "USD": 95.0}
+
+    async def read(stale: bool):
+        # Воркер со старыми курсами в кэше или с уже обновлёнными
+        if stale:
+            rate_cache.set(RATES)
+        async with sessions() as db:
+            data = await get_rollup(db, 1, start_date, end_date)
+            stored = await db.scalar(select(Analytics.rates_digest).where(Analytics.user_id == 1))
+        return data["total_spent"], stored
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add(User(id=1, email="stale@example.com"))
+            db.add(Subscription(user_id=1, name="Course", amount=10, currency="USD", frequency="one_time",
+                                subscription_type="one_time", start_date=date(2027, 3, 10)))
+            await store_rates(db, RATES)
+            await store_rates(db, new_rates)
+        results = [await read(stale=True)]
+        # Другой воркер видит свёртку в старых курсах и пересчитывает её
+        rate_cache.set(new_rates)
+        results.append(await read(stale=False))
+        # Воркер со старым кэшем не отдаёт её, а перечитывает курсы из БД
+        results.append(await read(stale=True))
+        await engine.dispose()
+        return results
+
+    results = asyncio.run(scenario())
+    assert results == [
+        (900.0, rates_digest(RATES)),
+        (950.0, rates_digest(new_rates)),
+        (950.0, rates_digest(new_rates)),
+    ]
+    assert rate_cache.get() == new_rates
+
+def test_rate_change_changes_monthly_etag(client, headers, rate_cache):
+    params = {"year": 2027, "month": 3}
+    rate_cache.set(RATES)
+    first = client.get("/api/v1/analytics/monthly", params=params, headers=headers)
+    etag = first.headers["ETag"]
+    assert client.get(
+        "/api/v1/analytics/monthly", params=params, headers={**headers, "If-None-Match": etag}
+    ).status_code == 304
+
+    rate_cache.set({**RATES, "USD": 95.0})
+    second = client.get("/api/v1/analytics/monthly", params=params, headers={**headers, "If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
@@ -0,0 +1,42 @@
+# backend/tests/test_detection.py
+"""
+Recurring-charge detection: merchant normalization and periodicity.
+"""
+
+from datetime import date, timedelta
+
+from app.services.detection import detect_recurring, normalize_merchant
+
+def test_normalize_merchant():
+    assert normalize_merchant("NETFLIX.COM 866-579-7172") == "netflix"
+    assert normalize_merchant("Оплата YANDEX*5815*PLUS") == "yandex plus"
+    assert normalize_merchant("www.ivi.ru") == "ivi"
+
+def statement():
+    rows = []
+    start = date(2026, 1, 3)
+    for k in range(6):
+        # Monthly with a day of jitter and a changing card/order suffix
+        rows.append((start + timedelta(days=30 * k + k % 2), f"SPOTIFY P{k}X{k}", -199.0, "RUB"))
+    for k in range(10):
+        rows.append((start + timedelta(days=7 * k), "GYM PASS", -150.0, "RUB"))
+    for k, gap in enumerate((3, 40, 11, 90, 2)):
+        rows.append((start + timedelta(days=gap * (k + 1)), "CORNER SHOP", -300.0 - k, "RUB"))
+    rows.append((start, "Зарплата", 50000.0, "RUB"))
+    return list(zip(*rows))
+
+def test_detects_monthly_and_weekly_only():
+    dates, merchants, amounts, currencies = statement()
+    proposals = {proposal["name"]: proposal for proposal in detect_recurring(dates, merchants, amounts, currencies)}
+    assert set(proposals) == {"Spotify", "Gym Pass"}
+    spotify = proposals["Spotify"]
+    assert (spotify["frequency"], spotify["interval_unit"], spotify["amount"]) == ("monthly", "month", 199.0)
+    assert spotify["last_charge_date"] == date(2026, 6, 3)
+    assert spotify["next_billing_date"] == date(2026, 7, 3)
+    assert proposals["Gym Pass"]["frequency"] == "weekly"
+
+def test_lapsed_subscriptions_are_dropped_and_next_date_rolls_forward():
+    dates, merchants, amounts, currencies = statement()
+    proposals = detect_recurring(dates, merchants, amounts, currencies, today=date(2026, 7, 20))
+    assert [proposal["name"] for proposal in proposals] == ["Spotify"]
+    assert proposals[0]["next_billing_date"] == date(2026, 8, 3)
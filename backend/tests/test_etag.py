@@ -0,0 +1,103 @@
+# backend/tests/test_etag.py
+"""
+ETag helpers: stable tags and If-None-Match matching; GET /subscriptions
+answering 304 and every mutation path changing its ETag.
+"""
+
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.core.database import SessionLocal
+from app.models.database import User
+from app.routers import telegram
+
+from app.utils.etag import make_etag, etag_matches
+
+def _request(if_none_match=None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_make_etag_is_stable_and_quoted():
+    etag = make_etag("subscriptions", 1, 3, "")
+    assert etag == make_etag("subscriptions", 1, 3, "")
+    assert etag != make_etag("subscriptions", 1, 4, "")
+    assert etag.startswith('"') and etag.endswith('"')
+
+def test_etag_matches_lists_weak_and_wildcard():
+    etag = make_etag("x")
+    assert not etag_matches(_request(), etag)
+    assert etag_matches(_request(f'"other", {etag}'), etag)
+    assert etag_matches(_request(f"W/{etag}"), etag)
+    assert etag_matches(_request("*"), etag)
+    assert not etag_matches(_request('"other"'), etag)
+
+LIST_URL = "/api/v1/subscriptions"
+ITEM = {"name": "Netflix", "amount": 999, "currency": "RUB", "frequency": "monthly"}
+
+def list_etag(client, headers, **params) -> str:
+    response = client.get(LIST_URL, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.headers["ETag"]
+
+def assert_not_modified(client, headers, etag, **params):
+    response = client.get(LIST_URL, params=params, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+@pytest.mark.parametrize("params", [{}, {"cursor": ""}, {"page": 2, "size": 5, "fields": "id,name"}])
+def test_list_if_none_match_returns_304(client, headers, params):
+    client.post(LIST_URL, json=ITEM, headers=headers)
+    etag = list_etag(client, headers, **params)
+    assert_not_modified(client, headers, etag, **params)
+    # Другой запрос - другой тег
+    assert list_etag(client, headers, size=7) != etag
+
+def create(client, headers) -> int:
+    response = client.post(LIST_URL, json=ITEM, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def bulk(client, headers, method, payload):
+    response = client.request(method, f"{LIST_URL}/bulk", json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+
+def telegram_add(client, headers):
+    user_id = client.get("/api/v1/auth/me", headers=headers).json()["id"]
+    with SessionLocal() as db:
+        text = "Название: Kinopoisk\nСумма: 299\nДата: 05.01.2027\nЧастота: ежемесячно"
+        asyncio.run(telegram.parse_subscription_data(text, db.get(User, user_id), db))
+
+def csv_import(client, headers):
+    response = client.post(f"{LIST_URL}/import", content="name,amount\nSpotify,199\n".encode(), headers=headers)
+    assert response.status_code == 200 and response.json()["created"] == 1, response.text
+
+MUTATIONS = {
+    "create": lambda client, headers, item_id: client.post(LIST_URL, json=ITEM, headers=headers),
+    "update": lambda client, headers, item_id: client.put(f"{LIST_URL}/{item_id}", json={"amount": 1}, headers=headers),
+    "delete": lambda client, headers, item_id: client.delete(f"{LIST_URL}/{item_id}", headers=headers),
+    "cancel": lambda client, headers, item_id: client.post(f"{LIST_URL}/{item_id}/cancel", headers=headers),
+    "activate": lambda client, headers, item_id: client.post(f"{LIST_URL}/{item_id}/activate", headers=headers),
+    "bulk_create": lambda client, headers, item_id: bulk(client, headers, "POST", {"items": [ITEM]}),
+    "bulk_update": lambda client, headers, item_id: bulk(
+        client, headers, "PATCH", {"items": [{"id": item_id, "name": "Renamed"}]}),
+    "bulk_delete": lambda client, headers, item_id: bulk(client, headers, "DELETE", {"ids": [item_id]}),
+    "import": lambda client, headers, item_id: csv_import(client, headers),
+    "telegram": lambda client, headers, item_id: telegram_add(client, headers),
+}
+
+@pytest.mark.parametrize("mutation", list(MUTATIONS))
+def test_every_mutation_changes_list_etag(client, headers, mutation):
+    item_id = create(client, headers)
+    etags = {params: list_etag(client, headers, **dict(params)) for params in ((), (("cursor", ""),))}
+
+    response = MUTATIONS[mutation](client, headers, item_id)
+    if response is not None:
+        assert response.status_code == 200, response.text
+
+    for params, etag in etags.items():
+        response = client.get(LIST_URL, params=dict(params), headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
@@ -0,0 +1,119 @@
+# backend/tests/test_export.py
+"""
+Export encoding: CSV / NDJSON chunks, charge expansion in date windows and
+the streamed /subscriptions/export responses.
+"""
+
+import csv
+import io
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import orjson
+import pytest
+
+from app.models.database import FrequencyEnum
+from app.services import export
+from app.services.export import CHARGE_FIELDS, EXPORT_MAX_DAYS, charge_rows, csv_header, date_windows, encode_rows
+
+def test_encode_rows_csv_and_ndjson():
+    rows = [(1, "Netflix, HD", FrequencyEnum.MONTHLY, datetime(2026, 1, 2, 3, 4, 5))]
+    fields = ("id", "name", "frequency", "created_at")
+    assert csv_header(fields) == b"id,name,frequency,created_at\r\n"
+    assert encode_rows(rows, fields, "csv") == b'1,"Netflix, HD",monthly,2026-01-02T03:04:05\r\n'
+    line = orjson.loads(encode_rows(rows, fields, "ndjson"))
+    assert line == {"id": 1, "name": "Netflix, HD", "frequency": "monthly", "created_at": "2026-01-02T03:04:05"}
+
+Row = namedtuple("Row", [
+    "id", "subscription_type", "frequency", "interval_unit", "interval_count", "next_billing_date",
+    "start_date", "end_date", "has_trial", "trial_start_date", "trial_end_date", "created_at",
+    "name", "amount", "currency", "category",
+])
+
+def test_charge_rows_grouped_by_subscription_with_free_trial():
+    rows = [
+        Row(1, "recurring", "monthly", None, 1, date(2026, 1, 15), None, None, True,
+            date(2026, 1, 1), date(2026, 1, 31), datetime(2026, 1, 1), "Music", 199.0, "RUB", None),
+        Row(2, "recurring", "weekly", None, 1, date(2026, 3, 2), None, None, False,
+            None, None, datetime(2026, 3, 1), "Gym", 10.0, "USD", "sport"),
+    ]
+    charges = charge_rows(rows, date(2026, 1, 1), date(2026, 3, 10))
+    assert [charge[:2] for charge in charges] == [
+        (date(2026, 1, 15), 1), (date(2026, 2, 15), 1), (date(2026, 3, 2), 2), (date(2026, 3, 9), 2)
+    ]
+    assert charges[0][3] == 0.0 and charges[0][6] is True
+    assert dict(zip(CHARGE_FIELDS, charges[1]))["amount"] == 199.0
+
+def test_date_windows_cover_the_period():
+    windows = list(date_windows(date(2026, 1, 1), date(2026, 1, 20), days=7))
+    assert windows == [
+        (date(2026, 1, 1), date(2026, 1, 7)), (date(2026, 1, 8), date(2026, 1, 14)), (date(2026, 1, 15), date(2026, 1, 20))
+    ]
+    assert list(date_windows(date(2026, 1, 1), date(2026, 1, 1), days=7)) == [(date(2026, 1, 1), date(2026, 1, 1))]
+
+EXPORT_URL = "/api/v1/subscriptions/export"
+
+@pytest.fixture
+def export_headers(client, register):
+    """Music 100 on the 15th from 2027-01-15, Gym 50 every Tuesday from 2027-01-05"""
+    headers, _ = register()
+    response = client.post("/api/v1/subscriptions/bulk", json={"items": [
+        {"name": "Music, HD", "amount": 100, "currency": "RUB", "frequency": "monthly", "category": "music",
+         "next_billing_date": "2026-12-15", "interval_unit": "month", "start_date": "2027-01-01"},
+        {"name": "Gym", "amount": 50, "currency": "RUB", "frequency": "weekly", "category": "sport",
+         "next_billing_date": "2026-12-29", "interval_unit": "week", "start_date": "2027-01-01"},
+    ]}, headers=headers)
+    assert response.status_code == 200, response.text
+    return headers
+
+def test_export_subscriptions_csv_and_ndjson(client, export_headers):
+    response = client.get(EXPORT_URL, params={"fields": "name,amount,frequency"}, headers=export_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    lines = list(csv.reader(io.StringIO(response.text)))
+    assert lines[0] == ["name", "amount", "frequency", "id"]
+    assert [line[:3] for line in lines[1:]] == [["Music, HD", "100.0", "monthly"], ["Gym", "50.0", "weekly"]]
+
+    response = client.get(EXPORT_URL, params={"format": "ndjson"}, headers=export_headers)
+    items = [orjson.loads(line) for line in response.content.splitlines()]
+    assert [(item["name"], item["next_billing_date"]) for item in items] == [
+        ("Music, HD", "2027-01-15"), ("Gym", "2027-01-05")
+    ]
+
+def charge_lines(client, headers, **params) -> list:
+    response = client.get(EXPORT_URL, params={"data": "charges", "format": "ndjson", **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+def test_export_charges(client, export_headers, monkeypatch):
+    period = {"start_date": "2027-01-01", "end_date": "2027-02-28"}
+    charges = charge_lines(client, export_headers, **period)
+    assert [(charge["date"], charge["name"], charge["amount"]) for charge in charges] == [
+        ("2027-01-15", "Music, HD", 100.0), ("2027-02-15", "Music, HD", 100.0),
+    ] + [(day, "Gym", 50.0) for day in (
+        "2027-01-05", "2027-01-12", "2027-01-19", "2027-01-26",
+        "2027-02-02", "2027-02-09", "2027-02-16", "2027-02-23",
+    )]
+
+    # Узкие окна дают те же списания
+    monkeypatch.setattr(export, "EXPORT_WINDOW_DAYS", 10)
+    narrow = charge_lines(client, export_headers, **period)
+    key = lambda charge: (charge["subscription_id"], charge["date"])
+    assert sorted(narrow, key=key) == sorted(charges, key=key)
+
+    response = client.get(EXPORT_URL, params={"data": "charges", **period}, headers=export_headers)
+    lines = list(csv.reader(io.StringIO(response.text)))
+    assert lines[0] == list(CHARGE_FIELDS)
+    assert len(lines) == 1 + len(charges)
+
+def test_export_charges_period_limit(client, headers):
+    end = date(2027, 1, 1)
+    allowed = {"data": "charges", "start_date": (end - timedelta(days=EXPORT_MAX_DAYS - 1)).isoformat(), "end_date": end.isoformat()}
+    assert client.get(EXPORT_URL, params=allowed, headers=headers).status_code == 200
+    too_long = {**allowed, "start_date": (end - timedelta(days=EXPORT_MAX_DAYS)).isoformat()}
+    assert client.get(EXPORT_URL, params=too_long, headers=headers).status_code == 400
+    assert client.get(EXPORT_URL, params={"data": "charges", "start_date": "1900-01-01", "end_date": "2100-01-01"},
+                      headers=headers).status_code == 400
+    assert client.get(EXPORT_URL, params={"data": "charges", "start_date": "2027-02-01", "end_date": "2027-01-01"},
+                      headers=headers).status_code == 400
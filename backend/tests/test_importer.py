@@ -0,0 +1,100 @@
+# backend/tests/test_importer.py
+"""
+CSV import: incremental parsing, bank statement row mapping and
+statements imported as their recurring charges.
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.detection import normalize_merchant
+from app.services.importer import StatementDebits, dedup_key, iter_csv_rows, map_header, map_row, parse_amount
+from app.services.recurrence import add_interval
+
+def parse(data: bytes, chunk_size: int, **kwargs):
+    async def chunks():
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    async def collect():
+        return [row async for row in iter_csv_rows(chunks(), **kwargs)]
+
+    return asyncio.run(collect())
+
+def test_rows_survive_any_chunk_boundary():
+    data = 'name;amount\r\n"Кино ""HD""\nмульти";"-1 099,00"\n\nSpotify;199\n'.encode("cp1251")
+    expected = [["name", "amount"], ['Кино "HD"\nмульти', "-1 099,00"], ["Spotify", "199"]]
+    for chunk_size in (1, 2, 5, len(data)):
+        assert parse(data, chunk_size, encoding="cp1251") == expected
+
+def test_parse_amount_formats():
+    assert parse_amount("-1 299,00") == -1299.0
+    assert parse_amount("1,299.50") == 1299.5
+    assert parse_amount("1.299,50") == 1299.5
+    assert parse_amount("299") == 299.0
+
+def test_map_bank_statement_row():
+    header = ["Дата операции", "Сумма операции", "Валюта операции", "Категория", "Описание"]
+    columns = map_header(header)
+    data = map_row(["05.10.2026 10:00:00", "-299,00", "rub", "Музыка", "Yandex Plus"], columns, "monthly", True)
+    assert data == {
+        "next_billing_date": date(2026, 10, 5), "amount": 299.0, "currency": "RUB", "category": "Музыка",
+        "name": "Yandex Plus", "frequency": "monthly", "interval_unit": "month", "interval_count": 1,
+    }
+    # Incoming transfer in a bank statement
+    assert map_row(["06.10.2026", "50 000,00", "RUB", "", "Зарплата"], columns, "monthly", True) is None
+
+def test_map_header_requires_name_and_amount():
+    with pytest.raises(HTTPException):
+        map_header(["date", "amount"])
+
+def test_dedup_key_normalizes():
+    assert dedup_key(" Netflix ", 999.001, None) == dedup_key("NETFLIX", 999.0, "")
+
+def test_statement_import_keeps_recurring_charges_only(client, headers):
+    today = date.today()
+    rows = ["Дата операции;Сумма операции;Валюта операции;Категория;Описание"]
+    for months_ago in (3, 2, 1, 0):
+        day = add_interval(today, "month", -months_ago) - timedelta(days=3)
+        rows.append(f"{day:%d.%m.%Y};-999,00;RUB;Кино;NETFLIX.COM {months_ago}23/456/789")
+    # Перестал списываться два года назад
+    for months_ago in (27, 26, 25, 24):
+        rows.append(f"{add_interval(today, 'month', -months_ago):%d.%m.%Y};-199,00;RUB;;Old Music")
+    rows.append(f"{today - timedelta(days=20):%d.%m.%Y};-350,00;RUB;;Кафе Пушкин")
+    rows.append(f"{today - timedelta(days=15):%d.%m.%Y};50 000,00;RUB;;Зарплата")
+    rows.append("не дата;-1,00;RUB;;Broken")
+    body = "\n".join(rows).encode("cp1251")
+    params = {"encoding": "cp1251", "debits_only": True}
+
+    progress = client.post("/api/v1/subscriptions/import", params=params, content=body, headers=headers).json()
+    assert (progress["rows"], progress["created"], progress["skipped"], progress["invalid"]) == (11, 1, 9, 1)
+    assert progress["errors"][0]["row"] == 12
+    items = client.get("/api/v1/subscriptions", params={"size": 100}, headers=headers).json()["items"]
+    assert [(item["name"], item["amount"], item["frequency"], item["category"]) for item in items] == [
+        ("Netflix", 999.0, "monthly", "Кино")
+    ]
+
+    # Повторный импорт находит подписку по нормализованному имени
+    progress = client.post("/api/v1/subscriptions/import", params=params, content=body, headers=headers).json()
+    assert progress["created"] == 0
+    assert len(client.get("/api/v1/subscriptions", params={"size": 100}, headers=headers).json()["items"]) == 1
+
+def test_statement_debits_are_stored_as_columns():
+    debits = StatementDebits()
+    columns = map_header(["Дата операции", "Сумма операции", "Описание"])
+    for record, descriptor in enumerate(["NETFLIX.COM 1/2", "Netflix 3/4", "NETFLIX.COM 5/6"], start=2):
+        day = f"05.{record:02d}.2026"
+        debits.add(record, map_row([day, "-999,00", descriptor], columns, "monthly", True))
+    assert len(debits) == 3 and debits.merchants == {"netflix": 0}
+    assert list(debits.merchant_codes) == [0, 0, 0]
+    [(record, data)] = debits.recurring()
+    assert record == 4
+    assert data["next_billing_date"] == date(2026, 4, 5) and data["frequency"] == "monthly"
+    with pytest.raises(ValueError):
+        debits.add(5, {"name": "No date", "amount": 1.0})
+
+def test_dedup_key_with_merchant_normalization():
+    assert dedup_key("NETFLIX.COM 123/456/789", 999, None, normalize_merchant) == dedup_key("Netflix", 999, None)
@@ -0,0 +1,74 @@
+# backend/tests/test_metrics.py
+"""
+Metrics: per-thread shards must sum up correctly and render as
+Prometheus text exposition; access to /metrics and the /debug endpoints.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import main
+
+from app.core.metrics import Counter, Histogram, render_metrics, _render_metric
+
+def test_counter_sums_thread_shards():
+    counter = Counter("test_total", "test", ("route",))
+
+    def work(_):
+        for _ in range(1000):
+            counter.inc(("/a",))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(work, range(8)))
+
+    assert counter.collect() == {("/a",): 8000}
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "test", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(value, ("/a",))
+
+    lines = [line.split("{")[0] + " " + line.rsplit(" ", 1)[1] for line in _render_metric(histogram)[2:]]
+
+    assert lines == [
+        "test_seconds_bucket 1",
+        "test_seconds_bucket 3",
+        "test_seconds_bucket 4",
+        "test_seconds_sum 4.05",
+        "test_seconds_count 4",
+    ]
+
+def test_render_includes_pool_stats():
+    text = render_metrics({"sync": {"size": 5, "checked_out": 2, "metrics": {"timeouts": 1}}})
+
+    assert 'db_pool_size{engine="sync"' in text
+    assert 'db_pool_timeouts_total{engine="sync"' in text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+
+OPS_ENDPOINTS = ["/metrics", "/debug/pool", "/debug/cache", "/debug/password-pool"]
+
+@pytest.mark.parametrize("path", OPS_ENDPOINTS)
+def test_ops_endpoints_hidden_without_debug_or_token(client, headers, monkeypatch, path):
+    monkeypatch.setattr(main, "DEBUG", False)
+    monkeypatch.setattr(main, "OPS_TOKEN", "")
+    assert client.get(path).status_code == 404
+    # Токен пользователя не даёт доступа
+    assert client.get(path, headers=headers).status_code == 404
+
+@pytest.mark.parametrize("path", OPS_ENDPOINTS)
+def test_ops_endpoints_require_ops_token(client, headers, monkeypatch, path):
+    monkeypatch.setattr(main, "DEBUG", False)
+    monkeypatch.setattr(main, "OPS_TOKEN", "scrape-secret")
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=headers).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+def test_ops_endpoints_open_in_debug(client, monkeypatch):
+    monkeypatch.setattr(main, "DEBUG", True)
+    monkeypatch.setattr(main, "OPS_TOKEN", "")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+    assert client.get("/debug/pool").status_code == 200
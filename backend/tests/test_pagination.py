@@ -0,0 +1,134 @@
+# backend/tests/test_pagination.py
+"""
+Keyset pagination: cursor tokens and walking pages through the
+subscriptions list (NULL sort values, concurrent inserts, last page).
+"""
+
+import base64
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.pagination import decode_cursor, encode_cursor
+
+LIST_URL = "/api/v1/subscriptions"
+
+def create_subscriptions(client, headers, items) -> list:
+    response = client.post(f"{LIST_URL}/bulk", json={"items": items}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [item["id"] for item in response.json()["items"]]
+
+def walk(client, headers, order_by: str, size: int) -> list:
+    """All pages in cursor mode: list of (items, next_cursor)"""
+    pages = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(
+            LIST_URL, params={"cursor": cursor, "order_by": order_by, "size": size}, headers=headers
+        )
+        assert response.status_code == 200, response.text
+        body = response.json()
+        cursor = body["next_cursor"]
+        pages.append((body["items"], cursor))
+        assert len(pages) < 100
+    return pages
+
+def mixed_items(count: int) -> list:
+    """Recurring subscriptions with repeated billing dates and one_time ones without a date"""
+    items = []
+    for i in range(count):
+        if i % 3 == 0:
+            items.append({"name": f"Course {i}", "amount": 100, "frequency": "one_time",
+                          "subscription_type": "one_time", "start_date": "2026-01-10"})
+        else:
+            day = date(2026, 1, 1) + timedelta(days=i % 4)
+            items.append({"name": f"Service {i}", "amount": 100, "frequency": "monthly",
+                          "next_billing_date": day.isoformat()})
+    return items
+
+def keyset_sorted(items: list, key: str) -> list:
+    # NULL last, then id
+    return sorted(items, key=lambda item: (item[key] is None, item[key] or "", item["id"]))
+
+@pytest.mark.parametrize("sort_key, value", [
+    ("next_billing_date", date(2026, 2, 28)),
+    ("created_at", datetime(2026, 2, 28, 13, 45, 10)),
+    ("next_billing_date", None),
+])
+def test_cursor_round_trip(sort_key, value):
+    assert decode_cursor(encode_cursor(sort_key, value, 42), sort_key) == (value, 42)
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor("next_billing_date", date(2026, 1, 1), 1)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+def _token(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+@pytest.mark.parametrize("cursor", [
+    "garbage!",
+    "eyJrIjoi",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    _token({"k": "created_at", "v": "2026-01-01T00:00:00", "id": 1}),
+    _token({"k": "next_billing_date", "v": "yesterday", "id": 1}),
+    _token({"k": "next_billing_date", "v": "2026-01-01", "id": "x"}),
+    _token({"k": "next_billing_date", "v": "2026-01-01"}),
+    _token(["next_billing_date", "2026-01-01", 1]),
+])
+def test_tampered_cursor_is_rejected(client, headers, cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, "next_billing_date")
+    assert error.value.status_code == 400
+
+    response = client.get(LIST_URL, params={"cursor": cursor, "order_by": "next_billing_date"}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("order_by", ["next_billing_date", "created_at"])
+def test_pages_cover_every_row_once(client, headers, order_by):
+    ids = create_subscriptions(client, headers, mixed_items(17))
+    pages = walk(client, headers, order_by, size=4)
+
+    items = [item for page, _ in pages for item in page]
+    assert [item["id"] for item in items] == [item["id"] for item in keyset_sorted(items, order_by)]
+    assert sorted(item["id"] for item in items) == sorted(ids)
+    assert [len(page) for page, _ in pages] == [4, 4, 4, 4, 1]
+    # Курсор проходит через строки с NULL в next_billing_date
+    if order_by == "next_billing_date":
+        assert any(item["next_billing_date"] is None for page, _ in pages[:-1] for item in page)
+
+def test_no_next_cursor_on_last_page(client, headers):
+    create_subscriptions(client, headers, mixed_items(6))
+    pages = walk(client, headers, "next_billing_date", size=3)
+    assert [len(page) for page, _ in pages] == [3, 3]
+    assert pages[0][1] is not None
+    assert pages[-1][1] is None
+
+    response = client.get(LIST_URL, params={"cursor": "", "order_by": "next_billing_date", "size": 10}, headers=headers)
+    assert response.json()["next_cursor"] is None
+
+def test_inserts_between_pages(client, headers):
+    ids = create_subscriptions(client, headers, mixed_items(9))
+    first = client.get(LIST_URL, params={"cursor": "", "order_by": "next_billing_date", "size": 4}, headers=headers).json()
+    seen = [item["id"] for item in first["items"]]
+    boundary = first["items"][-1]["next_billing_date"]
+
+    # Одна подписка до курсора (не должна появиться), одна после (должна)
+    before, after = create_subscriptions(client, headers, [
+        {"name": "Early", "amount": 1, "frequency": "monthly", "next_billing_date": "2025-06-01"},
+        {"name": "Late", "amount": 1, "frequency": "monthly", "next_billing_date": "2027-06-01"},
+    ])
+    assert boundary > "2025-07-01"
+
+    cursor = first["next_cursor"]
+    while cursor is not None:
+        body = client.get(
+            LIST_URL, params={"cursor": cursor, "order_by": "next_billing_date", "size": 4}, headers=headers
+        ).json()
+        seen.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+
+    assert len(seen) == len(set(seen))
+    assert set(seen) == set(ids) | {after}
+    assert before not in seen
@@ -0,0 +1,76 @@
+# backend/tests/test_passwords.py
+"""
+Password hashing pool: work runs off the event loop, a full queue is
+rejected with 503; bcrypt cost calibration.
+"""
+
+import asyncio
+import logging
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import passwords
+from app.core.auth import auth_manager
+from app.core.passwords import PasswordHashPool, calibrate_bcrypt_rounds
+
+def test_hash_and_verify_run_off_the_event_loop(monkeypatch):
+    pool = PasswordHashPool(workers=2, max_queue=0)
+    # auth импортирует password_pool напрямую
+    monkeypatch.setattr("app.core.auth.password_pool", pool)
+    threads = []
+
+    def tracked(func):
+        def wrapper(*args):
+            threads.append(threading.current_thread())
+            return func(*args)
+        return wrapper
+
+    monkeypatch.setattr(auth_manager, "get_password_hash", tracked(auth_manager.get_password_hash))
+    monkeypatch.setattr(auth_manager, "verify_password", tracked(auth_manager.verify_password))
+
+    async def scenario():
+        loop_thread = threading.current_thread()
+        hashed = await auth_manager.get_password_hash_async("secret123")
+        assert await auth_manager.verify_password_async("secret123", hashed)
+        assert not await auth_manager.verify_password_async("wrong", hashed)
+        return loop_thread
+
+    loop_thread = asyncio.run(scenario())
+    assert len(threads) == 3
+    assert all(thread is not loop_thread and thread.name.startswith("bcrypt") for thread in threads)
+    assert pool.stats()["completed"] == 3
+
+def test_full_queue_is_rejected_with_503():
+    pool = PasswordHashPool(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        # Один вызов на воркере, один в очереди
+        running = [asyncio.create_task(pool.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert pool.stats()["pending"] == 2 and pool.stats()["queued"] == 1
+        with pytest.raises(HTTPException) as error:
+            await pool.run(release.wait, 5)
+        release.set()
+        results = await asyncio.gather(*running)
+        # Очередь освободилась: новые вызовы снова принимаются
+        assert await pool.run(len, "ok") == 2
+        return error.value, results
+
+    error, results = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"]
+    assert results == [True, True]
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["pending"] == 0
+
+def test_calibration_returns_timings_without_printing(capsys, caplog):
+    with caplog.at_level(logging.INFO, logger=passwords.__name__):
+        rounds, measured = calibrate_bcrypt_rounds(60_000, min_rounds=4, max_rounds=5, samples=1)
+    assert rounds == 5
+    assert list(measured) == [4, 5]
+    assert all(elapsed > 0 for elapsed in measured.values())
+    assert "rounds=4" in caplog.text
+    assert capsys.readouterr().out == ""
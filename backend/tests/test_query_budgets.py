@@ -0,0 +1,70 @@
+# backend/tests/test_query_budgets.py
+"""
+Query budgets of real routes: the statement count of a request must not
+grow with the number of subscriptions (N+1 regressions fail here).
+"""
+
+import pytest
+
+from app.core import sessions
+from app.core.query_stats import query_budget
+
+SIZES = (3, 60)
+
+# route name -> (method, path, params, max queries)
+ROUTES = {
+    # версия коллекции + COUNT + страница
+    "list_page": ("GET", "/api/v1/subscriptions", {"size": 20}, 3),
+    # версия коллекции + страница
+    "list_cursor": ("GET", "/api/v1/subscriptions", {"cursor": "", "size": 20}, 2),
+    "upcoming": ("GET", "/api/v1/subscriptions/upcoming/billing", {}, 1),
+    "categories": ("GET", "/api/v1/subscriptions/categories/list", {}, 1),
+    # версия, свёртка (промах), подписки, замена свёртки
+    "monthly_cold": ("GET", "/api/v1/analytics/monthly", {"year": 2027, "month": 3}, 5),
+    "monthly_warm": ("GET", "/api/v1/analytics/monthly", {"year": 2027, "month": 3}, 2),
+    "yearly": ("GET", "/api/v1/analytics/yearly", {"year": 2027}, 4),
+    "forecast": ("GET", "/api/v1/analytics/forecast", {"months": 6}, 1),
+    "timeseries": ("GET", "/api/v1/analytics/timeseries", {"from": "2027-01-01", "to": "2027-06-30"}, 1),
+}
+
+def items(count: int) -> list:
+    return [
+        {"name": f"Service {i}", "amount": 10 + i, "currency": "USD" if i % 2 else "RUB",
+         "frequency": "monthly", "interval_unit": "month", "category": f"category {i % 5}",
+         "next_billing_date": f"2027-01-{i % 28 + 1:02d}"}
+        for i in range(count)
+    ]
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size}_subscriptions")
+def account(request, client, register, monkeypatch):
+    """User with N subscriptions; auth, rates and revocations already cached"""
+    # Периодическая перезагрузка отзывов не должна попасть в замер
+    monkeypatch.setattr(sessions.revocation_store, "reload_interval", 3600)
+    headers, _ = register()
+    response = client.post("/api/v1/subscriptions/bulk", json={"items": items(request.param)}, headers=headers)
+    assert response.status_code == 200, response.text
+    client.get("/api/v1/auth/me", headers=headers)
+    client.get("/api/v1/analytics/forecast", params={"months": 1}, headers=headers)
+    return headers
+
+def run_route(client, headers, name):
+    method, path, params, budget = ROUTES[name]
+    with query_budget(budget):
+        response = client.request(method, path, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+@pytest.mark.parametrize("name", [name for name in ROUTES if name != "monthly_warm"])
+def test_route_within_query_budget(client, account, name):
+    run_route(client, account, name)
+
+def test_stored_rollup_within_query_budget(client, account):
+    run_route(client, account, "monthly_cold")
+    run_route(client, account, "monthly_warm")
+
+def test_cursor_pages_within_query_budget(client, account):
+    cursor = ""
+    while cursor is not None:
+        with query_budget(ROUTES["list_cursor"][3]):
+            response = client.get("/api/v1/subscriptions", params={"cursor": cursor, "size": 10}, headers=account)
+        cursor = response.json()["next_cursor"]
@@ -0,0 +1,136 @@
+# backend/tests/test_query_plans.py
+"""
+Query-plan regression tests: the subscription queries the endpoints
+actually send must use an index and, for cursor pages, read rows in index
+order instead of sorting them per request.
+
+Statements are captured from the app's async engine while the endpoints
+run, then explained with the same parameters on the same database.
+"""
+
+import random
+import re
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event, select, text
+
+from app.core.database import async_engine, engine
+from app.models.database import Subscription
+from app.services.projection import candidate_filter
+from app.utils.pagination import keyset_after, keyset_order
+
+USERS = 10
+SUBSCRIPTIONS_PER_USER = 300
+
+@pytest.fixture(scope="module")
+def users(client):
+    """Users with a realistic spread of subscriptions (some without next_billing_date)"""
+    rnd = random.Random(42)
+    users = []
+    for _ in range(USERS):
+        email = f"plans-{rnd.getrandbits(48):x}@example.com"
+        token = client.post("/api/v1/auth/register", json={"email": email, "password": "secret123"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        items = []
+        for i in range(SUBSCRIPTIONS_PER_USER):
+            day = date.today() + timedelta(days=rnd.randint(-60, 300))
+            if rnd.random() < 0.3:
+                items.append({"name": f"Course {i}", "amount": 500, "frequency": "one_time",
+                              "subscription_type": "one_time", "start_date": day.isoformat()})
+            else:
+                items.append({"name": f"Service {i}", "amount": 199, "frequency": "monthly",
+                              "next_billing_date": day.isoformat(), "interval_unit": "month", "interval_count": 1})
+        response = client.post("/api/v1/subscriptions/bulk", json={"items": items}, headers=headers)
+        assert response.status_code == 200, response.text
+        users.append(headers)
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return users
+
+@contextmanager
+def captured_queries():
+    """SELECTs from subscriptions sent through the async engine"""
+    queries = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM subscriptions" in statement:
+            queries.append((statement, parameters))
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield queries
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", capture)
+
+def explain(statement: str, parameters=()) -> str:
+    """Return SQLite EXPLAIN QUERY PLAN output for a statement"""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+def explain_query(query) -> str:
+    compiled = query.compile(engine)
+    return explain(str(compiled), [compiled.params[name] for name in compiled.positiontup])
+
+def assert_uses_index(plan: str, *indexes: str):
+    assert not re.search(r"\bSCAN subscriptions\b(?! USING)", plan), plan
+    assert any(f"INDEX {name} " in plan for name in indexes), plan
+
+def assert_index_order(plan: str, *indexes: str):
+    assert_uses_index(plan, *indexes)
+    assert "TEMP B-TREE" not in plan, plan
+
+@pytest.mark.parametrize("order_by, index", [
+    ("next_billing_date", "ix_subscriptions_user_billing_keyset"),
+    ("created_at", "ix_subscriptions_user_created_keyset"),
+])
+def test_cursor_pages_read_in_index_order(client, users, order_by, index):
+    pages = 0
+    cursor = ""
+    with captured_queries() as queries:
+        while cursor is not None:
+            response = client.get(
+                "/api/v1/subscriptions",
+                params={"cursor": cursor, "order_by": order_by, "size": 50, "fields": "id,name"},
+                headers=users[0]
+            )
+            assert response.status_code == 200, response.text
+            cursor = response.json()["next_cursor"]
+            pages += 1
+    assert pages == SUBSCRIPTIONS_PER_USER // 50
+    assert len(queries) == pages
+    for statement, parameters in queries:
+        assert_index_order(explain(statement, parameters), index)
+
+def test_null_tail_page_reads_in_index_order(users):
+    # Страница после курсора с NULL значением: только строки с NULL, порядок по id
+    for column, index in ((Subscription.next_billing_date, "ix_subscriptions_user_billing_keyset"),
+                          (Subscription.created_at, "ix_subscriptions_user_created_keyset")):
+        query = (
+            select(Subscription.id).where(Subscription.user_id == 1)
+            .where(keyset_after(column, Subscription.id, None, 100))
+            .order_by(*keyset_order(column, Subscription.id, null_tail=True)).limit(21)
+        )
+        assert_index_order(explain_query(query), index)
+
+def test_upcoming_billing_uses_composite_index(client, users):
+    with captured_queries() as queries:
+        response = client.get("/api/v1/subscriptions/upcoming/billing", params={"days": 30}, headers=users[0])
+    assert response.status_code == 200, response.text
+    assert len(queries) == 1
+    assert_index_order(explain(*queries[0]), "ix_subscriptions_user_active_billing")
+
+def test_analytics_candidate_filter_uses_index(client, users):
+    with captured_queries() as queries:
+        response = client.get("/api/v1/analytics/forecast", params={"months": 3}, headers=users[0])
+    assert response.status_code == 200, response.text
+    assert queries
+    for statement, parameters in queries:
+        assert_uses_index(explain(statement, parameters), "ix_subscriptions_user_active_billing")
+
+    # Тот же фильтр, что и в экспорте истории списаний
+    query = select(Subscription.id).where(candidate_filter(1, date(2026, 3, 1), date(2026, 3, 31)))
+    assert_uses_index(explain_query(query), "ix_subscriptions_user_active_billing")
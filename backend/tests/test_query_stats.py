@@ -0,0 +1,52 @@
+# backend/tests/test_query_stats.py
+"""
+Per-request SQL statistics: N+1 detection and the query budget helper.
+"""
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models.database import Base, User, Subscription
+from app.core.query_stats import QueryStats, current_query_stats, instrument_engine, query_budget
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    instrument_engine(engine)
+    with Session(engine) as db:
+        for user_id in range(1, 7):
+            db.add(User(id=user_id, email=f"user{user_id}@example.com"))
+            db.add(Subscription(user_id=user_id, name=f"Sub {user_id}", amount=100, frequency="monthly"))
+        db.commit()
+    return engine
+
+def load_owners(engine):
+    """Lazy relationship access inside a loop: one SELECT per subscription"""
+    with Session(engine) as db:
+        return [sub.user.email for sub in db.scalars(select(Subscription))]
+
+def test_repeated_statement_is_reported(engine):
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        load_owners(engine)
+    finally:
+        current_query_stats.reset(token)
+
+    assert stats.count == 7
+    assert stats.duration > 0
+    assert list(stats.repeated(threshold=5).values()) == [6]
+
+def test_query_budget_fails_on_n_plus_one(engine):
+    with pytest.raises(AssertionError, match="7 queries executed, budget is 2"):
+        with query_budget(2, engines=[engine]):
+            load_owners(engine)
+
+def test_query_budget_passes_within_budget(engine):
+    with query_budget(1, engines=[engine]) as statements:
+        with Session(engine) as db:
+            db.scalars(select(Subscription)).all()
+
+    assert len(statements) == 1
@@ -0,0 +1,151 @@
+# backend/tests/test_recurrence.py
+"""
+Recurrence engine: vectorised expand_schedules() against a plain
+per-subscription loop over add_interval().
+"""
+
+import random
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.recurrence import add_interval, build_schedules, charge_dates, expand_schedules
+
+UNITS = ("day", "week", "month", "year")
+
+def schedule_row(**fields):
+    row = {
+        "id": 1,
+        "subscription_type": "recurring",
+        "frequency": "monthly",
+        "interval_unit": "month",
+        "interval_count": 1,
+        "next_billing_date": None,
+        "start_date": None,
+        "end_date": None,
+        "has_trial": False,
+        "trial_start_date": None,
+        "trial_end_date": None,
+        "created_at": datetime(2020, 1, 1, 12, 0),
+    }
+    row.update(fields)
+    return SimpleNamespace(**row)
+
+def reference_charges(row, range_start: date, range_end: date) -> list:
+    """(date, free) pairs of one subscription, charge by charge"""
+    created = row.created_at.date() if row.created_at else None
+    if row.subscription_type == "one_time":
+        first = row.start_date or created
+        charges = [first] if first and range_start <= first <= range_end else []
+    else:
+        anchor = row.next_billing_date or row.start_date
+        if anchor is None:
+            return []
+        lower = min(day for day in (row.start_date or created, anchor) if day is not None)
+        lower = max(lower, range_start)
+        upper = min(row.end_date or range_end, range_end)
+        charges = []
+        for direction in (1, -1):
+            k = 0 if direction == 1 else -1
+            # Каждое списание считается от якоря, а не от предыдущего списания
+            day = add_interval(anchor, row.interval_unit, k * row.interval_count)
+            while (day <= upper) if direction == 1 else (day >= lower):
+                if lower <= day <= upper:
+                    charges.append(day)
+                k += direction
+                day = add_interval(anchor, row.interval_unit, k * row.interval_count)
+    trial = row.has_trial and row.trial_start_date and row.trial_end_date
+    return [(day, bool(trial and row.trial_start_date <= day <= row.trial_end_date)) for day in charges]
+
+def expanded_charges(rows, range_start: date, range_end: date) -> list:
+    """(row index, date, free) triples from expand_schedules()"""
+    index, dates, free = expand_schedules(build_schedules(rows), range_start, range_end)
+    return sorted(zip(index.tolist(), [day.astype(date) for day in dates], free.tolist()))
+
+def assert_matches_reference(rows, range_start: date, range_end: date):
+    expected = sorted(
+        (i, day, free) for i, row in enumerate(rows) for day, free in reference_charges(row, range_start, range_end)
+    )
+    assert expanded_charges(rows, range_start, range_end) == expected
+
+def test_month_end_is_clamped_from_anchor():
+    row = schedule_row(next_billing_date=date(2026, 1, 31))
+    assert charge_dates(row, date(2026, 1, 1), date(2026, 5, 31)) == [
+        date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30), date(2026, 5, 31)
+    ]
+    leap = schedule_row(next_billing_date=date(2028, 1, 31))
+    assert charge_dates(leap, date(2028, 2, 1), date(2028, 3, 31)) == [date(2028, 2, 29), date(2028, 3, 31)]
+
+def test_yearly_on_february_29():
+    row = schedule_row(next_billing_date=date(2024, 2, 29), frequency="yearly", interval_unit="year")
+    assert charge_dates(row, date(2024, 1, 1), date(2028, 12, 31)) == [
+        date(2024, 2, 29), date(2025, 2, 28), date(2026, 2, 28), date(2027, 2, 28), date(2028, 2, 29)
+    ]
+
+def test_charges_before_next_billing_date():
+    # k < 0: прошлые списания внутри окна и после start_date
+    row = schedule_row(next_billing_date=date(2026, 6, 15), start_date=date(2026, 2, 1))
+    assert charge_dates(row, date(2026, 1, 1), date(2026, 7, 31)) == [
+        date(2026, 2, 15), date(2026, 3, 15), date(2026, 4, 15), date(2026, 5, 15),
+        date(2026, 6, 15), date(2026, 7, 15)
+    ]
+
+def test_trial_charges_are_free():
+    row = schedule_row(
+        next_billing_date=date(2026, 1, 10), frequency="weekly", interval_unit="week",
+        has_trial=True, trial_start_date=date(2026, 1, 1), trial_end_date=date(2026, 1, 24)
+    )
+    index, dates, free = expand_schedules(build_schedules([row]), date(2026, 1, 1), date(2026, 2, 7))
+    assert [day.astype(date) for day in dates[free]] == [
+        date(2026, 1, 3), date(2026, 1, 10), date(2026, 1, 17), date(2026, 1, 24)
+    ]
+    assert charge_dates(row, date(2026, 1, 1), date(2026, 2, 7)) == [date(2026, 1, 31), date(2026, 2, 7)]
+
+def test_one_time_charge_inside_and_outside_window():
+    row = schedule_row(subscription_type="one_time", frequency="one_time", start_date=date(2026, 3, 10))
+    assert charge_dates(row, date(2026, 3, 1), date(2026, 3, 31)) == [date(2026, 3, 10)]
+    assert charge_dates(row, date(2026, 4, 1), date(2026, 4, 30)) == []
+    # Без start_date - дата создания
+    created = schedule_row(subscription_type="one_time", frequency="one_time", created_at=datetime(2026, 4, 5, 9, 30))
+    assert charge_dates(created, date(2026, 4, 1), date(2026, 4, 30)) == [date(2026, 4, 5)]
+
+def test_charges_stop_at_end_date():
+    row = schedule_row(next_billing_date=date(2026, 1, 20), end_date=date(2026, 4, 19))
+    assert charge_dates(row, date(2026, 1, 1), date(2026, 12, 31)) == [
+        date(2026, 1, 20), date(2026, 2, 20), date(2026, 3, 20)
+    ]
+
+@pytest.mark.parametrize("unit, count, expected", [
+    ("month", 3, [date(2026, 1, 31), date(2026, 4, 30), date(2026, 7, 31), date(2026, 10, 31)]),
+    ("week", 2, [date(2026, 1, 31), date(2026, 2, 14), date(2026, 2, 28)]),
+    ("day", 10, [date(2026, 1, 31), date(2026, 2, 10), date(2026, 2, 20)]),
+])
+def test_interval_count(unit, count, expected):
+    row = schedule_row(next_billing_date=date(2026, 1, 31), interval_unit=unit, interval_count=count)
+    assert charge_dates(row, expected[0], expected[-1]) == expected
+
+def test_random_schedules_match_scalar_loop():
+    rnd = random.Random(7)
+    rows = []
+    for i in range(500):
+        anchor = date(2024, 1, 1) + timedelta(days=rnd.randint(0, 1100))
+        start = anchor - timedelta(days=rnd.randint(0, 400)) if rnd.random() < 0.5 else None
+        end = anchor + timedelta(days=rnd.randint(-30, 500)) if rnd.random() < 0.3 else None
+        trial_start = anchor - timedelta(days=rnd.randint(0, 60))
+        rows.append(schedule_row(
+            id=i,
+            subscription_type="one_time" if rnd.random() < 0.15 else "recurring",
+            interval_unit=rnd.choice(UNITS),
+            interval_count=rnd.randint(1, 4),
+            next_billing_date=anchor,
+            start_date=start,
+            end_date=end,
+            has_trial=rnd.random() < 0.2,
+            trial_start_date=trial_start,
+            trial_end_date=trial_start + timedelta(days=rnd.randint(0, 90)),
+            created_at=datetime.combine(anchor - timedelta(days=rnd.randint(0, 200)), datetime.min.time()),
+        ))
+    for range_start, range_end in ((date(2025, 1, 1), date(2025, 12, 31)), (date(2024, 2, 15), date(2024, 3, 14)),
+                                   (date(2026, 2, 28), date(2026, 2, 28))):
+        assert_matches_reference(rows, range_start, range_end)
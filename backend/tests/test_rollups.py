@@ -0,0 +1,149 @@
+# backend/tests/test_rollups.py
+"""
+Analytics rollups: writes refresh only the stored months they affect,
+concurrent stores of the same period, Telegram invalidation.
+"""
+
+import asyncio
+from datetime import date
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import SessionLocal
+from app.models.database import Analytics, Base, Subscription, User
+from app.routers import telegram
+from app.services import rollups
+from app.services.rollups import get_rollup, month_bounds
+
+MONTHS = [(2026, 9), (2027, 1), (2027, 2), (2027, 3), (2027, 4), (2027, 5), (2027, 6)]
+STALE = -1.0
+
+def monthly(client, headers, year, month) -> float:
+    response = client.get("/api/v1/analytics/monthly", params={"year": year, "month": month}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["total_spent"]
+
+def mark_stale(user_id: int):
+    """Overwrite stored totals so refreshed months are easy to tell apart"""
+    with SessionLocal() as db:
+        db.execute(update(Analytics).where(Analytics.user_id == user_id).values(total_spent=STALE))
+        db.commit()
+
+def stored_totals(user_id: int) -> dict:
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(Analytics.period_start, Analytics.total_spent).where(Analytics.user_id == user_id)
+        ).all()
+    return {(start.year, start.month): total for start, total in rows}
+
+def refreshed(user_id: int) -> set:
+    return {month for month, total in stored_totals(user_id).items() if total != STALE}
+
+@pytest.fixture
+def account(client, register):
+    """User with a one-time course in March 2027, a monthly service and stored rollups"""
+    headers, user_id = register()
+    course = client.post("/api/v1/subscriptions", json={
+        "name": "Course", "amount": 300, "currency": "RUB", "frequency": "one_time",
+        "subscription_type": "one_time", "start_date": "2027-03-10",
+    }, headers=headers).json()["id"]
+    service = client.post("/api/v1/subscriptions", json={
+        "name": "Music", "amount": 100, "currency": "RUB", "frequency": "monthly",
+        "next_billing_date": "2027-01-05", "interval_unit": "month", "interval_count": 1,
+        "start_date": "2027-01-01",
+    }, headers=headers).json()["id"]
+    totals = {(year, month): monthly(client, headers, year, month) for year, month in MONTHS}
+    mark_stale(user_id)
+    return headers, user_id, course, service, totals
+
+def test_update_refreshes_only_affected_months(client, account):
+    headers, user_id, course, _, totals = account
+    response = client.put(f"/api/v1/subscriptions/{course}", json={"amount": 500}, headers=headers)
+    assert response.status_code == 200, response.text
+
+    # Окно one_time подписки: от даты создания до start_date
+    assert refreshed(user_id) == {(2027, 1), (2027, 2), (2027, 3)}
+    stored = stored_totals(user_id)
+    assert stored[(2027, 3)] == totals[(2027, 3)] + 200
+    assert stored[(2027, 1)] == totals[(2027, 1)]
+    assert monthly(client, headers, 2027, 4) == STALE
+
+def test_delete_refreshes_only_affected_months(client, account):
+    headers, user_id, course, _, totals = account
+    assert client.delete(f"/api/v1/subscriptions/{course}", headers=headers).status_code == 200
+
+    assert refreshed(user_id) == {(2027, 1), (2027, 2), (2027, 3)}
+    assert stored_totals(user_id)[(2027, 3)] == totals[(2027, 3)] - 300
+
+def test_cancel_refreshes_months_from_the_window_start(client, account):
+    headers, user_id, _, service, totals = account
+    assert client.post(f"/api/v1/subscriptions/{service}/cancel", headers=headers).status_code == 200
+
+    # Регулярная подписка: окно открыто справа, прошлые месяцы не трогаются
+    assert refreshed(user_id) == set(MONTHS) - {(2026, 9)}
+    stored = stored_totals(user_id)
+    assert stored[(2027, 6)] == totals[(2027, 6)] - 100
+    assert stored[(2027, 3)] == 300
+
+def test_concurrent_store_of_same_period(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/rollups.db")
+    sessions = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    start_date, end_date = month_bounds(2027, 3)
+    store = rollups._store_rollup
+
+    async def racing_store(db, user_id, start, end, rates=None):
+        rollup = await store(db, user_id, start, end, rates)
+        # Другой запрос успел сохранить тот же период между DELETE и INSERT
+        await db.execute(insert(Analytics).values(
+            user_id=user_id, period_start=start, period_end=end, total_spent=42.0,
+            currency="RUB", subscription_count=1, category_breakdown="{}"
+        ))
+        return rollup
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add(User(id=1, email="race@example.com"))
+            db.add(Subscription(user_id=1, name="Course", amount=300, frequency="one_time",
+                                subscription_type="one_time", start_date=date(2027, 3, 10)))
+            await db.commit()
+
+        monkeypatch.setattr(rollups, "_store_rollup", racing_store)
+        async with sessions() as db:
+            data = await get_rollup(db, 1, start_date, end_date)
+            # Сессия после rollback снова пригодна
+            assert await db.scalar(select(Analytics.id).where(Analytics.user_id == 1)) is None
+        monkeypatch.setattr(rollups, "_store_rollup", store)
+        async with sessions() as db:
+            stored = await get_rollup(db, 1, start_date, end_date)
+        await engine.dispose()
+        return data, stored
+
+    data, stored = asyncio.run(scenario())
+    assert data["total_spent"] == 300
+    assert stored["total_spent"] == 300
+
+def test_telegram_add_invalidates_rollups(client, register):
+    headers, user_id = register()
+    other_headers, other_id = register()
+    for year, month in MONTHS[:3]:
+        monthly(client, headers, year, month)
+        monthly(client, other_headers, year, month)
+
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        version = user.subscriptions_version
+        text = "Название: Kinopoisk\nСумма: 299\nДата: 05.01.2027\nЧастота: ежемесячно"
+        asyncio.run(telegram.parse_subscription_data(text, user, db))
+
+    with SessionLocal() as db:
+        assert db.scalar(select(Subscription.id).where(Subscription.user_id == user_id)) is not None
+    assert stored_totals(user_id) == {}
+    assert len(stored_totals(other_id)) == 3
+    with SessionLocal() as db:
+        assert db.get(User, user_id).subscriptions_version == version + 1
+    # Следующее чтение пересчитывает месяц с новой подпиской
+    assert monthly(client, headers, 2027, 1) == 299
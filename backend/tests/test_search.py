@@ -0,0 +1,52 @@
+# backend/tests/test_search.py
+"""
+Full-text search: query text building and SQLite FTS5 ranking.
+"""
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models.database import Base, User, Subscription
+from app.services.search import search_terms, tsquery_text, fts5_query_text, apply_search
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(id=1, email="user@example.com"))
+        db.add_all([
+            Subscription(id=1, user_id=1, name="Yandex Music", provider="Yandex", amount=299, frequency="monthly"),
+            Subscription(id=2, user_id=1, name="Кинопоиск", provider="Yandex", amount=399, frequency="monthly"),
+            Subscription(id=3, user_id=1, name="Netflix", description="music documentaries", amount=999, frequency="monthly"),
+        ])
+        db.commit()
+    return engine
+
+def search(engine, text):
+    query, rank = apply_search(select(Subscription.id), search_terms(text), "sqlite")
+    with Session(engine) as db:
+        return list(db.scalars(query.order_by(rank, Subscription.id)))
+
+def test_query_text_drops_operators():
+    terms = search_terms('Yand* "mus" OR -x')
+    assert terms == ["yand", "mus", "or", "x"]
+    assert tsquery_text(["yand", "mus"]) == "yand:* & mus:*"
+    assert fts5_query_text(["yand", "mus"]) == '"yand"* AND "mus"*'
+
+def test_prefix_match_and_ranking(engine):
+    assert search(engine, "yand mus") == [1]
+    assert search(engine, "кино") == [2]
+    # Match in name ranks above match in description
+    assert search(engine, "music") == [1, 3]
+
+def test_index_follows_updates_and_deletes(engine):
+    with Session(engine) as db:
+        db.get(Subscription, 3).name = "Apple TV"
+        db.commit()
+        assert search(engine, "netfl") == []
+        assert search(engine, "appl") == [3]
+        db.delete(db.get(Subscription, 3))
+        db.commit()
+    assert search(engine, "appl") == []
@@ -0,0 +1,49 @@
+# backend/tests/test_serialization.py
+"""
+Sparse fieldsets: ?fields= parsing and the selected column list.
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.serialization import (
+    SUBSCRIPTION_RESPONSE_COLUMNS, parse_fields, subscription_columns, rows_to_dicts
+)
+
+def test_parse_fields_keeps_schema_order_and_id():
+    assert parse_fields("next_billing_date, name,amount") == ("name", "amount", "next_billing_date", "id")
+    assert parse_fields(None) is None
+    assert parse_fields(" ") is None
+
+def test_parse_fields_rejects_unknown():
+    with pytest.raises(HTTPException) as error:
+        parse_fields("name,hashed_password")
+    assert error.value.status_code == 400
+
+def test_columns_follow_fields():
+    fields = parse_fields("name")
+
+    assert [column.key for column in subscription_columns(fields)] == ["name", "id"]
+    assert [column.key for column in subscription_columns(fields, extra=("created_at",))] == ["name", "id", "created_at"]
+    assert subscription_columns(None) == SUBSCRIPTION_RESPONSE_COLUMNS
+
+def test_rows_to_dicts_drops_extra_columns():
+    class Row:
+        id, name, created_at = 1, "Netflix", "2026-01-01"
+
+    assert rows_to_dicts([Row()], ("name", "id")) == [{"name": "Netflix", "id": 1}]
+
+def test_subscription_columns_accepts_only_response_columns():
+    for name in ("foo", "__class__", "user", "notifications", "metadata"):
+        with pytest.raises(HTTPException) as error:
+            subscription_columns(("id", "name"), extra=(name,))
+        assert error.value.status_code == 400
+        with pytest.raises(HTTPException):
+            subscription_columns(None, extra=(name,))
+
+def test_unknown_cursor_order_by_is_400(client, headers):
+    for order_by in ("foo", "__class__", "user"):
+        response = client.get(
+            f"/api/v1/subscriptions?cursor=&order_by={order_by}&fields=name", headers=headers
+        )
+        assert response.status_code == 400, response.text
@@ -0,0 +1,186 @@
+# backend/tests/test_sessions.py
+"""
+Session revocation stores: in-memory set and the Redis-backed variant
+running against the local FakeRedis; logout, loading and periodic reloading
+of revoked sessions, revocations published only after the commit.
+"""
+
+import asyncio
+import hashlib
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core import sessions
+from app.core.auth import auth_manager
+from app.core.database import SessionLocal
+from app.core.sessions import MemoryRevocationStore, RedisRevocationStore, FakeRedis
+from app.models.database import Base, User, UserSession
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_memory_store_revokes_until_expiry():
+    store = MemoryRevocationStore()
+    run(store.revoke("live", time.time() + 60))
+    run(store.revoke("stale", time.time() - 1))
+
+    assert run(store.is_revoked("live"))
+    assert not run(store.is_revoked("stale"))
+    assert not run(store.is_revoked("unknown"))
+    assert len(store) == 1
+
+def test_redis_store_shares_revocations_between_workers():
+    redis = FakeRedis()
+    worker_a = RedisRevocationStore(redis, sync_interval=0)
+    worker_b = RedisRevocationStore(redis, sync_interval=0)
+
+    run(worker_a.revoke("sid-1", time.time() + 60))
+
+    assert run(worker_b.is_revoked("sid-1"))
+    assert not run(worker_b.is_revoked("sid-2"))
+
+def test_redis_store_checks_locally_between_syncs():
+    redis = FakeRedis()
+    worker_a = RedisRevocationStore(redis, sync_interval=0)
+    worker_b = RedisRevocationStore(redis, sync_interval=3600)
+    run(worker_b.sync())
+
+    run(worker_a.revoke("sid-1", time.time() + 60))
+
+    # Not pulled yet: worker_b answers from its local set without Redis calls
+    assert not run(worker_b.is_revoked("sid-1"))
+    run(worker_b.sync())
+    assert run(worker_b.is_revoked("sid-1"))
+
+def test_redis_store_drops_expired_members():
+    redis = FakeRedis()
+    store = RedisRevocationStore(redis, sync_interval=0)
+    run(redis.zadd(store.key, {"old": time.time() - 1, "new": time.time() + 60}))
+
+    run(store.sync())
+
+    assert run(redis.zrangebyscore(store.key, "-inf", "+inf")) == [b"new"]
+    assert not run(store.is_revoked("old"))
+
+@pytest.fixture
+def fresh_store(monkeypatch):
+    """Process restart: empty revocation store; counts load_revocations() calls"""
+    store = MemoryRevocationStore(reload_interval=3600)
+    loads = []
+    load = sessions.load_revocations
+
+    async def counting_load(db, store=None):
+        loads.append(db)
+        await load(db, store)
+
+    monkeypatch.setattr(sessions, "revocation_store", store)
+    monkeypatch.setattr(sessions, "load_revocations", counting_load)
+    monkeypatch.setattr(sessions, "_load_lock", asyncio.Lock())
+    return store, loads
+
+def token_of(headers) -> str:
+    return headers["Authorization"].split(" ", 1)[1]
+
+def test_logout_rejects_cached_token(client, register):
+    headers, _ = register()
+    token = token_of(headers)
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert auth_manager.token_cache.get(hashlib.sha256(token.encode()).digest()) is not None
+
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+    # Подпись и exp токена в порядке, отзыв проверяется по sid
+    assert auth_manager.verify_token(token)["sid"]
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+def test_revocations_load_once_after_restart(client, register, fresh_store):
+    store, loads = fresh_store
+    revoked, _ = register()
+    live, _ = register()
+    client.get("/api/v1/auth/me", headers=revoked)
+    sid = auth_manager.verify_token(token_of(revoked))["sid"]
+    # Logout до "перезапуска": в новом процессе отзыв известен только из БД
+    assert client.post("/api/v1/auth/logout", headers=revoked).status_code == 200
+    store._revoked.clear()
+    store.loaded = False
+    loads.clear()
+
+    for _ in range(3):
+        assert client.get("/api/v1/auth/me", headers=revoked).status_code == 401
+        assert client.get("/api/v1/auth/me", headers=live).status_code == 200
+    assert len(loads) == 1
+    assert run(store.is_revoked(sid))
+
+def test_concurrent_first_checks_load_once(tmp_path, fresh_store):
+    store, loads = fresh_store
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/sessions.db")
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            db.add(User(id=1, email="sessions@example.com"))
+            db.add(UserSession(user_id=1, session_token="gone", is_active=False,
+                               expires_at=datetime.utcnow() + timedelta(hours=1)))
+            await db.commit()
+
+        async def check(sid):
+            async with session_factory() as db:
+                return await sessions.is_session_revoked(db, sid)
+
+        results = await asyncio.gather(*(check(sid) for sid in ["gone", "live"] * 4))
+        await engine.dispose()
+        return results
+
+    assert run(scenario()) == [True, False] * 4
+    assert len(loads) == 1
+
+def test_memory_store_reloads_logouts_of_other_workers(client, register, fresh_store):
+    store, loads = fresh_store
+    headers, user_id = register()
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    sid = auth_manager.verify_token(token_of(headers))["sid"]
+
+    # Logout обработал другой воркер: в БД сессия неактивна, в этом процессе ещё нет
+    with SessionLocal() as db:
+        db.query(UserSession).filter(UserSession.session_token == sid).update({"is_active": False})
+        db.commit()
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+    store.loaded_at -= store.reload_interval
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+    assert len(loads) == 2
+
+def test_revocation_published_only_after_commit(tmp_path, fresh_store):
+    store, _ = fresh_store
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/publish.db")
+    session_factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            db.add(User(id=1, email="publish@example.com"))
+            sid = await sessions.create_session(db, 1, timedelta(hours=1))
+            await db.commit()
+
+        async with session_factory() as db:
+            revoked = await sessions.revoke_sessions(db, 1)
+            # Коммит не состоялся: в памяти сессия не отозвана
+            await db.rollback()
+        states = [await store.is_revoked(sid)]
+
+        async with session_factory() as db:
+            revoked = await sessions.revoke_sessions(db, 1)
+            await db.commit()
+            await sessions.publish_revocations(revoked)
+        states.append(await store.is_revoked(sid))
+        await engine.dispose()
+        return revoked, sid, states
+
+    revoked, sid, states = run(scenario())
+    assert [session_id for session_id, _ in revoked] == [sid]
+    assert states == [False, True]
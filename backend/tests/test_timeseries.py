@@ -0,0 +1,124 @@
+# backend/tests/test_timeseries.py
+"""
+/analytics/timeseries and /analytics/forecast: bucket boundaries, range
+limits and totals against a hand-computed fixture.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.routers.analytics import MAX_TIMESERIES_BUCKETS
+from app.services.recurrence import add_interval
+from app.services.rollups import month_bounds
+
+TIMESERIES_URL = "/api/v1/analytics/timeseries"
+
+@pytest.fixture
+def charges_headers(client, register):
+    """Music 100 on the 15th, Gym 50 every Tuesday, Course 300 on 2027-02-10 (all from 2027-01-01)
+
+    The create endpoint moves next_billing_date one interval forward, so
+    the anchors below become 2027-01-15 and Tuesday 2027-01-05.
+    """
+    headers, _ = register()
+    for item in (
+        {"name": "Music", "amount": 100, "frequency": "monthly", "category": "music",
+         "next_billing_date": "2026-12-15", "interval_unit": "month", "start_date": "2027-01-01"},
+        {"name": "Gym", "amount": 50, "frequency": "weekly", "category": "sport",
+         "next_billing_date": "2026-12-29", "interval_unit": "week", "start_date": "2027-01-01"},
+        {"name": "Course", "amount": 300, "frequency": "one_time", "category": "education",
+         "subscription_type": "one_time", "start_date": "2027-02-10"},
+    ):
+        response = client.post("/api/v1/subscriptions", json={"currency": "RUB", **item}, headers=headers)
+        assert response.status_code == 200, response.text
+    return headers
+
+def test_monthly_buckets_from_mid_month(client, charges_headers):
+    response = client.get(TIMESERIES_URL, params={"from": "2027-01-10", "to": "2027-03-20"}, headers=charges_headers)
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert body["buckets"] == ["2027-01-01", "2027-02-01", "2027-03-01"]
+    # Январь с 10-го: Gym 12, 19, 26 + Music 15; март до 20-го: Gym 2, 9, 16 + Music 15
+    assert body["total_spent"] == [250, 600, 250]
+    assert body["charge_count"] == [4, 6, 4]
+    assert body["categories"] == ["education", "music", "sport"]
+    assert body["category_spent"] == [[0, 300, 0], [100, 100, 100], [150, 200, 150]]
+
+def test_weekly_buckets_start_on_monday(client, charges_headers):
+    response = client.get(
+        TIMESERIES_URL, params={"from": "2027-01-10", "to": "2027-03-20", "granularity": "week"},
+        headers=charges_headers
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    # 2027-01-10 - воскресенье, первая неделя начинается в понедельник 4 января
+    assert body["buckets"] == [
+        "2027-01-04", "2027-01-11", "2027-01-18", "2027-01-25", "2027-02-01", "2027-02-08",
+        "2027-02-15", "2027-02-22", "2027-03-01", "2027-03-08", "2027-03-15",
+    ]
+    assert body["total_spent"] == [0, 150, 50, 50, 50, 350, 150, 50, 50, 50, 150]
+    assert sum(body["total_spent"]) == 1100
+
+def test_single_day_range(client, charges_headers):
+    body = client.get(TIMESERIES_URL, params={"from": "2027-02-10", "to": "2027-02-10"}, headers=charges_headers).json()
+    assert body["buckets"] == ["2027-02-01"]
+    assert body["total_spent"] == [300]
+
+def test_bucket_limit(client, headers):
+    start = date(2027, 1, 1)
+    # Недельные корзины оцениваются как days // 7 + 2
+    last_allowed = start + timedelta(days=(MAX_TIMESERIES_BUCKETS - 2) * 7 + 6)
+    response = client.get(
+        TIMESERIES_URL, params={"from": start.isoformat(), "to": last_allowed.isoformat(), "granularity": "week"},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert len(response.json()["buckets"]) <= MAX_TIMESERIES_BUCKETS
+
+    too_far = last_allowed + timedelta(days=1)
+    response = client.get(
+        TIMESERIES_URL, params={"from": start.isoformat(), "to": too_far.isoformat(), "granularity": "week"},
+        headers=headers
+    )
+    assert response.status_code == 400
+
+    response = client.get(TIMESERIES_URL, params={"from": "2000-01-01", "to": "2030-01-01"}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("params", [
+    {"from": "2027-03-01", "to": "2027-02-28"},
+    {"from": "2027-01-01", "to": "2027-02-28", "granularity": "day"},
+])
+def test_invalid_range_is_400(client, headers, params):
+    assert client.get(TIMESERIES_URL, params=params, headers=headers).status_code == 400
+
+def test_forecast_months(client, register):
+    headers, _ = register()
+    today = date.today()
+    response = client.post("/api/v1/subscriptions", json={
+        "name": "Music", "amount": 100, "currency": "RUB", "frequency": "monthly", "category": "music",
+        "next_billing_date": today.isoformat(), "interval_unit": "month",
+    }, headers=headers)
+    assert response.status_code == 200, response.text
+    anchor = date.fromisoformat(response.json()["next_billing_date"])
+
+    body = client.get("/api/v1/analytics/forecast", params={"months": 3}, headers=headers).json()
+    months = [add_interval(today.replace(day=1), "month", offset).strftime("%Y-%m") for offset in range(3)]
+    end = date.fromisoformat(body["period_end"])
+    # Списания считаются от якоря (k = -1 - сегодня, если не было ограничения концом месяца)
+    charges = [day for day in (add_interval(anchor, "month", k) for k in range(-1, 3)) if today <= day <= end]
+    expected = [100 * sum(day.strftime("%Y-%m") == month for day in charges) for month in months]
+
+    assert [month["month"] for month in body["monthly"]] == months
+    assert [month["total_spent"] for month in body["monthly"]] == expected
+    assert body["monthly"][1]["category_breakdown"] == {"music": 100}
+    assert body["total_spent"] == sum(expected) >= 200
+    assert body["category_totals"] == {"music": sum(expected)}
+    assert body["period_start"] == today.isoformat()
+    last = add_interval(today.replace(day=1), "month", 2)
+    assert end == month_bounds(last.year, last.month)[1]
+
+    assert client.get("/api/v1/analytics/forecast", params={"months": 0}, headers=headers).status_code == 422
@@ -59,6 +59,8 @@ export const getCurrentUser = () => api.get('/api/v1/auth/me').then(res => res.d
 export const getSubscriptions = () => api.get('/api/v1/subscriptions').then(res => res.data);
 export const getMonthlyAnalytics = () => api.get('/api/v1/analytics/monthly').then(res => res.data);
 export const getYearlyAnalytics = () => api.get('/api/v1/analytics/yearly').then(res => res.data);
+export const getSpendingForecast = (months = 12) => api.get('/api/v1/analytics/forecast', { params: { months } }).then(res => res.data);
+export const getSpendingTimeseries = (params: { from?: string; to?: string; granularity?: 'month' | 'week' } = {}) => api.get('/api/v1/analytics/timeseries', { params }).then(res => res.data);
 export const createSubscription = (data: any) => api.post('/api/v1/subscriptions', data).then(res => res.data);
 export const updateSubscription = (id: number, data: any) => api.put(`/api/v1/subscriptions/${id}`, data).then(res => res.data);
 export const deleteSubscription = (id: number) => api.delete(`/api/v1/subscriptions/${id}`).then(res => res.data);